@@ -1,16 +1,99 @@
-"""PyFileFlow, the file system organizer module."""
-
-# type: ignore
-try:
-    from importlib.metadata import PackageNotFoundError  # type: ignore
-    from importlib.metadata import version
-except ImportError:  # pragma: no cover
-    from importlib_metadata import PackageNotFoundError  # type: ignore
-    from importlib_metadata import version
-
-try:
-    __version__ = version(__name__)
-except PackageNotFoundError:  # pragma: no cover
-    __version__ = "unknown"
-
-from .rule import CopyByValueRule, CopyRule, DeleteRule, MoveRule
+"""PyFileFlow, the file system organizer module.
+
+Public names are loaded lazily, so that importing pyfileflow (and starting the
+command-line interface) stays fast.
+"""
+
+import os
+from importlib import import_module
+
+_LAZY_ATTRIBUTES = {
+    "ArchiveRule": "rule",
+    "MemoryBackend": "backend",
+    "OSBackend": "backend",
+    "BranchRule": "rule",
+    "CompressRule": "rule",
+    "CopyByValueRule": "rule",
+    "CopyRule": "rule",
+    "DeleteRule": "rule",
+    "MoveRule": "rule",
+    "MetadataIndex": "index",
+    "Rule": "rule",
+    "SwitchRule": "rule",
+    "PPath": "ppath",
+    "Snapshot": "snapshot",
+    "WorkQueue": "workqueue",
+    "load_config": "config",
+    "use_backend": "backend",
+}
+
+__all__ = ["__version__", *_LAZY_ATTRIBUTES]
+
+
+def _get_version() -> str:
+    """Return the installed version of pyfileflow.
+
+    The version is first looked up in the name of the .dist-info folder next to
+    the package, as installed from a wheel: importing importlib.metadata takes
+    longer than loading a cached configuration.
+
+    Returns:
+        str: The version, "unknown" if pyfileflow is not installed.
+    """
+    site = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    prefix, suffix = f"{__name__}-", ".dist-info"
+    try:
+        found = [
+            name[len(prefix) : -len(suffix)]
+            for name in os.listdir(site)
+            if name.startswith(prefix) and name.endswith(suffix)
+        ]
+    except OSError:  # pragma: no cover
+        found = []
+    if len(found) == 1:
+        return found[0]
+
+    try:
+        from importlib.metadata import PackageNotFoundError, version
+    except ImportError:  # pragma: no cover
+        from importlib_metadata import PackageNotFoundError  # type: ignore
+        from importlib_metadata import version  # type: ignore
+
+    try:
+        return version(__name__)
+    except PackageNotFoundError:  # pragma: no cover
+        return "unknown"
+
+
+def __getattr__(name: str) -> object:
+    """Load a public attribute on first access.
+
+    Args:
+        name (str): The attribute name.
+
+    Returns:
+        object: The attribute.
+
+    Raises:
+        AttributeError: The attribute does not exist.
+    """
+    if name == "__version__":
+        value: object = _get_version()
+    elif name == "load_config":
+        value = import_module(".config", __name__).load
+    elif name in _LAZY_ATTRIBUTES:
+        value = getattr(import_module(f".{_LAZY_ATTRIBUTES[name]}", __name__), name)
+    else:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> list[str]:
+    """List the module attributes, including the lazy ones.
+
+    Returns:
+        list[str]: The attribute names.
+    """
+    return sorted({*globals(), *__all__})
@@ -0,0 +1,7 @@
+"""Run the pyfileflow command with `python -m pyfileflow`."""
+
+import sys
+
+from .cli import main
+
+sys.exit(main())
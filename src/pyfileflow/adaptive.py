@@ -0,0 +1,142 @@
+"""Adaptive condition ordering.
+
+Implement AdaptiveConditions, which evaluates the conditions of a rule in the
+order minimising their expected cost, measured while the rule runs.
+"""
+
+import time
+
+from typing_extensions import Any, Callable
+
+from .ppath import PPath
+
+REORDER_EVERY = 256
+"""Number of evaluations between two reorderings of the conditions."""
+
+
+class ConditionStats:
+    """Cost and selectivity of a condition.
+
+    Attributes:
+        condition (Callable[[PPath], bool]): The condition.
+        calls (int): The number of evaluations.
+        rejections (int): The number of evaluations that returned False.
+        time_ns (int): The total evaluation time, in nanoseconds.
+    """
+
+    __slots__ = ("condition", "calls", "rejections", "time_ns")
+
+    def __init__(self, condition: Callable[[PPath], bool]) -> None:
+        """Initialize a ConditionStats instance.
+
+        Args:
+            condition (Callable[[PPath], bool]): The condition.
+        """
+        self.condition = condition
+        self.calls = 0
+        self.rejections = 0
+        self.time_ns = 0
+
+    @property
+    def rank(self) -> float:
+        """The expected cost of the condition per rejected path.
+
+        Conditions are best evaluated by increasing rank: a cheap and selective
+        condition first. The rejection rate is smoothed, so that a condition
+        that never rejected a path is not ranked infinitely.
+
+        Returns:
+            float: The rank of the condition.
+        """
+        cost = self.time_ns / self.calls if self.calls else 0.0
+        return cost * (self.calls + 2) / (self.rejections + 1)
+
+
+class AdaptiveConditions:
+    """Evaluate conditions in the order minimising their expected cost.
+
+    Every condition is timed, and its rejection rate counted. Every
+    REORDER_EVERY evaluations, conditions are sorted by their expected cost per
+    rejected path. All conditions still have to be True for a path to be
+    accepted, only the evaluation order changes. Conditions must therefore not
+    have side effects.
+
+    Attributes:
+        stats (list[ConditionStats]): The statistics, in evaluation order.
+    """
+
+    def __init__(
+        self,
+        conditions: list[Callable[[PPath], bool]],
+        reorder_every: int = REORDER_EVERY,
+    ) -> None:
+        """Initialize an AdaptiveConditions instance.
+
+        Args:
+            conditions (list[Callable[[PPath], bool]]): The conditions.
+            reorder_every (int):
+                The number of evaluations between two reorderings.
+                Defaults to REORDER_EVERY.
+
+        Raises:
+            ValueError: reorder_every is not a positive number.
+        """
+        if reorder_every < 1:
+            raise ValueError(
+                f"reorder_every must be a positive number, not {reorder_every!r}."
+            )
+        self.stats = [ConditionStats(condition) for condition in conditions]
+        self.reorder_every = reorder_every
+        self._evaluations = 0
+
+    @property
+    def order(self) -> list[Callable[[PPath], bool]]:
+        """The conditions, in their current evaluation order.
+
+        Returns:
+            list[Callable[[PPath], bool]]: The conditions.
+        """
+        return [stats.condition for stats in self.stats]
+
+    def reorder(self) -> None:
+        """Sort the conditions by expected cost per rejected path."""
+        self.stats.sort(key=lambda stats: stats.rank)
+
+    def __call__(self, path: PPath) -> bool:
+        """Check all the conditions for a path.
+
+        Args:
+            path (PPath): The path to check.
+
+        Returns:
+            bool: True if the path satisfies all the conditions, False otherwise.
+        """
+        self._evaluations += 1
+        if self._evaluations % self.reorder_every == 0:
+            self.reorder()
+
+        for stats in self.stats:
+            start = time.perf_counter_ns()
+            result = stats.condition(path)
+            stats.time_ns += time.perf_counter_ns() - start
+            stats.calls += 1
+            if not result:
+                stats.rejections += 1
+                return False
+        return True
+
+    def __eq__(self, other: Any) -> bool:
+        """Compare the conditions of two instances, ignoring their order and stats.
+
+        Args:
+            other (Any): The other instance to compare.
+
+        Returns:
+            bool: True if both instances have the same conditions.
+        """
+        if not isinstance(other, AdaptiveConditions):
+            return False
+        order, other_order = self.order, other.order
+        return len(order) == len(other_order) and all(
+            condition in other_order for condition in order
+        )
@@ -0,0 +1,339 @@
+"""Archive writer.
+
+Implement ArchiveWriter, which packs files into rolling tar or zip archives
+from a background thread.
+"""
+
+import contextlib
+import os
+import queue
+import shutil
+import tarfile
+import threading
+import time
+import zipfile
+
+from typing_extensions import BinaryIO, Literal, Optional, TypeAlias, Union
+
+from . import utils
+from .ppath import PathLike, PPath
+
+ArchiveFormat: TypeAlias = Literal["tar", "zip"]
+Compression: TypeAlias = Optional[Literal["gz", "bz2", "xz"]]
+
+TAR_MODES = {None: "w", "gz": "w:gz", "bz2": "w:bz2", "xz": "w:xz"}
+ZIP_MODES = {
+    None: zipfile.ZIP_STORED,
+    "gz": zipfile.ZIP_DEFLATED,
+    "bz2": zipfile.ZIP_BZIP2,
+    "xz": zipfile.ZIP_LZMA,
+}
+ZIP_MIN_DATE_TIME = (1980, 1, 1, 0, 0, 0)
+"""The earliest modification time a zip archive can record."""
+
+
+class ArchiveWriter:
+    """Pack files into rolling archives from a background thread.
+
+    Files are queued with `add`, and written by a background thread into the
+    current archive. A new archive is started when the current one reaches the
+    maximum size or number of files.
+
+    Archives are written under a temporary name, synced to the disk and renamed
+    once complete, or removed if an error stops the writer. The deletion of the
+    archived files is held (see PPath.hold_delete) until the archive containing
+    them has been renamed, so that a file planned for deletion is only removed
+    once it is safely archived.
+
+    A file that cannot be opened, like a file removed since it was queued, is
+    skipped and reported in `skipped`; its deletion stays held. The other files
+    are still archived.
+
+    Attributes:
+        destination (PPath): The folder in which archives are written.
+        format (ArchiveFormat): The archive format, "tar" or "zip".
+        compression (Compression): The compression, "gz", "bz2", "xz" or None.
+        max_size (Optional[int]): The maximum size of the files in an archive.
+        max_count (Optional[int]): The maximum number of files in an archive.
+        prefix (str): The prefix of the archive names.
+        archives (list[PPath]): The archives written so far.
+        skipped (list[tuple[PPath, OSError]]):
+            The files that could not be archived, with the error.
+    """
+
+    def __init__(
+        self,
+        destination: PathLike,
+        format: ArchiveFormat = "tar",
+        compression: Compression = None,
+        max_size: Optional[int] = None,
+        max_count: Optional[int] = None,
+        prefix: str = "archive",
+        queue_size: int = 1024,
+    ) -> None:
+        """Initialize an ArchiveWriter instance.
+
+        Args:
+            destination (PathLike): The folder in which archives are written.
+            format (ArchiveFormat): The archive format. Defaults to "tar".
+            compression (Compression): The compression. Defaults to None.
+            max_size (Optional[int]):
+                The maximum total size, in bytes, of the files in an archive.
+                An archive always contains at least one file. Defaults to None.
+            max_count (Optional[int]):
+                The maximum number of files in an archive. Defaults to None.
+            prefix (str): The prefix of the archive names. Defaults to "archive".
+            queue_size (int):
+                The maximum number of files waiting to be written. Defaults to 1024.
+
+        Raises:
+            ValueError: The format or the compression is unknown.
+        """
+        if format not in ("tar", "zip"):
+            raise ValueError(f"Unknown archive format: {format!r}.")
+        if compression not in TAR_MODES:
+            raise ValueError(f"Unknown compression: {compression!r}.")
+
+        self.destination = PPath(destination)
+        self.format = format
+        self.compression = compression
+        self.max_size = max_size
+        self.max_count = max_count
+        self.prefix = prefix
+        self.archives: list[PPath] = []
+        self.skipped: list[tuple[PPath, OSError]] = []
+
+        self._queue: "queue.Queue[Optional[tuple[PPath, str]]]" = queue.Queue(
+            queue_size
+        )
+        self._thread: Optional[threading.Thread] = None
+        self._error: Optional[BaseException] = None
+        self._index = 0
+        self._final = self._temporary = self.destination
+        self._reset()
+
+    @property
+    def suffix(self) -> str:
+        """The suffix of the archive names.
+
+        Returns:
+            str: The suffix, like ".tar.gz" or ".zip".
+        """
+        if self.format == "zip":
+            return ".zip"
+        return ".tar" + (f".{self.compression}" if self.compression else "")
+
+    def add(self, path: PPath, name: Optional[str] = None) -> None:
+        """Queue a file to be archived.
+
+        The deletion of the file is held until it is archived. An archive never
+        contains two members with the same name: a new archive is started
+        instead.
+
+        Args:
+            path (PPath): The file to archive.
+            name (Optional[str]):
+                The name of the file in the archive, like its path relative to
+                the processed folder. Defaults to the name of the file.
+        """
+        self._raise_error()
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+
+        path.hold_delete()
+        self._queue.put((path, name if name is not None else path.name))
+
+    def close(self) -> None:
+        """Write the pending files and close the current archive.
+
+        The writer can be used again after being closed, a new archive is then
+        started.
+        """
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join()
+            self._thread = None
+        self._raise_error(reset=True)
+
+    def _raise_error(self, reset: bool = False) -> None:
+        """Raise the error that stopped the background thread, if any.
+
+        Args:
+            reset (bool):
+                If True, the error is cleared. Only allowed once the background
+                thread has stopped. Defaults to False.
+
+        Raises:
+            BaseException: The error raised in the background thread.
+        """
+        error = self._error
+        if reset:
+            self._error = None
+        if error is not None:
+            raise error
+
+    def _next_name(self) -> PPath:
+        """Return the name of the next archive, without overwriting any file.
+
+        Returns:
+            PPath: The path of the next archive.
+        """
+        while True:
+            self._index += 1
+            path = self.destination / f"{self.prefix}-{self._index:05d}{self.suffix}"
+            if not path.exists():
+                return path
+
+    def _open(self, file: BinaryIO) -> Union[tarfile.TarFile, zipfile.ZipFile]:
+        """Open a new archive.
+
+        Args:
+            file (BinaryIO): The file of the archive, opened for writing.
+
+        Returns:
+            Union[tarfile.TarFile, zipfile.ZipFile]: The opened archive.
+        """
+        if self.format == "zip":
+            return zipfile.ZipFile(file, "w", ZIP_MODES[self.compression])
+        mode = TAR_MODES[self.compression]
+        return tarfile.open(fileobj=file, mode=mode)  # type: ignore
+
+    def _run(self) -> None:
+        """Write the queued files, in the background thread."""
+        while True:
+            item = self._queue.get()
+
+            if self._error is not None:
+                # The files are not archived, their deletion stays held.
+                if item is None:
+                    return
+                continue
+
+            try:
+                if item is None:
+                    self._complete()
+                    return
+                self._write(*item)
+            except BaseException as error:
+                self._error = error
+                self._discard()
+                if item is None:
+                    return
+
+    def _write(self, path: PPath, name: str) -> None:
+        """Write a file into the current archive, starting a new one if needed.
+
+        A regular file is skipped if it cannot be opened. Folders and symbolic
+        links are added like by tarfile.add or ZipFile.write.
+
+        Args:
+            path (PPath): The file to archive.
+            name (str): The name of the file in the archive.
+        """
+        record = path.record
+        try:
+            source = None if record.is_dir or record.is_symlink else open(path, "rb")
+        except OSError as error:
+            self.skipped.append((path, error))
+            return
+        try:
+            self._rotate(path, name)
+            self._add(source, path, name)
+        finally:
+            if source is not None:
+                source.close()
+        self._members.append(path)
+        self._names.add(name)
+        self._size += record.size
+
+    def _rotate(self, path: PPath, name: str) -> None:
+        """Start a new archive if the file does not fit in the current one.
+
+        Args:
+            path (PPath): The file to archive.
+            name (str): The name of the file in the archive.
+        """
+        file_size = path.record.size
+        if self._archive is not None and (
+            name in self._names
+            or (self.max_count and len(self._members) >= self.max_count)
+            or (self.max_size and self._size + file_size > self.max_size)
+        ):
+            self._complete()
+
+        if self._archive is None:
+            self._final = self._next_name()
+            self._temporary = self._final.with_name(f".{self._final.name}.part")
+            self._file = open(self._temporary, "wb")
+            self._archive = self._open(self._file)
+
+    def _add(self, source: Optional[BinaryIO], path: PPath, name: str) -> None:
+        """Add a file to the current archive.
+
+        Args:
+            source (Optional[BinaryIO]):
+                The file opened for reading, None to add the path itself.
+            path (PPath): The path of the file.
+            name (str): The name of the file in the archive.
+        """
+        if source is None:
+            if isinstance(self._archive, zipfile.ZipFile):
+                self._archive.write(path, name)
+            elif self._archive is not None:
+                self._archive.add(path, name)
+        elif isinstance(self._archive, zipfile.ZipFile):
+            # Like ZipInfo.from_file, from the opened file.
+            st = os.fstat(source.fileno())
+            date_time = max(time.localtime(st.st_mtime)[:6], ZIP_MIN_DATE_TIME)
+            info = zipfile.ZipInfo(name, date_time)
+            info.external_attr = (st.st_mode & 0xFFFF) << 16
+            info.file_size = st.st_size
+            info.compress_type = self._archive.compression
+            with self._archive.open(info, "w") as member:
+                shutil.copyfileobj(source, member)
+        elif self._archive is not None:
+            info = self._archive.gettarinfo(arcname=name, fileobj=source)
+            self._archive.addfile(info, source)
+
+    def _complete(self) -> None:
+        """Close, sync and rename the current archive, and release its files.
+
+        The archive and its folder are synced to the disk before the files are
+        released, so that no file is deleted before its archive is durable.
+        """
+        if self._archive is None or self._file is None:
+            return
+        self._archive.close()
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._file.close()
+        os.replace(self._temporary, self._final)
+        utils.sync_folder(self.destination)
+        self.archives.append(self._final)
+        for member in self._members:
+            member.release_delete()
+        self._reset()
+
+    def _discard(self) -> None:
+        """Close and remove the current archive, after an error.
+
+        The deletion of its files stays held.
+        """
+        if self._archive is None or self._file is None:
+            return
+        try:
+            with self._file:
+                self._archive.close()
+        finally:
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(self._temporary)
+            self._reset()
+
+    def _reset(self) -> None:
+        """Forget the current archive."""
+        self._archive: Optional[Union[tarfile.TarFile, zipfile.ZipFile]] = None
+        self._file: Optional[BinaryIO] = None
+        self._members: list[PPath] = []
+        self._names: set[str] = set()
+        self._size = 0
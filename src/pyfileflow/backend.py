@@ -0,0 +1,640 @@
+"""File system backends.
+
+Implement the backends through which PPath and the rules reach the file
+system: OSBackend, which calls os and shutil, and MemoryBackend, an in-memory
+tree used to run rule chains over synthetic entries without any disk access,
+for example to benchmark the rules and conditions themselves.
+
+The backend is process-wide: it is selected with set_backend, or temporarily
+with use_backend. Only the metadata operations are routed through it (stat,
+listing, folder creation, deletion and plain copies), and the bounded reads of
+file headers used to detect file types. Operations reading or writing the whole
+content of files, like verified copies, archives or compression, always use the
+operating system.
+"""
+
+import contextlib
+import errno
+import os
+import shutil
+import stat
+import time
+from abc import ABC, abstractmethod
+from collections.abc import Iterable, Iterator
+
+from typing_extensions import ContextManager, Optional, Protocol, Union
+
+StrPath = Union[str, os.PathLike]
+
+
+class DirEntry(Protocol):
+    """An entry listed by Backend.scandir, like os.DirEntry."""
+
+    name: str
+    path: str
+
+    def is_symlink(self) -> bool:
+        """Check if the entry is a symbolic link."""
+
+    def stat(self, *, follow_symlinks: bool = True) -> os.stat_result:
+        """Return the stat data of the entry."""
+
+
+class Backend(ABC):
+    """Base class for file system backends.
+
+    Subclasses implement the primitive operations; errors are reported with
+    the same OSError subclasses as the os module.
+    """
+
+    @abstractmethod
+    def stat(self, path: StrPath, follow_symlinks: bool = True) -> os.stat_result:
+        """Return the stat data of a path, like os.stat.
+
+        Args:
+            path (StrPath): The path.
+            follow_symlinks (bool):
+                If False, symbolic links are not followed. Defaults to True.
+
+        Returns:
+            os.stat_result: The stat data.
+        """
+
+    @abstractmethod
+    def scandir(self, path: StrPath) -> ContextManager[Iterable[DirEntry]]:
+        """List the entries of a folder, like os.scandir.
+
+        Args:
+            path (StrPath): The folder.
+
+        Returns:
+            ContextManager[Iterable[DirEntry]]: The entries.
+        """
+
+    @abstractmethod
+    def mkdir(self, path: StrPath, mode: int = 0o777) -> None:
+        """Create a folder, like os.mkdir.
+
+        Args:
+            path (StrPath): The folder.
+            mode (int): The mode of the folder. Defaults to 0o777.
+        """
+
+    @abstractmethod
+    def unlink(self, path: StrPath) -> None:
+        """Delete a file, like os.unlink.
+
+        Args:
+            path (StrPath): The file.
+        """
+
+    @abstractmethod
+    def rmtree(self, path: StrPath) -> None:
+        """Delete a folder and its content, like shutil.rmtree.
+
+        Args:
+            path (StrPath): The folder.
+        """
+
+    @abstractmethod
+    def copy(self, source: StrPath, destination: StrPath) -> str:
+        """Copy a file and its permissions, like shutil.copy.
+
+        Args:
+            source (StrPath): The file to copy.
+            destination (StrPath): The destination file or folder.
+
+        Returns:
+            str: The path of the copy.
+        """
+
+    @abstractmethod
+    def pread(self, path: StrPath, size: int, offset: int = 0) -> bytes:
+        """Read at most size bytes of a file from an offset, with one bounded read.
+
+        Args:
+            path (StrPath): The file.
+            size (int): The maximum number of bytes to read.
+            offset (int): The offset of the first byte. Defaults to 0.
+
+        Returns:
+            bytes: The bytes read, fewer than size at the end of the file.
+        """
+
+
+class OSBackend(Backend):
+    """The backend of the operating system's file systems."""
+
+    def stat(self, path: StrPath, follow_symlinks: bool = True) -> os.stat_result:
+        """Return the stat data of a path, with os.stat.
+
+        Args:
+            path (StrPath): The path.
+            follow_symlinks (bool):
+                If False, symbolic links are not followed. Defaults to True.
+
+        Returns:
+            os.stat_result: The stat data.
+        """
+        return os.stat(path, follow_symlinks=follow_symlinks)
+
+    def scandir(self, path: StrPath) -> ContextManager[Iterable[DirEntry]]:
+        """List the entries of a folder, with os.scandir.
+
+        Args:
+            path (StrPath): The folder.
+
+        Returns:
+            ContextManager[Iterable[DirEntry]]: The entries.
+        """
+        return os.scandir(path)
+
+    def mkdir(self, path: StrPath, mode: int = 0o777) -> None:
+        """Create a folder, with os.mkdir.
+
+        Args:
+            path (StrPath): The folder.
+            mode (int): The mode of the folder. Defaults to 0o777.
+        """
+        os.mkdir(path, mode)
+
+    def unlink(self, path: StrPath) -> None:
+        """Delete a file, with os.unlink.
+
+        Args:
+            path (StrPath): The file.
+        """
+        os.unlink(path)
+
+    def rmtree(self, path: StrPath) -> None:
+        """Delete a folder and its content, with shutil.rmtree.
+
+        Args:
+            path (StrPath): The folder.
+        """
+        shutil.rmtree(path)
+
+    def copy(self, source: StrPath, destination: StrPath) -> str:
+        """Copy a file and its permissions, with shutil.copy.
+
+        Args:
+            source (StrPath): The file to copy.
+            destination (StrPath): The destination file or folder.
+
+        Returns:
+            str: The path of the copy.
+        """
+        return os.fspath(shutil.copy(source, destination))
+
+    def pread(self, path: StrPath, size: int, offset: int = 0) -> bytes:
+        """Read at most size bytes of a file from an offset, with os.pread.
+
+        Args:
+            path (StrPath): The file.
+            size (int): The maximum number of bytes to read.
+            offset (int): The offset of the first byte. Defaults to 0.
+
+        Returns:
+            bytes: The bytes read, fewer than size at the end of the file.
+        """
+        fd = os.open(path, os.O_RDONLY | getattr(os, "O_BINARY", 0))
+        try:
+            if hasattr(os, "pread"):
+                return os.pread(fd, size, offset)
+            os.lseek(fd, offset, os.SEEK_SET)  # pragma: no cover
+            return os.read(fd, size)  # pragma: no cover
+        finally:
+            os.close(fd)
+
+
+class _Node:
+    """A file or folder of a MemoryBackend.
+
+    Attributes:
+        mode (int): The mode, including the file type bits.
+        size (int): The size in bytes.
+        mtime_ns (int): The modification time in nanoseconds.
+        ino (int): The inode number.
+        children (Optional[dict[str, _Node]]): The entries of a folder, by name.
+        data (bytes): The first bytes of a file, see MemoryBackend.add_file.
+    """
+
+    __slots__ = ("mode", "size", "mtime_ns", "ino", "children", "data")
+
+    def __init__(
+        self, mode: int, size: int, mtime_ns: int, ino: int, data: bytes = b""
+    ) -> None:
+        """Initialize a _Node instance.
+
+        Args:
+            mode (int): The mode, including the file type bits.
+            size (int): The size in bytes.
+            mtime_ns (int): The modification time in nanoseconds.
+            ino (int): The inode number.
+            data (bytes): The first bytes of a file. Defaults to b"".
+        """
+        self.mode = mode
+        self.size = size
+        self.mtime_ns = mtime_ns
+        self.ino = ino
+        self.data = data
+        self.children: Optional[dict[str, _Node]] = {} if stat.S_ISDIR(mode) else None
+
+    def stat(self, dev: int) -> os.stat_result:
+        """Build the stat data of the node.
+
+        Args:
+            dev (int): The device of the backend.
+
+        Returns:
+            os.stat_result: The stat data.
+        """
+        seconds = self.mtime_ns // 1_000_000_000
+        return os.stat_result(
+            (self.mode, self.ino, dev, 1, 0, 0, self.size, seconds, seconds, seconds),
+            {
+                "st_atime": self.mtime_ns / 1e9,
+                "st_mtime": self.mtime_ns / 1e9,
+                "st_ctime": self.mtime_ns / 1e9,
+                "st_atime_ns": self.mtime_ns,
+                "st_mtime_ns": self.mtime_ns,
+                "st_ctime_ns": self.mtime_ns,
+            },
+        )
+
+
+class MemoryEntry:
+    """An entry listed by MemoryBackend.scandir.
+
+    Attributes:
+        name (str): The entry name.
+        path (str): The entry path.
+    """
+
+    __slots__ = ("name", "path", "_stat")
+
+    def __init__(self, name: str, path: str, st: os.stat_result) -> None:
+        """Initialize a MemoryEntry instance.
+
+        Args:
+            name (str): The entry name.
+            path (str): The entry path.
+            st (os.stat_result): The stat data of the entry.
+        """
+        self.name = name
+        self.path = path
+        self._stat = st
+
+    def is_symlink(self) -> bool:
+        """Check if the entry is a symbolic link.
+
+        Returns:
+            bool: Always False, as a MemoryBackend has no symbolic links.
+        """
+        return False
+
+    def is_dir(self) -> bool:
+        """Check if the entry is a folder.
+
+        Returns:
+            bool: True if the entry is a folder.
+        """
+        return stat.S_ISDIR(self._stat.st_mode)
+
+    def stat(self, *, follow_symlinks: bool = True) -> os.stat_result:
+        """Return the stat data of the entry.
+
+        Args:
+            follow_symlinks (bool): Ignored, as there are no symbolic links.
+
+        Returns:
+            os.stat_result: The stat data.
+        """
+        return self._stat
+
+
+class MemoryBackend(Backend):
+    """An in-memory file system, holding metadata only.
+
+    Files have a size and a modification time, and at most a header: the rules
+    only handling metadata (deletions, moves and plain copies) and the
+    conditions sniffing file types can run on it, CPU bound and repeatably. There are no symbolic links, and every file has a
+    single link.
+
+    Paths are made absolute with os.path.abspath, so relative paths refer to the
+    current working directory, which is created on demand by add_file.
+
+    Attributes:
+        dev (int): The device number reported for the entries.
+    """
+
+    def __init__(self, dev: int = 0) -> None:
+        """Initialize an empty MemoryBackend instance.
+
+        Args:
+            dev (int): The device number reported for the entries. Defaults to 0.
+        """
+        self.dev = dev
+        self._inodes = 1
+        self._root = _Node(stat.S_IFDIR | 0o755, 0, time.time_ns(), self._inodes)
+
+    def _new_node(
+        self,
+        mode: int,
+        size: int = 0,
+        mtime_ns: Optional[int] = None,
+        data: bytes = b"",
+    ) -> _Node:
+        """Create a node with a new inode number.
+
+        Args:
+            mode (int): The mode, including the file type bits.
+            size (int): The size in bytes. Defaults to 0.
+            mtime_ns (Optional[int]):
+                The modification time in nanoseconds. Defaults to now.
+            data (bytes): The first bytes of a file. Defaults to b"".
+
+        Returns:
+            _Node: The node.
+        """
+        self._inodes += 1
+        if mtime_ns is None:
+            mtime_ns = time.time_ns()
+        return _Node(mode, size, mtime_ns, self._inodes, data)
+
+    @staticmethod
+    def _split(path: StrPath) -> tuple[str, list[str]]:
+        """Split a path into its components.
+
+        Args:
+            path (StrPath): The path.
+
+        Returns:
+            tuple[str, list[str]]: The absolute path and its components.
+        """
+        absolute = os.path.abspath(os.fspath(path))
+        return absolute, [part for part in absolute.split(os.sep) if part]
+
+    def _node(self, path: StrPath) -> _Node:
+        """Find the node of a path.
+
+        Args:
+            path (StrPath): The path.
+
+        Returns:
+            _Node: The node.
+
+        Raises:
+            FileNotFoundError: The path does not exist.
+            NotADirectoryError: A parent of the path is a file.
+        """
+        absolute, parts = self._split(path)
+        node = self._root
+        for part in parts:
+            if node.children is None:
+                raise NotADirectoryError(
+                    errno.ENOTDIR, os.strerror(errno.ENOTDIR), absolute
+                )
+            child = node.children.get(part)
+            if child is None:
+                raise FileNotFoundError(
+                    errno.ENOENT, os.strerror(errno.ENOENT), absolute
+                )
+            node = child
+        return node
+
+    def _parent(self, path: StrPath) -> tuple[_Node, str]:
+        """Find the folder node containing a path.
+
+        Args:
+            path (StrPath): The path.
+
+        Returns:
+            tuple[_Node, str]: The folder node and the name of the path in it.
+
+        Raises:
+            FileNotFoundError: The folder does not exist.
+            NotADirectoryError: The folder is a file.
+        """
+        absolute, parts = self._split(path)
+        if not parts:
+            raise PermissionError(errno.EPERM, os.strerror(errno.EPERM), absolute)
+        parent = self._node(os.path.dirname(absolute))
+        if parent.children is None:
+            raise NotADirectoryError(
+                errno.ENOTDIR, os.strerror(errno.ENOTDIR), absolute
+            )
+        return parent, parts[-1]
+
+    def add_file(
+        self,
+        path: StrPath,
+        size: int = 0,
+        mtime_ns: Optional[int] = None,
+        data: bytes = b"",
+    ) -> None:
+        """Create a file, and its missing parent folders.
+
+        Args:
+            path (StrPath): The file.
+            size (int):
+                The size in bytes, at least the size of data. Defaults to 0.
+            mtime_ns (Optional[int]):
+                The modification time in nanoseconds. Defaults to now.
+            data (bytes):
+                The first bytes of the file, the others read as zeros.
+                Defaults to b"".
+        """
+        folder = self._root
+        _, parts = self._split(path)
+        for part in parts[:-1]:
+            assert folder.children is not None  # nosec B101
+            child = folder.children.get(part)
+            if child is None:
+                child = folder.children[part] = self._new_node(stat.S_IFDIR | 0o755)
+            folder = child
+        if folder.children is None:
+            raise NotADirectoryError(errno.ENOTDIR, os.strerror(errno.ENOTDIR), path)
+        folder.children[parts[-1]] = self._new_node(
+            stat.S_IFREG | 0o644, max(size, len(data)), mtime_ns, data
+        )
+
+    def stat(self, path: StrPath, follow_symlinks: bool = True) -> os.stat_result:
+        """Return the stat data of a path.
+
+        Args:
+            path (StrPath): The path.
+            follow_symlinks (bool): Ignored, as there are no symbolic links.
+
+        Returns:
+            os.stat_result: The stat data.
+        """
+        return self._node(path).stat(self.dev)
+
+    def scandir(self, path: StrPath) -> ContextManager[Iterable[DirEntry]]:
+        """List the entries of a folder.
+
+        Args:
+            path (StrPath): The folder.
+
+        Returns:
+            ContextManager[Iterable[DirEntry]]: The entries.
+
+        Raises:
+            NotADirectoryError: The path is a file.
+        """
+        node = self._node(path)
+        if node.children is None:
+            raise NotADirectoryError(errno.ENOTDIR, os.strerror(errno.ENOTDIR), path)
+        folder = os.fspath(path)
+        entries = [
+            MemoryEntry(name, os.path.join(folder, name), child.stat(self.dev))
+            for name, child in node.children.items()
+        ]
+        return contextlib.nullcontext(entries)
+
+    def mkdir(self, path: StrPath, mode: int = 0o777) -> None:
+        """Create a folder.
+
+        Args:
+            path (StrPath): The folder.
+            mode (int): The mode of the folder. Defaults to 0o777.
+
+        Raises:
+            FileExistsError: The path already exists.
+        """
+        parent, name = self._parent(path)
+        assert parent.children is not None  # nosec B101
+        if name in parent.children:
+            raise FileExistsError(errno.EEXIST, os.strerror(errno.EEXIST), path)
+        parent.children[name] = self._new_node(stat.S_IFDIR | mode)
+
+    def unlink(self, path: StrPath) -> None:
+        """Delete a file.
+
+        Args:
+            path (StrPath): The file.
+
+        Raises:
+            FileNotFoundError: The file does not exist.
+            IsADirectoryError: The path is a folder.
+        """
+        parent, name = self._parent(path)
+        assert parent.children is not None  # nosec B101
+        node = parent.children.get(name)
+        if node is None:
+            raise FileNotFoundError(errno.ENOENT, os.strerror(errno.ENOENT), path)
+        if node.children is not None:
+            raise IsADirectoryError(errno.EISDIR, os.strerror(errno.EISDIR), path)
+        del parent.children[name]
+
+    def rmtree(self, path: StrPath) -> None:
+        """Delete a folder and its content.
+
+        Args:
+            path (StrPath): The folder.
+
+        Raises:
+            NotADirectoryError: The path is a file.
+        """
+        parent, name = self._parent(path)
+        assert parent.children is not None  # nosec B101
+        node = parent.children.get(name)
+        if node is None:
+            raise FileNotFoundError(errno.ENOENT, os.strerror(errno.ENOENT), path)
+        if node.children is None:
+            raise NotADirectoryError(errno.ENOTDIR, os.strerror(errno.ENOTDIR), path)
+        del parent.children[name]
+
+    def copy(self, source: StrPath, destination: StrPath) -> str:
+        """Copy a file and its permissions.
+
+        Args:
+            source (StrPath): The file to copy.
+            destination (StrPath): The destination file or folder.
+
+        Returns:
+            str: The path of the copy.
+
+        Raises:
+            IsADirectoryError: The source is a folder.
+        """
+        node = self._node(source)
+        if node.children is not None:
+            raise IsADirectoryError(errno.EISDIR, os.strerror(errno.EISDIR), source)
+
+        target = os.fspath(destination)
+        with contextlib.suppress(OSError):
+            if self._node(target).children is not None:
+                target = os.path.join(target, os.path.basename(os.fspath(source)))
+        parent, name = self._parent(target)
+        assert parent.children is not None  # nosec B101
+        existing = parent.children.get(name)
+        if existing is not None and existing.children is not None:
+            raise IsADirectoryError(errno.EISDIR, os.strerror(errno.EISDIR), target)
+        parent.children[name] = self._new_node(node.mode, node.size, data=node.data)
+        return target
+
+    def pread(self, path: StrPath, size: int, offset: int = 0) -> bytes:
+        """Read at most size bytes of a file from an offset.
+
+        Args:
+            path (StrPath): The file.
+            size (int): The maximum number of bytes to read.
+            offset (int): The offset of the first byte. Defaults to 0.
+
+        Returns:
+            bytes: The bytes read, fewer than size at the end of the file.
+
+        Raises:
+            IsADirectoryError: The path is a folder.
+        """
+        node = self._node(path)
+        if node.children is not None:
+            raise IsADirectoryError(errno.EISDIR, os.strerror(errno.EISDIR), path)
+        end = min(offset + size, node.size)
+        data = node.data[offset:end]
+        return data + bytes(max(0, end - offset - len(data)))
+
+
+_backend: Backend = OSBackend()
+
+
+def get_backend() -> Backend:
+    """Return the current backend.
+
+    Returns:
+        Backend: The backend used by PPath and the rules.
+    """
+    return _backend
+
+
+def set_backend(backend: Backend) -> Backend:
+    """Select the backend used by PPath and the rules.
+
+    Args:
+        backend (Backend): The new backend.
+
+    Returns:
+        Backend: The previous backend.
+    """
+    global _backend
+    previous, _backend = _backend, backend
+    return previous
+
+
+@contextlib.contextmanager
+def use_backend(backend: Backend) -> Iterator[Backend]:
+    """Select a backend while in the context.
+
+    Args:
+        backend (Backend): The backend.
+
+    Yields:
+        Backend: The backend.
+    """
+    previous = set_backend(backend)
+    try:
+        yield backend
+    finally:
+        set_backend(previous)
@@ -0,0 +1,207 @@
+"""Vectorised prefilter evaluation.
+
+Implement the evaluation of traversal prefilters over blocks of records with
+NumPy: the stat fields of a block are packed into arrays, extensions are mapped
+to integer ids, and the size, modification time, type and extension
+constraints of every prefilter are evaluated as array masks. Name patterns and
+folders are then only checked on the surviving records.
+
+Batches are opt-in, with the batch_size argument of Rule.process: they pay off
+on large folders with selective prefilters, but delay the first file until its
+block is full. NumPy is an optional dependency, installed with the "batch"
+extra. Without it, available() is False and the traversal checks records one by
+one.
+"""
+
+import fnmatch
+import os
+import re
+
+from typing_extensions import Any
+
+from .prefilter import Prefilter, PrefilterSet
+from .record import FLAG_DIR, FileRecord
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover
+    np = None
+
+BATCH_SIZE = 4096
+"""Suggested number of records evaluated together."""
+
+
+def available() -> bool:
+    """Check if NumPy is installed.
+
+    Returns:
+        bool: True if prefilters can be evaluated over blocks.
+    """
+    return np is not None
+
+
+class RecordBlock:
+    """The stat fields of a block of records, as arrays.
+
+    Attributes:
+        records (list[FileRecord]): The records.
+        folders (list[str]): The normalized folder of each record.
+        size (np.ndarray): The sizes.
+        mtime (np.ndarray): The modification times, in seconds.
+        is_dir (np.ndarray): Whether each record is a directory.
+    """
+
+    def __init__(self, records: list[FileRecord], folders: list[str]) -> None:
+        """Initialize a RecordBlock instance.
+
+        Args:
+            records (list[FileRecord]): The records.
+            folders (list[str]): The normalized folder of each record.
+        """
+        count = len(records)
+        self.records = records
+        self.folders = folders
+        self.size = np.fromiter((record.size for record in records), np.int64, count)
+        self.mtime = (
+            np.fromiter((record.mtime_ns for record in records), np.int64, count) / 1e9
+        )
+        flags = np.fromiter((record.flags for record in records), np.int64, count)
+        self.is_dir = (flags & FLAG_DIR) != 0
+        self._extensions: Any = None
+
+    def extensions(self) -> tuple[dict[str, int], Any, Any]:
+        """Map the extensions of the records to integer ids.
+
+        The extensions are those of Prefilter.accepts: the last suffix, and all
+        the suffixes, of each name.
+
+        Returns:
+            tuple[dict[str, int], np.ndarray, np.ndarray]: The ids by extension,
+            the id of the last suffix of each record and the id of all its
+            suffixes.
+        """
+        if self._extensions is None:
+            ids: dict[str, int] = {"": 0}
+            last, full = [], []
+            for record in self.records:
+                name = record.name.lower()
+                stripped = name.lstrip(".")
+                first = stripped.find(".")
+                if first < 0 or name.endswith("."):
+                    last.append(0)
+                    full.append(0)
+                    continue
+                last.append(ids.setdefault(stripped[stripped.rfind(".") :], len(ids)))
+                full.append(ids.setdefault(stripped[first:], len(ids)))
+            self._extensions = (ids, np.array(last), np.array(full))
+        return self._extensions
+
+    def matches(self, patterns: tuple[str, ...], mask: Any) -> Any:
+        """Match the names of the records against glob patterns, like fnmatch.
+
+        Args:
+            patterns (tuple[str, ...]): The patterns.
+            mask (np.ndarray): The records to check, the others are not matched.
+
+        Returns:
+            np.ndarray: Whether the name of each checked record matches any
+            pattern.
+        """
+        regex = re.compile(
+            "|".join(fnmatch.translate(os.path.normcase(item)) for item in patterns)
+        )
+        result = np.zeros(len(self.records), bool)
+        for index in np.flatnonzero(mask):
+            name = os.path.normcase(self.records[index].name)
+            result[index] = regex.match(name) is not None
+        return result
+
+    def mask(self, prefilter: Prefilter) -> Any:
+        """Evaluate a prefilter over the block.
+
+        Args:
+            prefilter (Prefilter): The prefilter.
+
+        Returns:
+            np.ndarray: Whether the prefilter accepts each record.
+        """
+        mask = self._stat_mask(prefilter)
+        mask &= self._extension_mask(prefilter)
+        for patterns in prefilter.patterns:
+            mask &= self.matches(patterns, mask)
+        return self._folder_mask(prefilter, mask)
+
+    def _stat_mask(self, prefilter: Prefilter) -> Any:
+        """Evaluate the type, size and mtime constraints of a prefilter.
+
+        Args:
+            prefilter (Prefilter): The prefilter.
+
+        Returns:
+            np.ndarray: Whether each record satisfies the constraints.
+        """
+        mask = np.ones(len(self.records), bool)
+        if prefilter.is_dir is not None:
+            mask &= self.is_dir == prefilter.is_dir
+        if prefilter.size_above is not None:
+            mask &= self.size > prefilter.size_above
+        if prefilter.size_below is not None:
+            mask &= self.size < prefilter.size_below
+        if prefilter.mtime_after is not None:
+            mask &= self.mtime > prefilter.mtime_after
+        if prefilter.mtime_before is not None:
+            mask &= self.mtime < prefilter.mtime_before
+        return mask
+
+    def _extension_mask(self, prefilter: Prefilter) -> Any:
+        """Evaluate the extension sets of a prefilter.
+
+        Args:
+            prefilter (Prefilter): The prefilter.
+
+        Returns:
+            np.ndarray: Whether each record matches every extension set.
+        """
+        mask = np.ones(len(self.records), bool)
+        if prefilter.extensions:
+            ids, last, full = self.extensions()
+            for extensions in prefilter.extensions:
+                accepted = [ids[ext] for ext in extensions if ext in ids]
+                mask &= np.isin(last, accepted) | np.isin(full, accepted)
+        return mask
+
+    def _folder_mask(self, prefilter: Prefilter, mask: Any) -> Any:
+        """Evaluate the folder sets of a prefilter on the records still accepted.
+
+        Args:
+            prefilter (Prefilter): The prefilter.
+            mask (np.ndarray): The records accepted so far, updated in place.
+
+        Returns:
+            np.ndarray: The updated mask.
+        """
+        if prefilter.folders:
+            for index in np.flatnonzero(mask):
+                if not prefilter.accepts(self.records[index], self.folders[index]):
+                    mask[index] = False
+        return mask
+
+
+def accepted(
+    records: list[FileRecord], folders: list[str], prefilter: PrefilterSet
+) -> list[FileRecord]:
+    """Keep the records accepted by any prefilter of a set.
+
+    Args:
+        records (list[FileRecord]): The records.
+        folders (list[str]): The normalized folder of each record.
+        prefilter (PrefilterSet): The prefilters.
+
+    Returns:
+        list[FileRecord]: The accepted records, in order.
+    """
+    block = RecordBlock(records, folders)
+    mask = np.zeros(len(records), bool)
+    for item in prefilter.prefilters:
+        mask |= block.mask(item)
+    return [records[index] for index in np.flatnonzero(mask)]
@@ -0,0 +1,280 @@
+"""Command-line interface.
+
+Implement the pyfileflow command, with the run, plan, watch and bench
+subcommands. Heavy modules are only imported by the subcommands that need them,
+to keep the startup time low.
+"""
+
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+from collections.abc import Iterator, Sequence
+
+# typing is not imported at runtime, as it takes longer to import than the
+# whole command-line interface.
+TYPE_CHECKING = False
+if TYPE_CHECKING:  # pragma: no cover
+    from .config import Chain, Pipeline
+    from .ppath import PPath
+    from .rule import Rule
+    from .snapshot import Snapshot
+
+STARTUP_BUDGET = 0.15
+"""Maximum time, in seconds, that loading a cached configuration should add to
+the startup of the run subcommand."""
+
+STARTUP_CODE = (
+    "import sys, pyfileflow.cli; from pyfileflow.config import load; "
+    "load(sys.argv[1], cache=sys.argv[2] == 'cache').chains"
+)
+"""What the run subcommand does before processing files: importing the CLI,
+then loading and compiling the configuration given as first argument."""
+
+
+def _load(args: argparse.Namespace) -> Pipeline:
+    """Load the configuration given on the command line.
+
+    Args:
+        args (argparse.Namespace): The parsed arguments.
+
+    Returns:
+        Pipeline: The compiled pipeline.
+    """
+    from .config import load
+
+    return load(args.config, cache=not args.no_cache)
+
+
+def _plan_chain(chain: Chain) -> Iterator[tuple[Rule, PPath]]:
+    """List the rules that would be applied to the files of a chain.
+
+    Args:
+        chain (Chain): The chain.
+
+    Yields:
+        tuple[Rule, PPath]: A rule and a path it would be applied to.
+    """
+    from .prefilter import PrefilterSet
+    from .record import RecordTable, unique_inodes
+
+    table = RecordTable()
+    prefilter = PrefilterSet(chain.rule.prefilters())
+    records = table.scan(
+        chain.folder, False, chain.recursive, prefilter, symlinks=chain.symlinks
+    )
+    if chain.unique:
+        records = unique_inodes(records)
+    for record in records:
+        yield from _plan_rules(chain.rule, table.path(record))
+
+
+def _plan_rules(
+    rule: Rule | None, path: PPath, matched: bool = False
+) -> Iterator[tuple[Rule, PPath]]:
+    """List the rules of a chain, and of its branches, that apply to a file.
+
+    Args:
+        rule (Rule | None): The first rule of the chain.
+        path (PPath): The file.
+        matched (bool):
+            If True, the conditions of the first rule were already checked, like
+            for the branch selected by a switch rule. Defaults to False.
+
+    Yields:
+        tuple[Rule, PPath]: A rule and the path it would be applied to.
+    """
+    from .rule import BranchRule, SwitchRule
+
+    while rule is not None:
+        if matched or rule.check_path(path):
+            yield rule, path
+            if isinstance(rule, SwitchRule):
+                matching = (
+                    branch for branch in rule.branches if branch.check_path(path)
+                )
+                yield from _plan_rules(next(matching, None), path, matched=True)
+            elif isinstance(rule, BranchRule):
+                for branch in rule.branches:
+                    yield from _plan_rules(branch, path)
+        rule, matched = rule.next, False
+
+
+def run(args: argparse.Namespace) -> int:
+    """Run the chains of a configuration.
+
+    Args:
+        args (argparse.Namespace): The parsed arguments.
+
+    Returns:
+        int: The exit code.
+    """
+    _load(args).run()
+    return 0
+
+
+def plan(args: argparse.Namespace) -> int:
+    """Print the actions a configuration would perform, without applying them.
+
+    Args:
+        args (argparse.Namespace): The parsed arguments.
+
+    Returns:
+        int: The exit code.
+    """
+    for chain in _load(args).chains:
+        for rule, path in _plan_chain(chain):
+            print(f"{rule.action}\t{path}")
+    return 0
+
+
+def watch(args: argparse.Namespace) -> int:
+    """Run the chains of a configuration periodically.
+
+    With --changes, only the first run processes whole folders, the next ones
+    only process the files changed in between.
+
+    Args:
+        args (argparse.Namespace): The parsed arguments.
+
+    Returns:
+        int: The exit code.
+    """
+    iteration = 0
+    snapshots: dict[tuple[int, str], Snapshot] = {}
+    try:
+        while args.iterations is None or iteration < args.iterations:
+            if iteration:
+                time.sleep(args.interval)
+            pipeline = _load(args)
+            if not args.changes:
+                pipeline.run()
+            else:
+                current = {}
+                for position, chain in enumerate(pipeline.chains):
+                    key = (position, str(chain.folder))
+                    current[key] = chain.run_changes(snapshots.get(key))
+                snapshots = current
+            iteration += 1
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+def measure_startup(config: str, cache: bool, repeat: int = 5) -> float:
+    """Measure the time that loading a configuration adds to a cold startup.
+
+    Each measure runs STARTUP_CODE in a new interpreter, so that no module is
+    already imported, and the time of an empty interpreter is subtracted.
+
+    Args:
+        config (str): The configuration file.
+        cache (bool): If True, the configuration is loaded from its cache.
+        repeat (int): The number of measures, the best one is kept. Defaults to 5.
+
+    Returns:
+        float: The startup time in seconds.
+    """
+    import subprocess  # nosec B404
+
+    def best(*argv: str) -> float:
+        times = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            subprocess.run([sys.executable, *argv], check=True)  # nosec B603
+            times.append(time.perf_counter() - start)
+        return min(times)
+
+    mode = "cache" if cache else "no-cache"
+    return max(0.0, best("-c", STARTUP_CODE, config, mode) - best("-c", "pass"))
+
+
+def bench(args: argparse.Namespace) -> int:
+    """Measure the startup and the scan speed of a configuration.
+
+    Args:
+        args (argparse.Namespace): The parsed arguments.
+
+    Returns:
+        int: The exit code, 1 if the cached startup exceeds STARTUP_BUDGET.
+    """
+    from .config import load
+
+    compiled = measure_startup(args.config, False, args.repeat)
+    print(f"startup, compile config: {compiled * 1000:.2f} ms")
+
+    # Write the cache, so that the next measures read it.
+    pipeline = load(args.config)
+    cached = measure_startup(args.config, True, args.repeat)
+    print(f"startup, cached config: {cached * 1000:.2f} ms")
+
+    for chain in pipeline.chains:
+        start = time.perf_counter()
+        matches = sum(1 for _ in _plan_chain(chain))
+        elapsed = time.perf_counter() - start
+        print(f"plan {chain.folder}: {matches} actions in {elapsed * 1000:.2f} ms")
+
+    if cached > STARTUP_BUDGET:
+        print(f"startup exceeds the {STARTUP_BUDGET * 1000:.0f} ms budget")
+        return 1
+    return 0
+
+
+def _parser() -> argparse.ArgumentParser:
+    """Build the argument parser.
+
+    Returns:
+        argparse.ArgumentParser: The argument parser.
+    """
+    parser = argparse.ArgumentParser(
+        prog="pyfileflow", description="Organize files with rule chains."
+    )
+    subparsers = parser.add_subparsers(required=True)
+
+    for command, help in (
+        (run, "run the chains of a configuration"),
+        (plan, "print the actions without applying them"),
+        (watch, "run the chains periodically"),
+        (bench, "measure startup and scan speed"),
+    ):
+        subparser = subparsers.add_parser(command.__name__, help=help)
+        subparser.set_defaults(command=command)
+        subparser.add_argument("config", help="the TOML configuration file")
+        subparser.add_argument(
+            "--no-cache", action="store_true", help="do not use the compiled cache"
+        )
+
+    subparsers.choices["watch"].add_argument(
+        "--interval", type=float, default=5.0, help="seconds between two runs"
+    )
+    subparsers.choices["watch"].add_argument(
+        "--iterations", type=int, default=None, help="stop after this many runs"
+    )
+    subparsers.choices["watch"].add_argument(
+        "--changes",
+        action="store_true",
+        help="after the first run, only process the files changed in between",
+    )
+    subparsers.choices["bench"].add_argument(
+        "--repeat", type=int, default=5, help="number of startup measures"
+    )
+    return parser
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    """Entry point of the pyfileflow command.
+
+    Args:
+        argv (Sequence[str] | None):
+            The command-line arguments. Defaults to sys.argv[1:].
+
+    Returns:
+        int: The exit code.
+    """
+    args = _parser().parse_args(argv)
+    try:
+        return args.command(args)
+    except (OSError, ValueError) as error:
+        print(f"pyfileflow: error: {error}", file=sys.stderr)
+        return 1
@@ -0,0 +1,154 @@
+"""Parallel compression.
+
+Implement the compression of files in independent blocks, compressed
+concurrently on a thread pool. zlib and lzma release the GIL while compressing,
+so the blocks are compressed in parallel.
+
+Each block is written as a complete gzip member or xz stream. Concatenated
+members and streams are valid gzip and xz files, readable by the usual tools.
+"""
+
+import contextlib
+import lzma
+import os
+import zlib
+from collections import deque
+from concurrent.futures import Executor, Future, ThreadPoolExecutor
+
+from typing_extensions import BinaryIO, Callable, Literal, Optional, TypeAlias
+
+from .ppath import PathLike
+
+CompressFormat: TypeAlias = Literal["gzip", "xz"]
+
+SUFFIXES = {"gzip": ".gz", "xz": ".xz"}
+
+BLOCK_SIZE = 4 * 1024**2
+"""Default size of the compressed blocks. Smaller files are compressed at once."""
+
+
+def _gzip_block(data: bytes, level: int) -> bytes:
+    """Compress data as a gzip member.
+
+    Args:
+        data (bytes): The data to compress.
+        level (int): The compression level.
+
+    Returns:
+        bytes: The gzip member.
+    """
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    return compressor.compress(data) + compressor.flush()
+
+
+def _xz_block(data: bytes, level: int) -> bytes:
+    """Compress data as an xz stream.
+
+    Args:
+        data (bytes): The data to compress.
+        level (int): The compression preset.
+
+    Returns:
+        bytes: The xz stream.
+    """
+    return lzma.compress(data, lzma.FORMAT_XZ, preset=level)
+
+
+COMPRESSORS: dict[str, Callable[[bytes, int], bytes]] = {
+    "gzip": _gzip_block,
+    "xz": _xz_block,
+}
+
+
+def compress_file(
+    source: PathLike,
+    destination: PathLike,
+    format: CompressFormat = "gzip",
+    level: int = 6,
+    block_size: int = BLOCK_SIZE,
+    executor: Optional[Executor] = None,
+    workers: Optional[int] = None,
+) -> None:
+    """Compress a file, in parallel blocks when it is large.
+
+    Files no larger than a block are compressed at once, in the calling thread.
+    Larger files are read block by block, and the blocks are compressed on the
+    executor. At most two blocks per worker are kept in memory.
+
+    Args:
+        source (PathLike): The file to compress.
+        destination (PathLike): The compressed file to write.
+        format (CompressFormat): The format, "gzip" or "xz". Defaults to "gzip".
+        level (int): The compression level. Defaults to 6.
+        block_size (int): The size of the blocks. Defaults to BLOCK_SIZE.
+        executor (Optional[Executor]):
+            The executor compressing the blocks. If None, a thread pool is
+            created for the file. Defaults to None.
+        workers (Optional[int]):
+            The number of workers of the executor, or of the thread pool created
+            for the file. Defaults to the number of CPUs.
+
+    Raises:
+        ValueError: The format is unknown.
+    """
+    if format not in COMPRESSORS:
+        raise ValueError(f"Unknown compression format: {format!r}.")
+    compress = COMPRESSORS[format]
+    workers = workers or os.cpu_count() or 1
+
+    with open(source, "rb") as input:
+        try:
+            with open(destination, "wb") as output:
+                _write_blocks(
+                    input, output, compress, level, block_size, executor, workers
+                )
+        except BaseException:
+            # Do not leave a truncated compressed file behind.
+            with contextlib.suppress(OSError):
+                os.unlink(destination)
+            raise
+
+
+def _write_blocks(
+    input: BinaryIO,
+    output: BinaryIO,
+    compress: Callable[[bytes, int], bytes],
+    level: int,
+    block_size: int,
+    executor: Optional[Executor],
+    workers: int,
+) -> None:
+    """Compress a file into another one, see compress_file.
+
+    Args:
+        input (BinaryIO): The file to compress.
+        output (BinaryIO): The compressed file.
+        compress (Callable[[bytes, int], bytes]): The block compressor.
+        level (int): The compression level.
+        block_size (int): The size of the blocks.
+        executor (Optional[Executor]): The executor compressing the blocks.
+        workers (int): The number of workers of the executor.
+    """
+    first = input.read(block_size)
+    data = input.read(block_size)
+    if not data:
+        output.write(compress(first, level))
+        return
+
+    own_executor = executor is None
+    pool = executor if executor is not None else ThreadPoolExecutor(workers)
+    window = 2 * workers
+    pending: deque[Future[bytes]] = deque([pool.submit(compress, first, level)])
+    try:
+        while data:
+            pending.append(pool.submit(compress, data, level))
+            if len(pending) >= window:
+                output.write(pending.popleft().result())
+            data = input.read(block_size)
+        while pending:
+            output.write(pending.popleft().result())
+    finally:
+        for future in pending:
+            future.cancel()
+        if own_executor:
+            pool.shutdown()
@@ -0,0 +1,364 @@
+"""Built-in conditions.
+
+Implement picklable condition classes that can be used by rules, and from
+configuration files.
+"""
+
+import fnmatch
+import time
+
+from typing_extensions import Any, Optional, Union
+
+from . import sniff, utils
+from .ppath import PathLike, PPath
+from .prefilter import Prefilter, is_within
+
+
+class BaseCondition:
+    """Base class for built-in conditions.
+
+    A condition is called with a PPath and returns True if the rule should be
+    applied to it. Unlike lambdas, built-in conditions can be compared and
+    pickled.
+    """
+
+    def __call__(self, path: PPath) -> bool:  # pragma: no cover
+        """Check the condition for a path.
+
+        Args:
+            path (PPath): The path to check.
+
+        Returns:
+            bool: True if the path satisfies the condition, False otherwise.
+        """
+        return True
+
+    def prefilter(self) -> Optional[Prefilter]:
+        """Describe the entries the condition may accept, for the traversal.
+
+        Returns:
+            Optional[Prefilter]: The prefilter, None if the condition cannot be
+            checked on the scanned stat data.
+        """
+        return None
+
+    def __eq__(self, other: Any) -> bool:
+        """Compare two conditions for equality.
+
+        Args:
+            other (Any): The other condition to compare.
+
+        Returns:
+            bool: True if both conditions are of the same type and have the same
+            parameters, False otherwise.
+        """
+        return type(self) is type(other) and self.__dict__ == other.__dict__
+
+    def __hash__(self) -> int:
+        """Compute the hash value of the condition.
+
+        Returns:
+            int: The hash value.
+        """
+        return hash((type(self), repr(self)))
+
+    def __repr__(self) -> str:
+        """Return the representation of the condition.
+
+        Returns:
+            str: The representation of the condition.
+        """
+        args = ", ".join(f"{key}={value!r}" for key, value in self.__dict__.items())
+        return f"{type(self).__name__}({args})"
+
+
+class HasExtension(BaseCondition):
+    """Check that the path has one of the given extensions.
+
+    Both the full extension (".tar.gz") and the last suffix (".gz") are tested.
+    The comparison is case insensitive.
+    """
+
+    def __init__(self, extensions: Union[str, list[str]]) -> None:
+        """Initialize a HasExtension instance.
+
+        Args:
+            extensions (Union[str, list[str]]): The accepted extensions.
+        """
+        self.extensions = frozenset(
+            ext.lower() if ext.startswith(".") else f".{ext.lower()}"
+            for ext in utils.parse_args(extensions)
+        )
+
+    def __call__(self, path: PPath) -> bool:
+        """Check the extension of a path.
+
+        Args:
+            path (PPath): The path to check.
+
+        Returns:
+            bool: True if the path has one of the extensions, False otherwise.
+        """
+        return (
+            path.suffix.lower() in self.extensions
+            or path.extension.lower() in self.extensions
+        )
+
+    def prefilter(self) -> Optional[Prefilter]:
+        """Describe the entries the condition may accept, for the traversal.
+
+        Returns:
+            Optional[Prefilter]: The prefilter.
+        """
+        return Prefilter(extensions=self.extensions)
+
+
+class NameMatches(BaseCondition):
+    """Check that the path name matches one of the given glob patterns."""
+
+    def __init__(self, patterns: Union[str, list[str]]) -> None:
+        """Initialize a NameMatches instance.
+
+        Args:
+            patterns (Union[str, list[str]]): The glob patterns, like "*.log".
+        """
+        self.patterns = tuple(utils.parse_args(patterns))
+
+    def __call__(self, path: PPath) -> bool:
+        """Check the name of a path.
+
+        Args:
+            path (PPath): The path to check.
+
+        Returns:
+            bool: True if the name matches one of the patterns, False otherwise.
+        """
+        return any(fnmatch.fnmatch(path.name, pattern) for pattern in self.patterns)
+
+    def prefilter(self) -> Optional[Prefilter]:
+        """Describe the entries the condition may accept, for the traversal.
+
+        Returns:
+            Optional[Prefilter]: The prefilter.
+        """
+        return Prefilter(patterns=self.patterns)
+
+
+class LargerThan(BaseCondition):
+    """Check that the path is larger than a size."""
+
+    def __init__(self, size: Union[int, str]) -> None:
+        """Initialize a LargerThan instance.
+
+        Args:
+            size (Union[int, str]): The size in bytes, or a string like "10MB".
+        """
+        self.size = utils.parse_size(size)
+
+    def __call__(self, path: PPath) -> bool:
+        """Check the size of a path.
+
+        Args:
+            path (PPath): The path to check.
+
+        Returns:
+            bool: True if the path is strictly larger than the size.
+        """
+        return path.record.size > self.size
+
+    def prefilter(self) -> Optional[Prefilter]:
+        """Describe the entries the condition may accept, for the traversal.
+
+        Returns:
+            Optional[Prefilter]: The prefilter.
+        """
+        return Prefilter(size_above=self.size)
+
+
+class SmallerThan(BaseCondition):
+    """Check that the path is smaller than a size."""
+
+    def __init__(self, size: Union[int, str]) -> None:
+        """Initialize a SmallerThan instance.
+
+        Args:
+            size (Union[int, str]): The size in bytes, or a string like "10MB".
+        """
+        self.size = utils.parse_size(size)
+
+    def __call__(self, path: PPath) -> bool:
+        """Check the size of a path.
+
+        Args:
+            path (PPath): The path to check.
+
+        Returns:
+            bool: True if the path is strictly smaller than the size.
+        """
+        return path.record.size < self.size
+
+    def prefilter(self) -> Optional[Prefilter]:
+        """Describe the entries the condition may accept, for the traversal.
+
+        Returns:
+            Optional[Prefilter]: The prefilter.
+        """
+        return Prefilter(size_below=self.size)
+
+
+class OlderThan(BaseCondition):
+    """Check that the path was last modified before a given age."""
+
+    def __init__(self, age: Union[float, str]) -> None:
+        """Initialize an OlderThan instance.
+
+        Args:
+            age (Union[float, str]): The age in seconds, or a string like "30d".
+        """
+        self.age = utils.parse_duration(age)
+
+    def __call__(self, path: PPath) -> bool:
+        """Check the modification time of a path.
+
+        Args:
+            path (PPath): The path to check.
+
+        Returns:
+            bool: True if the path is older than the age, False otherwise.
+        """
+        return path.record.mtime < time.time() - self.age
+
+    def prefilter(self) -> Optional[Prefilter]:
+        """Describe the entries the condition may accept, for the traversal.
+
+        Returns:
+            Optional[Prefilter]: The prefilter.
+        """
+        return Prefilter(mtime_before=time.time() - self.age)
+
+
+class NewerThan(BaseCondition):
+    """Check that the path was last modified after a given age."""
+
+    def __init__(self, age: Union[float, str]) -> None:
+        """Initialize a NewerThan instance.
+
+        Args:
+            age (Union[float, str]): The age in seconds, or a string like "1h".
+        """
+        self.age = utils.parse_duration(age)
+
+    def __call__(self, path: PPath) -> bool:
+        """Check the modification time of a path.
+
+        Args:
+            path (PPath): The path to check.
+
+        Returns:
+            bool: True if the path is newer than the age, False otherwise.
+        """
+        return path.record.mtime > time.time() - self.age
+
+    def prefilter(self) -> Optional[Prefilter]:
+        """Describe the entries the condition may accept, for the traversal.
+
+        Returns:
+            Optional[Prefilter]: The prefilter.
+        """
+        return Prefilter(mtime_after=time.time() - self.age)
+
+
+class IsDir(BaseCondition):
+    """Check whether the path is a directory."""
+
+    def __init__(self, value: bool = True) -> None:
+        """Initialize an IsDir instance.
+
+        Args:
+            value (bool):
+                If True, match directories. Otherwise, match everything else.
+                Defaults to True.
+        """
+        self.value = value
+
+    def __call__(self, path: PPath) -> bool:
+        """Check the type of a path.
+
+        Args:
+            path (PPath): The path to check.
+
+        Returns:
+            bool: True if the path type matches the expected one.
+        """
+        return path.record.is_dir == self.value
+
+    def prefilter(self) -> Optional[Prefilter]:
+        """Describe the entries the condition may accept, for the traversal.
+
+        Returns:
+            Optional[Prefilter]: The prefilter.
+        """
+        return Prefilter(is_dir=self.value)
+
+
+class InFolder(BaseCondition):
+    """Check that the path is inside one of the given folders."""
+
+    def __init__(self, folders: Union[PathLike, list[PathLike]]) -> None:
+        """Initialize an InFolder instance.
+
+        Args:
+            folders (Union[PathLike, list[PathLike]]): The folders.
+        """
+        self.folders = tuple(
+            utils.normalize_path(folder) for folder in utils.parse_args(folders)
+        )
+
+    def __call__(self, path: PPath) -> bool:
+        """Check the location of a path.
+
+        Args:
+            path (PPath): The path to check.
+
+        Returns:
+            bool: True if the path is inside one of the folders, False otherwise.
+        """
+        normalized = utils.normalize_path(path)
+        return any(is_within(normalized, folder) for folder in self.folders)
+
+    def prefilter(self) -> Optional[Prefilter]:
+        """Describe the entries the condition may accept, for the traversal.
+
+        Returns:
+            Optional[Prefilter]: The prefilter.
+        """
+        return Prefilter(folders=self.folders)
+
+
+class IsKind(BaseCondition):
+    """Check the type of a file from its content.
+
+    Only the header of the file is read, see pyfileflow.sniff.
+    """
+
+    def __init__(self, kinds: Union[str, list[str]]) -> None:
+        """Initialize an IsKind instance.
+
+        Args:
+            kinds (Union[str, list[str]]):
+                The accepted kinds ("image", "video", "archive" or "document"),
+                or type names (like "png" or "pdf").
+        """
+        self.kinds = frozenset(utils.parse_args(kinds))
+
+    def __call__(self, path: PPath) -> bool:
+        """Check the type of a file.
+
+        Args:
+            path (PPath): The path to check.
+
+        Returns:
+            bool: True if the file type or kind is accepted, False otherwise.
+        """
+        file_type = sniff.sniff(path)
+        return file_type is not None and not self.kinds.isdisjoint(file_type)
@@ -0,0 +1,759 @@
+"""Declarative configuration.
+
+Implement loading rule chains from a TOML configuration file, and caching the
+validated configuration next to it.
+
+A configuration file describes one or more chains. The rules of a chain are
+listed in processing order::
+
+    [[chain]]
+    folder = "/inbox"
+
+    [[chain.rule]]
+    action = "copy"
+    destination = "/backup"
+    when = { extension = [".jpg", ".png"], larger_than = "10KB" }
+
+    [[chain.rule]]
+    action = "copy_by_value"
+    destination = "/sorted"
+    sort_by = "modified_date"
+
+    [[chain.rule]]
+    action = "delete"
+    when = { older_than = "30d" }
+
+A chain can also process the sub-folders of its folder with
+``recursive = true``, and keep a metadata index of the tree with
+``index = "/var/cache/inbox.sqlite"``: the index is refreshed incrementally
+before each run, and the rules run on index queries instead of a full walk.
+
+Several workers can share a folder with ``queue = "/shared/inbox-queue"``: each
+file is claimed in this work queue before being processed, see
+pyfileflow.workqueue.
+
+``prefetch = 8`` reads the next 8 files ahead into the page cache while the
+current one is processed, within ``prefetch_budget`` bytes (256 MiB by default),
+see pyfileflow.prefetch. With ``prefetch_drop = true``, processed files are
+dropped from the page cache.
+
+``symlinks = "follow"`` descends into linked folders (each folder at most once),
+and ``symlinks = "ignore"`` skips symbolic links. ``unique = true`` processes
+each inode once, so hard links to the same file are only processed once; a copy
+rule with ``hardlinks = true`` recreates them as hard links instead.
+
+With NumPy installed (the "batch" extra), ``batch_size = 4096`` evaluates the
+conditions over blocks of 4096 entries while walking the folder, see
+pyfileflow.batch.
+
+A "branch" rule passes every file to several rule chains, and a "switch" rule
+to the first chain whose first rule matches, all in the same traversal::
+
+    [[chain.rule]]
+    action = "branch"
+
+    [[chain.rule.branch]]
+    [[chain.rule.branch.rule]]
+    action = "copy"
+    destination = "/backup"
+
+    [[chain.rule.branch]]
+    [[chain.rule.branch.rule]]
+    action = "move"
+    destination = "/archive"
+    when = { older_than = "30d" }
+"""
+
+import functools
+import hashlib
+import json
+import os
+
+from typing_extensions import TYPE_CHECKING, Any, Callable, Optional
+
+from . import utils
+from .ppath import PathLike, PPath
+from .prefetch import BUDGET, Prefetcher
+
+if TYPE_CHECKING:  # pragma: no cover
+    from .conditions import BaseCondition
+    from .record import SymlinksStr
+    from .rule import Rule
+    from .snapshot import Snapshot
+    from .workqueue import WorkQueue
+
+CACHE_VERSION = 9
+"""Version of the cache format. The cache is also keyed by the package version."""
+
+
+@functools.cache
+def _conditions() -> dict[str, Callable[[Any], "BaseCondition"]]:
+    """Return the conditions of the "when" tables, by name.
+
+    Returns:
+        dict[str, Callable[[Any], BaseCondition]]: The condition classes.
+    """
+    from . import conditions
+
+    return {
+        "extension": conditions.HasExtension,
+        "name": conditions.NameMatches,
+        "larger_than": conditions.LargerThan,
+        "smaller_than": conditions.SmallerThan,
+        "older_than": conditions.OlderThan,
+        "newer_than": conditions.NewerThan,
+        "is_dir": conditions.IsDir,
+        "kind": conditions.IsKind,
+        "in_folder": conditions.InFolder,
+    }
+
+
+@functools.cache
+def _sort_by() -> dict[str, Callable[[PPath], Any]]:
+    """Return the extractors of the "sort_by" option, by name.
+
+    Returns:
+        dict[str, Callable[[PPath], Any]]: The extractors.
+    """
+    from . import extractors
+
+    return {
+        "extension": extractors.extension,
+        "modified_date": extractors.modified_date,
+        "date_taken": extractors.date_taken,
+        "camera_model": extractors.camera_model,
+        "media_created": extractors.media_created,
+        "capture_date": extractors.capture_date,
+    }
+
+
+@functools.cache
+def _rules() -> dict[str, type["Rule"]]:
+    """Return the rule classes, by action.
+
+    Returns:
+        dict[str, type[Rule]]: The rule classes.
+    """
+    from . import rule
+
+    return {
+        cls.action: cls
+        for cls in (
+            rule.DeleteRule,
+            rule.CopyRule,
+            rule.MoveRule,
+            rule.CopyByValueRule,
+            rule.ArchiveRule,
+            rule.CompressRule,
+            rule.BranchRule,
+            rule.SwitchRule,
+        )
+    }
+
+
+_LAZY_TABLES = {"CONDITIONS": _conditions, "SORT_BY": _sort_by, "RULES": _rules}
+
+
+def __getattr__(name: str) -> Any:
+    """Build the CONDITIONS, SORT_BY and RULES tables on first access.
+
+    The rule, condition and extractor modules are only imported when a chain is
+    compiled. A pipeline read from the cache compiles its chains on first use.
+
+    Args:
+        name (str): The attribute name.
+
+    Returns:
+        Any: The table.
+
+    Raises:
+        AttributeError: The attribute does not exist.
+    """
+    if name in _LAZY_TABLES:
+        return _LAZY_TABLES[name]()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+class ConfigError(ValueError):
+    """Raised when a configuration file is invalid."""
+
+
+class Chain:
+    """A rule chain and the folder it processes.
+
+    Attributes:
+        folder (PPath): The folder to process.
+        rule (Rule): The first rule of the chain.
+        recursive (bool): Whether the sub-folders are processed too.
+        index (Optional[PPath]): The metadata index of the folder, if any.
+        queue (Optional[PPath]): The work queue shared with other workers, if any.
+        prefetch (Optional[Prefetcher]): The prefetcher of the files, if any.
+        symlinks (SymlinksStr): How symbolic links are handled.
+        unique (bool): Whether each inode is only processed once.
+        batch_size (int): The number of entries checked together, 0 for none.
+    """
+
+    def __init__(
+        self,
+        folder: PathLike,
+        rule: "Rule",
+        recursive: bool = False,
+        index: Optional[PathLike] = None,
+        queue: Optional[PathLike] = None,
+        prefetch: Optional[Prefetcher] = None,
+        symlinks: "SymlinksStr" = "keep",
+        unique: bool = False,
+        batch_size: int = 0,
+    ) -> None:
+        """Initialize a Chain instance.
+
+        Args:
+            folder (PathLike): The folder to process.
+            rule (Rule): The first rule of the chain.
+            recursive (bool):
+                If True, the sub-folders are processed too. Defaults to False.
+            index (Optional[PathLike]):
+                The metadata index of the folder. If None, the folder is walked
+                on every run. Defaults to None.
+            queue (Optional[PathLike]):
+                The folder of the work queue shared with other workers
+                processing the same folder. Defaults to None.
+            prefetch (Optional[Prefetcher]):
+                The prefetcher reading the next files ahead. Defaults to None.
+            symlinks (SymlinksStr):
+                How symbolic links are handled, see SymlinksStr. Defaults to "keep".
+            unique (bool):
+                If True, each inode is processed once. Defaults to False.
+            batch_size (int):
+                If positive, the conditions are checked over blocks of this many
+                entries, see Rule.process. Defaults to 0.
+        """
+        self.folder = PPath(folder)
+        self.rule = rule
+        self.recursive = recursive
+        self.index = PPath(index) if index is not None else None
+        self.queue = PPath(queue) if queue is not None else None
+        self.prefetch = prefetch
+        self.symlinks = symlinks
+        self.unique = unique
+        self.batch_size = batch_size
+
+    def _work_queue(self) -> "Optional[WorkQueue]":
+        """Open the work queue of the chain.
+
+        Returns:
+            Optional[WorkQueue]: The work queue, or None if the chain has none.
+        """
+        if self.queue is None:
+            return None
+        from .workqueue import WorkQueue
+
+        return WorkQueue(self.queue)
+
+    def run(self) -> None:
+        """Process the folder with the rule chain."""
+        queue = self._work_queue()
+        if self.index is None:
+            self.rule.process(
+                self.folder,
+                self.recursive,
+                queue=queue,
+                prefetch=self.prefetch,
+                symlinks=self.symlinks,
+                unique=self.unique,
+                batch_size=self.batch_size,
+            )
+            return
+
+        from .index import MetadataIndex
+
+        with MetadataIndex(self.index) as index:
+            index.refresh(self.folder)
+            self.rule.process(
+                self.folder,
+                self.recursive,
+                index,
+                queue,
+                self.prefetch,
+                self.symlinks,
+                self.unique,
+            )
+
+    def run_changes(self, snapshot: "Optional[Snapshot]" = None) -> "Snapshot":
+        """Process the files changed since a snapshot of the folder.
+
+        Args:
+            snapshot (Optional[Snapshot]):
+                The snapshot returned by the previous call. If None, or if the
+                chain follows symbolic links, the whole folder is processed.
+                Defaults to None.
+
+        Returns:
+            Snapshot: The snapshot of the folder after processing, to pass to
+            the next call.
+        """
+        from .snapshot import Snapshot
+
+        # A snapshot does not descend into linked folders.
+        if snapshot is None or self.symlinks == "follow":
+            self.run()
+            return Snapshot.take(self.folder, self.recursive)
+
+        current = Snapshot.take(self.folder, self.recursive, snapshot)
+        changed = snapshot.diff(current).changed(self.symlinks, self.unique)
+        self.rule.process_paths(self.folder, changed, self._work_queue(), self.prefetch)
+        # Record the changes made by the rules themselves.
+        return Snapshot.take(self.folder, self.recursive, current)
+
+    def __eq__(self, other: Any) -> bool:
+        """Compare two chains for equality.
+
+        Args:
+            other (Any): The other chain to compare.
+
+        Returns:
+            bool: True if the chains are equal, False otherwise.
+        """
+        return isinstance(other, Chain) and self.__dict__ == other.__dict__
+
+
+class Pipeline:
+    """A compiled configuration, made of several chains.
+
+    Attributes:
+        chains (list[Chain]): The chains of the configuration.
+    """
+
+    def __init__(self, chains: list[Chain]) -> None:
+        """Initialize a Pipeline instance.
+
+        Args:
+            chains (list[Chain]): The chains of the configuration.
+        """
+        self._chains: Optional[list[Chain]] = chains
+        self._tables: list[Any] = []
+
+    @classmethod
+    def from_tables(cls, tables: list[Any]) -> "Pipeline":
+        """Build a pipeline compiling its chain tables on first use.
+
+        Args:
+            tables (list[Any]): The chain tables, already checked by compile_config.
+
+        Returns:
+            Pipeline: The pipeline.
+        """
+        pipeline = cls([])
+        pipeline._chains = None
+        pipeline._tables = tables
+        return pipeline
+
+    @property
+    def chains(self) -> list[Chain]:
+        """The chains of the configuration, compiled on first access.
+
+        Returns:
+            list[Chain]: The chains.
+        """
+        if self._chains is None:
+            self._chains = [_compile_chain(table) for table in self._tables]
+        return self._chains
+
+    def run(self) -> None:
+        """Run every chain of the pipeline."""
+        for chain in self.chains:
+            chain.run()
+
+    def __eq__(self, other: Any) -> bool:
+        """Compare two pipelines for equality.
+
+        Args:
+            other (Any): The other pipeline to compare.
+
+        Returns:
+            bool: True if the pipelines are equal, False otherwise.
+        """
+        return isinstance(other, Pipeline) and self.chains == other.chains
+
+
+def _compile_conditions(when: Any) -> list["BaseCondition"]:
+    """Compile the "when" table of a rule.
+
+    Args:
+        when (Any): The "when" table.
+
+    Returns:
+        list[BaseCondition]: The conditions.
+
+    Raises:
+        ConfigError: The table is invalid.
+    """
+    if not isinstance(when, dict):
+        raise ConfigError('"when" must be a table.')
+
+    table = _conditions()
+    compiled = []
+    for name, value in when.items():
+        if name not in table:
+            raise ConfigError(f"Unknown condition: {name!r}.")
+        try:
+            compiled.append(table[name](value))
+        except (TypeError, ValueError) as error:
+            raise ConfigError(f"Invalid value for {name!r}: {error}") from error
+    return compiled
+
+
+def _compile_sort_by(name: Any) -> Callable[[PPath], Any]:
+    """Compile the "sort_by" option of a rule.
+
+    Args:
+        name (Any): The name of the extractor.
+
+    Returns:
+        Callable[[PPath], Any]: The extractor.
+
+    Raises:
+        ConfigError: The extractor is unknown.
+    """
+    extractors = _sort_by()
+    if name not in extractors:
+        raise ConfigError(f"Unknown sort_by: {name!r}.")
+    return extractors[name]
+
+
+def _compile_branches(branches: Any) -> list["Rule"]:
+    """Compile the "branch" tables of a branch or switch rule.
+
+    Args:
+        branches (Any): The branch tables.
+
+    Returns:
+        list[Rule]: The first rule of each branch.
+
+    Raises:
+        ConfigError: A table is invalid.
+    """
+    if not isinstance(branches, list):
+        raise ConfigError('"branch" must be an array of tables.')
+
+    compiled = []
+    for branch in branches:
+        if not isinstance(branch, dict):
+            raise ConfigError("A branch must be a table.")
+        first = _compile_rules(branch.get("rule", []))
+        if first is None:
+            raise ConfigError("A branch must have at least one rule.")
+        compiled.append(first)
+    return compiled
+
+
+def _compile_rule(table: Any, next: Optional["Rule"]) -> "Rule":
+    """Compile a rule table.
+
+    Args:
+        table (Any): The rule table.
+        next (Optional[Rule]): The next rule in the chain.
+
+    Returns:
+        Rule: The rule.
+
+    Raises:
+        ConfigError: The table is invalid.
+    """
+    if not isinstance(table, dict):
+        raise ConfigError("A rule must be a table.")
+
+    options = dict(table)
+    action = options.pop("action", None)
+    rules = _rules()
+    if action not in rules:
+        raise ConfigError(f"Unknown action: {action!r}.")
+
+    options["condition"] = _compile_conditions(options.pop("when", {}))
+    if "sort_by" in options:
+        options["sort_by"] = _compile_sort_by(options["sort_by"])
+    if "branch" in options:
+        options["branches"] = _compile_branches(options.pop("branch"))
+
+    try:
+        return rules[action](next, **options)
+    except TypeError as error:
+        raise ConfigError(f"Invalid options for {action!r}: {error}") from error
+
+
+def _compile_rules(tables: Any) -> Optional["Rule"]:
+    """Compile the rule tables of a chain.
+
+    Args:
+        tables (Any): The rule tables, in processing order.
+
+    Returns:
+        Optional[Rule]: The first rule, None if there is no rule.
+
+    Raises:
+        ConfigError: A table is invalid.
+    """
+    if not isinstance(tables, list):
+        raise ConfigError('"rule" must be an array of tables.')
+
+    rule: Optional["Rule"] = None
+    for table in reversed(tables):
+        rule = _compile_rule(table, rule)
+    return rule
+
+
+def _compile_paths(chain: dict[str, Any]) -> dict[str, Optional[str]]:
+    """Compile the index and queue paths of a chain table.
+
+    Args:
+        chain (dict[str, Any]): The chain table.
+
+    Returns:
+        dict[str, Optional[str]]: The paths, by option name.
+
+    Raises:
+        ConfigError: A path is not a string.
+    """
+    paths = {}
+    for name in ("index", "queue"):
+        paths[name] = chain.get(name)
+        if paths[name] is not None and not isinstance(paths[name], str):
+            raise ConfigError(f'"{name}" must be a path.')
+    return paths
+
+
+def _compile_prefetch(chain: dict[str, Any]) -> Optional[Prefetcher]:
+    """Compile the prefetch options of a chain.
+
+    Args:
+        chain (dict[str, Any]): The chain table.
+
+    Returns:
+        Optional[Prefetcher]: The prefetcher, or None if the chain has none.
+
+    Raises:
+        ConfigError: An option is invalid.
+    """
+    if "prefetch" not in chain:
+        return None
+    depth = chain["prefetch"]
+    if not isinstance(depth, int) or isinstance(depth, bool) or depth < 1:
+        raise ConfigError('"prefetch" must be a positive number of files.')
+    try:
+        budget = utils.parse_size(chain.get("prefetch_budget", BUDGET))
+    except (TypeError, ValueError) as error:
+        raise ConfigError(f'Invalid "prefetch_budget": {error}') from error
+    drop = chain.get("prefetch_drop", False)
+    if not isinstance(drop, bool):
+        raise ConfigError('"prefetch_drop" must be a boolean.')
+    return Prefetcher(depth, budget, drop)
+
+
+def _compile_links(chain: dict[str, Any]) -> dict[str, Any]:
+    """Compile the symbolic and hard link options of a chain.
+
+    Args:
+        chain (dict[str, Any]): The chain table.
+
+    Returns:
+        dict[str, Any]: The symlinks and unique arguments of the chain.
+
+    Raises:
+        ConfigError: An option is invalid.
+    """
+    symlinks = chain.get("symlinks", "keep")
+    if symlinks not in ("keep", "follow", "ignore"):
+        raise ConfigError('"symlinks" must be "keep", "follow" or "ignore".')
+    if symlinks == "follow" and "index" in chain:
+        raise ConfigError("An indexed chain cannot follow symbolic links.")
+    unique = chain.get("unique", False)
+    if not isinstance(unique, bool):
+        raise ConfigError('"unique" must be a boolean.')
+    return {"symlinks": symlinks, "unique": unique}
+
+
+def _compile_batch_size(chain: dict[str, Any]) -> int:
+    """Compile the batch size of a chain.
+
+    Args:
+        chain (dict[str, Any]): The chain table.
+
+    Returns:
+        int: The number of entries checked together, 0 for none.
+
+    Raises:
+        ConfigError: The batch size is invalid.
+    """
+    batch_size = chain.get("batch_size", 0)
+    if (
+        not isinstance(batch_size, int)
+        or isinstance(batch_size, bool)
+        or batch_size < 0
+    ):
+        raise ConfigError('"batch_size" must be a number of entries.')
+    return batch_size
+
+
+def _compile_chain(chain: Any) -> Chain:
+    """Compile a chain table.
+
+    Args:
+        chain (Any): The chain table.
+
+    Returns:
+        Chain: The chain.
+
+    Raises:
+        ConfigError: The table is invalid.
+    """
+    if not isinstance(chain, dict) or "folder" not in chain:
+        raise ConfigError('A chain must have a "folder".')
+
+    rule = _compile_rules(chain.get("rule", []))
+    if rule is None:
+        raise ConfigError("A chain must have at least one rule.")
+
+    recursive = chain.get("recursive", False)
+    if not isinstance(recursive, bool):
+        raise ConfigError('"recursive" must be a boolean.')
+
+    return Chain(
+        chain["folder"],
+        rule,
+        recursive,
+        **_compile_paths(chain),
+        prefetch=_compile_prefetch(chain),
+        **_compile_links(chain),
+        batch_size=_compile_batch_size(chain),
+    )
+
+
+def compile_config(data: dict[str, Any]) -> Pipeline:
+    """Compile a parsed configuration.
+
+    Args:
+        data (dict[str, Any]): The parsed configuration.
+
+    Returns:
+        Pipeline: The compiled pipeline.
+
+    Raises:
+        ConfigError: The configuration is invalid.
+    """
+    return Pipeline([_compile_chain(chain) for chain in data.get("chain", [])])
+
+
+def cache_path(config: PathLike) -> PPath:
+    """Return the path of the cache of a configuration file.
+
+    Args:
+        config (PathLike): The configuration file.
+
+    Returns:
+        PPath: The cache path, next to the configuration file.
+    """
+    config = PPath(config)
+    return config.with_name(f".{config.name}.cache")
+
+
+def _cache_header(digest: bytes) -> bytes:
+    """Return the header of a cache file.
+
+    Args:
+        digest (bytes): The digest of the configuration.
+
+    Returns:
+        bytes: The cache format, package version and configuration digest.
+    """
+    from . import __version__
+
+    return f"{CACHE_VERSION} {__version__} {digest.hex()}\n".encode()
+
+
+def _read_cache(path: PPath, digest: bytes) -> Optional[Pipeline]:
+    """Read a cached configuration.
+
+    The cache only holds the chain tables, as JSON: reading it runs no code,
+    and imports no rule module until the chains are used.
+
+    Args:
+        path (PPath): The cache path.
+        digest (bytes): The digest of the current configuration.
+
+    Returns:
+        Optional[Pipeline]: The cached pipeline, None if the cache is missing
+        or outdated.
+    """
+    try:
+        data = path.read_bytes()
+    except OSError:
+        return None
+
+    header = _cache_header(digest)
+    if not data.startswith(header):
+        return None
+
+    try:
+        tables = json.loads(data[len(header) :])
+    except ValueError:
+        return None
+    return Pipeline.from_tables(tables) if isinstance(tables, list) else None
+
+
+def _write_cache(path: PPath, digest: bytes, tables: list[Any]) -> None:
+    """Write the chain tables of a configuration in the cache.
+
+    Failing to write the cache is not an error, the configuration will simply
+    be parsed again next time. Tables holding TOML dates are not cached.
+
+    Args:
+        path (PPath): The cache path.
+        digest (bytes): The digest of the configuration.
+        tables (list[Any]): The chain tables, checked by compile_config.
+    """
+    temporary = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    try:
+        data = _cache_header(digest) + json.dumps(tables).encode()
+        temporary.write_bytes(data)
+        os.replace(temporary, path)
+    except (OSError, TypeError):
+        temporary.unlink(missing_ok=True)
+
+
+def load(config: PathLike, cache: bool = True) -> Pipeline:
+    """Load a TOML configuration file.
+
+    Args:
+        config (PathLike): The configuration file.
+        cache (bool):
+            If True, the validated configuration is cached next to the
+            configuration file, and reused as long as neither the configuration
+            nor pyfileflow change. Defaults to True.
+
+    Returns:
+        Pipeline: The compiled pipeline.
+
+    Raises:
+        ConfigError: The configuration is invalid.
+    """
+    config = PPath(config)
+    content = config.read_bytes()
+    digest = hashlib.sha256(content).digest()
+
+    if cache:
+        pipeline = _read_cache(cache_path(config), digest)
+        if pipeline is not None:
+            return pipeline
+
+    import tomllib
+
+    try:
+        data = tomllib.loads(content.decode())
+    except (tomllib.TOMLDecodeError, UnicodeDecodeError) as error:
+        raise ConfigError(f"Invalid TOML file: {error}") from error
+
+    pipeline = compile_config(data)
+
+    if cache:
+        _write_cache(cache_path(config), digest, data.get("chain", []))
+    return pipeline
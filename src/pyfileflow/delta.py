@@ -0,0 +1,238 @@
+"""Delta transfer.
+
+Implement rsync-style delta transfers between two local files: the blocks of
+the destination are indexed by a weak rolling checksum and a strong hash, the
+source is scanned for these blocks at every offset, and only the bytes that
+changed are written to the destination, in place.
+
+Writing in place means that a destination block can only be reused at its own
+offset or earlier, as later offsets are only overwritten after it was read:
+data inserted in the source rewrites the rest of the file, like
+``rsync --inplace``.
+
+The weak checksum is Adler-32, computed by zlib on whole blocks and rolled in
+Python byte by byte after a mismatch. Rolling stops after a block without any
+match, as the next unchanged block of a local edit is found within a block, and
+the scan then moves block by block until the next match: a completely rewritten
+file is not scanned byte by byte.
+"""
+
+import hashlib
+import os
+import zlib
+from collections.abc import Generator, Iterator
+
+from typing_extensions import BinaryIO, Optional, TypeAlias, Union
+
+from .ppath import PathLike
+
+BLOCK_SIZE = 64 * 1024
+"""Default size of the compared blocks."""
+
+_ADLER = 65521
+
+Signature: TypeAlias = dict[int, list[tuple[int, bytes]]]
+"""The (index, strong hash) of the blocks of a file, by weak checksum."""
+
+Operation: TypeAlias = tuple[int, Union[int, bytes]]
+"""An output offset, and the index of a destination block or literal data."""
+
+
+def _strong(data: bytes) -> bytes:
+    """Hash a block.
+
+    Args:
+        data (bytes): The block.
+
+    Returns:
+        bytes: The strong hash of the block.
+    """
+    return hashlib.blake2b(data, digest_size=16).digest()
+
+
+def signature(file: BinaryIO, block_size: int = BLOCK_SIZE) -> Signature:
+    """Index the complete blocks of a file.
+
+    Args:
+        file (BinaryIO): The file, read from its current position.
+        block_size (int): The size of the blocks. Defaults to BLOCK_SIZE.
+
+    Returns:
+        Signature: The blocks, by weak checksum.
+    """
+    blocks: Signature = {}
+    index = 0
+    while len(block := file.read(block_size)) == block_size:
+        blocks.setdefault(zlib.adler32(block), []).append((index, _strong(block)))
+        index += 1
+    return blocks
+
+
+def delta(
+    source: BinaryIO, blocks: Signature, block_size: int = BLOCK_SIZE
+) -> Iterator[Operation]:
+    """Describe a source file as blocks of the destination and literal data.
+
+    A destination block is only used at an output offset no greater than its
+    own, so that the operations can be applied in place, in order.
+
+    Args:
+        source (BinaryIO): The source file, read from its current position.
+        blocks (Signature): The signature of the destination.
+        block_size (int): The size of the blocks. Defaults to BLOCK_SIZE.
+
+    Yields:
+        Operation: The operations, in output order.
+    """
+    buffer = b""
+    position = 0
+    output = 0
+    literal = bytearray()
+    weak = None
+    rolled = 0
+    eof = False
+
+    while True:
+        if not eof and position + block_size >= len(buffer):
+            data = source.read(max(block_size, 1024**2))
+            eof = not data
+            buffer = buffer[position:] + data
+            position = 0
+        if position + block_size > len(buffer):
+            break
+
+        end = position + block_size
+        if weak is None:
+            weak = zlib.adler32(buffer[position:end])
+
+        match = _find_block(
+            blocks, weak, buffer, position, output + len(literal), block_size
+        )
+        if match is not None:
+            output = yield from _flush(literal, output)
+            yield output, match
+            output += block_size
+            position = end
+            weak = None
+            rolled = 0
+            continue
+
+        if rolled >= block_size or end == len(buffer):
+            # Give up on unaligned matches: move to the next block.
+            literal += buffer[position:end]
+            position = end
+            weak = None
+        else:
+            weak = _roll(weak, buffer[position], buffer[end], block_size)
+            literal.append(buffer[position])
+            position += 1
+            rolled += 1
+
+        if len(literal) >= block_size:
+            output = yield from _flush(literal, output)
+
+    literal += buffer[position:]
+    yield from _flush(literal, output)
+
+
+def _find_block(
+    blocks: Signature,
+    weak: int,
+    buffer: bytes,
+    position: int,
+    offset: int,
+    block_size: int,
+) -> Optional[int]:
+    """Find a destination block equal to a block of the source.
+
+    Args:
+        blocks (Signature): The signature of the destination.
+        weak (int): The weak checksum of the source block.
+        buffer (bytes): The buffered source data.
+        position (int): The position of the source block in the buffer.
+        offset (int): The output offset of the source block.
+        block_size (int): The size of the blocks.
+
+    Returns:
+        Optional[int]: The index of the first equal destination block that can
+        be used at the offset, if any.
+    """
+    candidates = blocks.get(weak)
+    if candidates is None:
+        return None
+    strong = _strong(buffer[position : position + block_size])
+    for index, digest in candidates:
+        if digest == strong and index * block_size >= offset:
+            return index
+    return None
+
+
+def _roll(weak: int, removed: int, added: int, block_size: int) -> int:
+    """Roll an Adler-32 checksum by one byte.
+
+    Args:
+        weak (int): The checksum of the current block.
+        removed (int): The first byte of the current block.
+        added (int): The byte following the current block.
+        block_size (int): The size of the blocks.
+
+    Returns:
+        int: The checksum of the block starting one byte later.
+    """
+    a = ((weak & 0xFFFF) - removed + added) % _ADLER
+    b = ((weak >> 16) - block_size * removed + a - 1) % _ADLER
+    return (b << 16) | a
+
+
+def _flush(literal: bytearray, output: int) -> Generator[Operation, None, int]:
+    """Yield the pending literal data, if any, and clear it.
+
+    Args:
+        literal (bytearray): The pending literal data.
+        output (int): The output offset of the literal data.
+
+    Yields:
+        Operation: The literal data operation.
+
+    Returns:
+        int: The output offset following the literal data.
+    """
+    if literal:
+        yield output, bytes(literal)
+        output += len(literal)
+        literal.clear()
+    return output
+
+
+def patch(source: PathLike, destination: PathLike, block_size: int = BLOCK_SIZE) -> int:
+    """Update a destination file in place to match a source file.
+
+    Args:
+        source (PathLike): The source file.
+        destination (PathLike): The destination file, which must exist.
+        block_size (int): The size of the compared blocks. Defaults to BLOCK_SIZE.
+
+    Returns:
+        int: The number of bytes written to the destination. Literal data
+        that is already in place, like the final partial block, is not written.
+    """
+    written = 0
+    with open(destination, "r+b") as output, open(source, "rb") as input:
+        blocks = signature(output, block_size)
+        fd = output.fileno()
+        size = 0
+        for offset, operation in delta(input, blocks, block_size):
+            if isinstance(operation, int):
+                size = offset + block_size
+                if operation * block_size == offset:
+                    continue
+                data = os.pread(fd, block_size, operation * block_size)
+            else:
+                data = operation
+                size = offset + len(data)
+                if os.pread(fd, len(data), offset) == data:
+                    continue
+            os.pwrite(fd, data, offset)
+            written += len(data)
+        output.truncate(size)
+    return written
@@ -0,0 +1,367 @@
+"""Built-in sort_by extractors.
+
+Implement module-level functions that can be used as the sort_by argument of a
+CopyByValueRule. Being module-level, they can be pickled, and used from a
+process pool.
+
+The EXIF and MP4/MOV extractors only read the headers they need, with bounded
+reads, and do not depend on any third-party library.
+"""
+
+import datetime
+import os
+import struct
+import time
+from collections.abc import Iterator
+
+from typing_extensions import Any, BinaryIO
+
+from . import sniff
+from .ppath import PathLike, PPath
+
+
+def extension(path: PPath) -> str:
+    """Return the extension of the path, without the leading dot.
+
+    Args:
+        path (PPath): The path.
+
+    Returns:
+        str: The extension, "None" if the path has no extension.
+    """
+    return path.extension.lstrip(".").lower() or "None"
+
+
+def modified_date(path: PPath) -> str:
+    """Return the modification date of the path.
+
+    Args:
+        path (PPath): The path.
+
+    Returns:
+        str: The modification date, formatted as YYYY-MM-DD.
+    """
+    return time.strftime("%Y-%m-%d", time.localtime(path.record.mtime))
+
+
+EXIF_HEADER = b"Exif\x00\x00"
+TIFF_READ_SIZE = 65536
+"""Number of bytes read at the start of a TIFF file to find its tags."""
+MAX_JPEG_SEGMENTS = 64
+"""Maximum number of JPEG segments skipped while looking for the EXIF data."""
+
+TAG_MODEL = 0x0110
+TAG_DATETIME = 0x0132
+TAG_EXIF_IFD = 0x8769
+TAG_DATETIME_ORIGINAL = 0x9003
+
+_ASCII = 2
+_SHORT = 3
+_LONG = 4
+
+MP4_EPOCH = -2082844800
+"""The MP4/MOV epoch (1904-01-01) in seconds since the Unix epoch."""
+MVHD_CREATED = {0: ">I", 1: ">Q"}
+"""The format of the creation time of a movie header, by header version."""
+
+
+def _parse_ifd(data: bytes, offset: int, order: str) -> dict[int, Any]:
+    """Parse the ASCII and integer tags of a TIFF image file directory.
+
+    Args:
+        data (bytes): The TIFF data, starting with its header.
+        offset (int): The offset of the directory in the data.
+        order (str): The byte order, "<" or ">".
+
+    Returns:
+        dict[int, Any]: The tags of the directory.
+    """
+    tags: dict[int, Any] = {}
+    if offset + 2 > len(data):
+        return tags
+
+    (count,) = struct.unpack_from(f"{order}H", data, offset)
+    for index in range(count):
+        entry = offset + 2 + index * 12
+        if entry + 12 > len(data):
+            break
+        tag, kind, length, value = struct.unpack_from(f"{order}HHI4s", data, entry)
+
+        if kind == _ASCII:
+            if length > 4:
+                (start,) = struct.unpack(f"{order}I", value)
+                value = data[start : start + length]
+            tags[tag] = value[:length].split(b"\x00", 1)[0].decode(errors="replace")
+        elif kind == _SHORT:
+            tags[tag] = struct.unpack_from(f"{order}H", value)[0]
+        elif kind == _LONG:
+            tags[tag] = struct.unpack(f"{order}I", value)[0]
+    return tags
+
+
+def parse_tiff(data: bytes) -> dict[int, Any]:
+    """Parse the main tags and the EXIF tags of TIFF data.
+
+    Args:
+        data (bytes): The TIFF data, starting with its header.
+
+    Returns:
+        dict[int, Any]: The tags of the first directory and of the EXIF
+        directory.
+
+    Raises:
+        ValueError: The data is not TIFF data, or is truncated.
+    """
+    if data[:4] == b"II*\x00":
+        order = "<"
+    elif data[:4] == b"MM\x00*":
+        order = ">"
+    else:
+        raise ValueError("Not TIFF data.")
+
+    try:
+        (offset,) = struct.unpack_from(f"{order}I", data, 4)
+        tags = _parse_ifd(data, offset, order)
+        if isinstance(tags.get(TAG_EXIF_IFD), int):
+            tags.update(_parse_ifd(data, tags[TAG_EXIF_IFD], order))
+    except struct.error as error:
+        raise ValueError(f"Truncated TIFF data: {error}") from error
+    return tags
+
+
+def _read_jpeg_exif(file: BinaryIO) -> bytes:
+    """Read the TIFF data of the EXIF segment of a JPEG file.
+
+    Only the segment headers are read until the EXIF segment is found.
+
+    Args:
+        file (BinaryIO): The JPEG file, positioned after its start marker.
+
+    Returns:
+        bytes: The TIFF data of the EXIF segment.
+
+    Raises:
+        KeyError: The file has no EXIF segment.
+        ValueError: A segment length is invalid.
+    """
+    for _ in range(MAX_JPEG_SEGMENTS):
+        header = file.read(4)
+        if len(header) < 4 or header[0] != 0xFF or header[1] == 0xDA:
+            break
+        (length,) = struct.unpack(">H", header[2:])
+        # The length counts its own two bytes.
+        if length < 2:
+            raise ValueError(f"Invalid JPEG segment length: {length}.")
+
+        if header[1] == 0xE1:
+            segment = file.read(length - 2)
+            if segment.startswith(EXIF_HEADER):
+                return segment[len(EXIF_HEADER) :]
+        else:
+            file.seek(length - 2, os.SEEK_CUR)
+    raise KeyError("No EXIF data.")
+
+
+def read_exif(path: PathLike) -> dict[int, Any]:
+    """Read the EXIF tags of a JPEG or TIFF file.
+
+    Only the headers of the file are read, the image is never decoded.
+
+    Args:
+        path (PathLike): The image path.
+
+    Returns:
+        dict[int, Any]: The EXIF tags, by tag number. Only ASCII and integer
+        tags are decoded.
+
+    Raises:
+        ValueError: The file is neither a JPEG nor a TIFF file, or is truncated.
+    """
+    with open(path, "rb") as file:
+        start = file.read(2)
+        if start == b"\xff\xd8":
+            data = _read_jpeg_exif(file)
+        else:
+            data = start + file.read(TIFF_READ_SIZE - 2)
+    return parse_tiff(data)
+
+
+def _text_tag(tags: dict[int, Any], tag: int) -> str:
+    """Return an ASCII tag, stripped.
+
+    Args:
+        tags (dict[int, Any]): The tags, see read_exif.
+        tag (int): The tag number.
+
+    Returns:
+        str: The tag value, empty if the tag is missing or is not ASCII.
+    """
+    value = tags.get(tag)
+    return value.strip() if isinstance(value, str) else ""
+
+
+def _format_exif_date(value: str) -> str:
+    """Format an EXIF date as YYYY-MM-DD.
+
+    Args:
+        value (str): The EXIF date, formatted as "YYYY:MM:DD HH:MM:SS".
+
+    Returns:
+        str: The formatted date.
+
+    Raises:
+        ValueError: The date is invalid.
+    """
+    return datetime.datetime.strptime(value, "%Y:%m:%d %H:%M:%S").strftime("%Y-%m-%d")
+
+
+def date_taken(path: PPath) -> str:
+    """Return the date a photo was taken, from its EXIF data.
+
+    DateTimeOriginal is used, falling back to DateTime.
+
+    Args:
+        path (PPath): The JPEG or TIFF image path.
+
+    Returns:
+        str: The date, formatted as YYYY-MM-DD.
+
+    Raises:
+        KeyError: The image has no date.
+    """
+    tags = read_exif(path)
+    for tag in (TAG_DATETIME_ORIGINAL, TAG_DATETIME):
+        value = _text_tag(tags, tag)
+        if value:
+            return _format_exif_date(value)
+    raise KeyError("No date in the EXIF data.")
+
+
+def camera_model(path: PPath) -> str:
+    """Return the camera model of a photo, from its EXIF data.
+
+    Args:
+        path (PPath): The JPEG or TIFF image path.
+
+    Returns:
+        str: The camera model.
+
+    Raises:
+        KeyError: The image has no camera model.
+    """
+    model = _text_tag(read_exif(path), TAG_MODEL)
+    if not model:
+        raise KeyError("No camera model in the EXIF data.")
+    return model
+
+
+def _iter_boxes(file: BinaryIO, end: int) -> Iterator[tuple[bytes, int, int]]:
+    """Iterate over the boxes of an MP4/MOV file, without reading their content.
+
+    Args:
+        file (BinaryIO): The file, positioned at the first box.
+        end (int): The offset where the boxes end.
+
+    Yields:
+        tuple[bytes, int, int]: The box type, the offset of its content and
+        the offset of its end.
+
+    Raises:
+        ValueError: A box header is truncated.
+    """
+    position = file.tell()
+    while position + 8 <= end:
+        file.seek(position)
+        try:
+            size, box = struct.unpack(">I4s", file.read(8))
+            content = position + 8
+            if size == 1:
+                (size,) = struct.unpack(">Q", file.read(8))
+                content += 8
+        except struct.error as error:
+            raise ValueError(f"Truncated box header: {error}") from error
+        if size == 0:
+            size = end - position
+        if size < content - position:
+            return
+        yield box, content, position + size
+        position += size
+
+
+def _find_box(file: BinaryIO, path: list[bytes], end: int) -> tuple[int, int]:
+    """Find a nested box of an MP4/MOV file.
+
+    Args:
+        file (BinaryIO): The file, positioned at the first box.
+        path (list[bytes]): The types of the nested boxes, like [b"moov", b"mvhd"].
+        end (int): The offset where the boxes end.
+
+    Returns:
+        tuple[int, int]: The offset of the box content and of its end.
+
+    Raises:
+        KeyError: The box does not exist.
+    """
+    for box, content, box_end in _iter_boxes(file, end):
+        if box == path[0]:
+            if len(path) == 1:
+                return content, box_end
+            file.seek(content)
+            return _find_box(file, path[1:], box_end)
+    raise KeyError(f"No {path[0].decode()} box.")
+
+
+def media_created(path: PPath) -> str:
+    """Return the creation date of an MP4/MOV video, from its movie header.
+
+    Only the box headers and the movie header are read, the boxes are skipped
+    with seeks, so the movie header is found even at the end of the file.
+
+    Args:
+        path (PPath): The MP4 or MOV video path.
+
+    Returns:
+        str: The creation date (UTC), formatted as YYYY-MM-DD.
+
+    Raises:
+        KeyError: The video has no creation date.
+    """
+    with open(path, "rb") as file:
+        size = file.seek(0, os.SEEK_END)
+        file.seek(0)
+        content, end = _find_box(file, [b"moov", b"mvhd"], size)
+        file.seek(content)
+        header = file.read(min(12, end - content))
+
+    # The version and flags take 4 bytes, then comes the creation time.
+    created_format = MVHD_CREATED.get(header[0], ">I") if header else ">I"
+    if len(header) < 4 + struct.calcsize(created_format):
+        raise KeyError("Truncated movie header.")
+    (created,) = struct.unpack_from(created_format, header, 4)
+    if not created:
+        raise KeyError("No creation date in the movie header.")
+
+    date = datetime.datetime.fromtimestamp(created + MP4_EPOCH, datetime.timezone.utc)
+    return date.strftime("%Y-%m-%d")
+
+
+def capture_date(path: PPath) -> str:
+    """Return the date a photo or a video was taken.
+
+    The EXIF data is used for images, the movie header for videos.
+
+    Args:
+        path (PPath): The image or video path.
+
+    Returns:
+        str: The date, formatted as YYYY-MM-DD.
+
+    Raises:
+        ValueError: The file is neither a supported image nor a video.
+    """
+    file_type = sniff.sniff(path)
+    if file_type is not None and file_type.name in ("jpeg", "tiff"):
+        return date_taken(path)
+    if file_type is not None and file_type.name in ("mp4", "quicktime"):
+        return media_created(path)
+    raise ValueError("Unsupported file type.")
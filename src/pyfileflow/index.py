@@ -0,0 +1,383 @@
+"""Persistent metadata index.
+
+Implement MetadataIndex, a local sqlite database of the entries of the trees
+processed by pyfileflow. The index is refreshed incrementally: only the folders
+whose modification time changed are listed again. Rules can then run on index
+queries instead of a live walk, see Rule.process.
+
+A folder's modification time only changes when entries are added to it, removed
+from it or renamed. A file modified in place, without changing its folder, keeps
+its indexed stat data until a full refresh. The entries returned by a query are
+therefore stat-ed again, so that rules never act on outdated data; a query may
+still miss a file whose indexed data did not match it.
+"""
+
+import contextlib
+import os
+import sqlite3
+import stat
+import time
+from collections.abc import Iterator
+
+from typing_extensions import Any, Optional
+
+from .backend import get_backend
+from .ppath import PathLike, PPath
+from .prefilter import Prefilter, PrefilterSet
+from .record import FLAG_DIR, FLAG_SYMLINK, FileRecord, RecordTable, SymlinksStr
+
+INDEX_VERSION = 1
+"""Version of the index schema, an index with another version is rebuilt."""
+
+RACY_NS = 2 * 10**9
+"""Folders modified less than this before a refresh are listed again next time.
+
+Their modification time may not change if they are modified again within the
+timestamp granularity of the file system.
+"""
+
+_SCHEMA = """
+CREATE TABLE folders (path TEXT PRIMARY KEY, mtime_ns INTEGER) WITHOUT ROWID;
+CREATE TABLE entries (
+    folder TEXT NOT NULL,
+    name TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    mode INTEGER NOT NULL,
+    flags INTEGER NOT NULL,
+    dev INTEGER NOT NULL,
+    ino INTEGER NOT NULL,
+    PRIMARY KEY (folder, name)
+) WITHOUT ROWID;
+CREATE INDEX entries_size ON entries (size);
+CREATE INDEX entries_mtime ON entries (mtime_ns);
+"""
+
+
+def _subtree(column: str, folder: str) -> tuple[str, list[str]]:
+    """Build an SQL clause matching a folder and everything below it.
+
+    A range on the path is used instead of LIKE, which is case-insensitive and
+    treats "%" and "_" in the folder name as wildcards.
+
+    Args:
+        column (str): The path column.
+        folder (str): The folder.
+
+    Returns:
+        tuple[str, list[str]]: The clause and its parameters.
+    """
+    prefix = folder.rstrip(os.sep) + os.sep
+    end = prefix[:-1] + chr(ord(os.sep) + 1)
+    return (
+        f"({column} = ? OR ({column} >= ? AND {column} < ?))",
+        [folder, prefix, end],
+    )
+
+
+def _prefilter_clause(prefilter: Prefilter) -> tuple[str, list[Any]]:
+    """Translate the stat constraints of a prefilter into an SQL clause.
+
+    The clause may accept more entries than the prefilter, which is still
+    checked on every returned entry.
+
+    Args:
+        prefilter (Prefilter): The prefilter.
+
+    Returns:
+        tuple[str, list[Any]]: The clause and its parameters.
+    """
+    clauses, parameters = ["1"], []
+    if prefilter.size_above is not None:
+        clauses.append("size > ?")
+        parameters.append(prefilter.size_above)
+    if prefilter.size_below is not None:
+        clauses.append("size < ?")
+        parameters.append(prefilter.size_below)
+    if prefilter.mtime_after is not None:
+        clauses.append("mtime_ns >= ?")
+        parameters.append(int(prefilter.mtime_after * 1e9) - 1)
+    if prefilter.mtime_before is not None:
+        clauses.append("mtime_ns <= ?")
+        parameters.append(int(prefilter.mtime_before * 1e9) + 1)
+    if prefilter.is_dir is not None:
+        clauses.append(f"(flags & {FLAG_DIR}) = ?")
+        parameters.append(FLAG_DIR if prefilter.is_dir else 0)
+    return "(" + " AND ".join(clauses) + ")", parameters
+
+
+def _scan_clause(
+    root: str,
+    recursive: bool,
+    prefilter: Optional[PrefilterSet],
+    symlinks: SymlinksStr,
+) -> tuple[str, list[Any]]:
+    """Build the SQL clause selecting the entries of a query, see MetadataIndex.scan.
+
+    Args:
+        root (str): The absolute path of the queried folder.
+        recursive (bool): If True, the entries of the sub-folders are selected too.
+        prefilter (Optional[PrefilterSet]): The prefilter of the query, if any.
+        symlinks (SymlinksStr): How symbolic links are handled.
+
+    Returns:
+        tuple[str, list[Any]]: The clause and its parameters.
+    """
+    if recursive:
+        clause, parameters = _subtree("folder", root)
+        clause += f" AND (flags & {FLAG_DIR}) = 0"
+    else:
+        clause, parameters = "folder = ?", [root]
+    if symlinks == "ignore":
+        clause += f" AND (flags & {FLAG_SYMLINK}) = 0"
+
+    if prefilter is not None:
+        alternatives = [_prefilter_clause(item) for item in prefilter.prefilters]
+        clause += " AND (" + " OR ".join(sql for sql, _ in alternatives) + ")"
+        parameters += [value for _, values in alternatives for value in values]
+    return clause, parameters
+
+
+def _restat(record: FileRecord, path: str) -> Optional[FileRecord]:
+    """Read the current stat data of an indexed entry, like FileRecord.from_entry.
+
+    Args:
+        record (FileRecord): The indexed record of the entry.
+        path (str): The path of the entry.
+
+    Returns:
+        Optional[FileRecord]: The current record, None if the entry was removed.
+    """
+    backend = get_backend()
+    try:
+        st = backend.stat(path, follow_symlinks=False)
+    except (FileNotFoundError, NotADirectoryError):
+        return None
+    flags = FLAG_SYMLINK if stat.S_ISLNK(st.st_mode) else 0
+    if flags:
+        # Broken links, and link loops, keep the stat data of the link itself.
+        with contextlib.suppress(OSError):
+            st = backend.stat(path)
+    current = FileRecord.from_stat(record.parent, record.name, st)
+    current.flags |= flags
+    return current
+
+
+class MetadataIndex:
+    """A sqlite index of the entries of folder trees.
+
+    Attributes:
+        path (PPath): The database file.
+    """
+
+    def __init__(self, path: PathLike) -> None:
+        """Initialize a MetadataIndex instance, creating the database if needed.
+
+        Args:
+            path (PathLike): The database file, or ":memory:".
+        """
+        self.path = PPath(path)
+        self._connection = sqlite3.connect(os.fspath(path))
+        self._connection.execute("PRAGMA journal_mode = WAL")
+        version = self._connection.execute("PRAGMA user_version").fetchone()[0]
+        if version != INDEX_VERSION:
+            with self._connection:
+                self._connection.execute("DROP TABLE IF EXISTS folders")
+                self._connection.execute("DROP TABLE IF EXISTS entries")
+            self._connection.executescript(_SCHEMA)
+            self._connection.execute(f"PRAGMA user_version = {INDEX_VERSION}")
+
+    def close(self) -> None:
+        """Close the database."""
+        self._connection.close()
+
+    def __enter__(self) -> "MetadataIndex":
+        """Enter the runtime context.
+
+        Returns:
+            MetadataIndex: The index itself.
+        """
+        return self
+
+    def __exit__(self, *args: object) -> None:
+        """Exit the runtime context, closing the database.
+
+        Args:
+            *args (object): The exception information, if any.
+        """
+        self.close()
+
+    def _forget(self, folder: str) -> None:
+        """Remove a folder and everything below it from the index.
+
+        Args:
+            folder (str): The folder.
+        """
+        clause, parameters = _subtree("path", folder)
+        self._connection.execute(f"DELETE FROM folders WHERE {clause}", parameters)
+        clause, parameters = _subtree("folder", folder)
+        self._connection.execute(f"DELETE FROM entries WHERE {clause}", parameters)
+
+    def _subfolders(self, folder: str) -> list[str]:
+        """Return the indexed sub-folders of a folder, symbolic links excluded.
+
+        Args:
+            folder (str): The folder.
+
+        Returns:
+            list[str]: The names of the sub-folders.
+        """
+        rows = self._connection.execute(
+            "SELECT name FROM entries WHERE folder = ? AND (flags & ?) = ?",
+            (folder, FLAG_DIR | FLAG_SYMLINK, FLAG_DIR),
+        )
+        return [name for (name,) in rows]
+
+    def _list(self, folder: str, mtime_ns: Optional[int]) -> list[str]:
+        """List a folder again, replacing its entries in the index.
+
+        Args:
+            folder (str): The folder.
+            mtime_ns (Optional[int]): The modification time to record.
+
+        Returns:
+            list[str]: The names of the sub-folders to refresh.
+        """
+        records = []
+        with get_backend().scandir(folder) as entries:
+            for entry in entries:
+                try:
+                    records.append(FileRecord.from_entry(0, entry))
+                except OSError:
+                    continue
+
+        subfolders = [
+            record.name for record in records if record.is_dir and not record.is_symlink
+        ]
+        for name in self._subfolders(folder):
+            if name not in subfolders:
+                self._forget(os.path.join(folder, name))
+
+        self._connection.execute("DELETE FROM entries WHERE folder = ?", (folder,))
+        self._connection.executemany(
+            "INSERT INTO entries VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            [
+                (
+                    folder,
+                    record.name,
+                    record.size,
+                    record.mtime_ns,
+                    record.mode,
+                    record.flags,
+                    record.dev,
+                    record.ino,
+                )
+                for record in records
+            ],
+        )
+        self._connection.execute(
+            "INSERT OR REPLACE INTO folders VALUES (?, ?)", (folder, mtime_ns)
+        )
+        return subfolders
+
+    def refresh(self, folder: PathLike, full: bool = False) -> int:
+        """Bring the index of a folder tree up to date.
+
+        Every folder of the tree is stat-ed, but only the folders whose
+        modification time changed since the last refresh are listed again.
+
+        Args:
+            folder (PathLike): The root of the tree.
+            full (bool):
+                If True, every folder is listed again, which also catches files
+                modified in place. Defaults to False.
+
+        Returns:
+            int: The number of folders listed again.
+        """
+        start_ns = time.time_ns()
+        listed = 0
+        folders = [os.path.abspath(folder)]
+        with self._connection:
+            while folders:
+                current = folders.pop()
+                row = self._connection.execute(
+                    "SELECT mtime_ns FROM folders WHERE path = ?", (current,)
+                ).fetchone()
+                try:
+                    mtime_ns = get_backend().stat(current).st_mtime_ns
+                    if full or row is None or row[0] != mtime_ns:
+                        racy = mtime_ns > start_ns - RACY_NS
+                        names = self._list(current, None if racy else mtime_ns)
+                        listed += 1
+                    else:
+                        names = self._subfolders(current)
+                except (FileNotFoundError, NotADirectoryError):
+                    # The folder was removed, or replaced by a file.
+                    self._forget(current)
+                    continue
+                folders.extend(os.path.join(current, name) for name in names)
+        return listed
+
+    def scan(
+        self,
+        table: RecordTable,
+        folder: PathLike,
+        recursive: bool = False,
+        prefilter: Optional[PrefilterSet] = None,
+        symlinks: SymlinksStr = "keep",
+    ) -> Iterator[FileRecord]:
+        """Query the indexed entries of a folder, like RecordTable.scan.
+
+        The size, modification time and type constraints of the prefilter are
+        evaluated by sqlite. The matching entries are then stat-ed again, and
+        the whole prefilter is checked on their current data: entries removed
+        since the last refresh are skipped, and so are entries modified in
+        place that no longer match.
+
+        Args:
+            table (RecordTable): The table holding the parent folders of the records.
+            folder (PathLike): The folder to query.
+            recursive (bool):
+                If True, the entries of the sub-folders are returned too, and
+                only the entries that are not folders are. Defaults to False.
+            prefilter (Optional[PrefilterSet]):
+                If given, entries it rejects are skipped. Defaults to None.
+            symlinks (SymlinksStr):
+                How symbolic links are handled, see SymlinksStr. The index does
+                not descend into linked folders, so they cannot be followed.
+                Defaults to "keep".
+
+        Yields:
+            FileRecord: A record for every (accepted) indexed entry.
+
+        Raises:
+            ValueError: symlinks is "follow".
+        """
+        if symlinks == "follow":
+            raise ValueError("An index cannot follow symbolic links.")
+        if prefilter is not None and prefilter.accepts_all:
+            prefilter = None
+
+        clause, parameters = _scan_clause(
+            os.path.abspath(folder), recursive, prefilter, symlinks
+        )
+        parents: dict[str, tuple[int, str]] = {}
+        for row in self._connection.execute(
+            f"SELECT * FROM entries WHERE {clause} ORDER BY folder, name", parameters
+        ):
+            parent = parents.get(row[0])
+            if parent is None:
+                parent = parents[row[0]] = (
+                    table.add_parent(row[0]),
+                    os.path.normcase(row[0]),
+                )
+            record = _restat(
+                FileRecord(parent[0], *row[1:]), os.path.join(row[0], row[1])
+            )
+            if record is None or (recursive and record.is_dir):
+                continue
+            if symlinks == "ignore" and record.is_symlink:
+                continue
+            if prefilter is None or prefilter.accepts(record, parent[1]):
+                yield record
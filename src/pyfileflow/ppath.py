@@ -1,14 +1,21 @@
 """Path interface.
 
-Implement a subclass of pathlib.Path called PPath.
+Implement a subclass of pathlib.Path called PPath. Its metadata operations
+(stat and the checks built on it, mkdir, unlink and delete) go through the
+current file system backend, see pyfileflow.backend.
 """
 
 import os
 import pathlib
-import shutil
+import threading
 from types import TracebackType
 
-from typing_extensions import Optional, Self, Union
+from typing_extensions import TYPE_CHECKING, Optional, Self, Union
+
+from .backend import get_backend
+
+if TYPE_CHECKING:  # pragma: no cover
+    from .record import FileRecord
 
 
 class PPath(pathlib.Path):
@@ -16,11 +23,65 @@ class PPath(pathlib.Path):
 
     Attributes:
         extension (str): The path extension.
+        record (FileRecord): The stat data of the path.
     """
 
+    __slots__ = ("_planned_delete", "_record", "_delete_holds", "_delete_parent")
+
     _flavour = type(pathlib.Path())._flavour
 
-    _planned_delete: bool = False
+    def stat(self, *, follow_symlinks: bool = True) -> os.stat_result:
+        """Return the stat data of the path, from the current backend.
+
+        Path.exists, Path.is_dir and the other checks rely on this method.
+
+        Args:
+            follow_symlinks (bool):
+                If False, symbolic links are not followed. Defaults to True.
+
+        Returns:
+            os.stat_result: The stat data.
+        """
+        return get_backend().stat(self, follow_symlinks)
+
+    def mkdir(
+        self, mode: int = 0o777, parents: bool = False, exist_ok: bool = False
+    ) -> None:
+        """Create a folder at the path, with the current backend.
+
+        Args:
+            mode (int): The mode of the folder. Defaults to 0o777.
+            parents (bool):
+                If True, the missing parent folders are created too.
+                Defaults to False.
+            exist_ok (bool):
+                If True, do not raise an exception if the folder already exists.
+                Defaults to False.
+        """
+        try:
+            get_backend().mkdir(self, mode)
+        except FileNotFoundError:
+            if not parents or self.parent == self:
+                raise
+            self.parent.mkdir(parents=True, exist_ok=True)
+            self.mkdir(mode, parents=False, exist_ok=exist_ok)
+        except OSError:
+            if not exist_ok or not self.is_dir():
+                raise
+
+    def unlink(self, missing_ok: bool = False) -> None:
+        """Delete the file, with the current backend.
+
+        Args:
+            missing_ok (bool):
+                If True, do not raise an exception if the file does not exist.
+                Defaults to False.
+        """
+        try:
+            get_backend().unlink(self)
+        except FileNotFoundError:
+            if not missing_ok:
+                raise
 
     def delete(self, missing_ok: bool = False) -> None:
         """Delete the path in the filesystem.
@@ -34,7 +95,7 @@ class PPath(pathlib.Path):
         """
         if self.exists() or not missing_ok:
             if self.is_dir():
-                shutil.rmtree(self)
+                get_backend().rmtree(self)
             else:
                 self.unlink()
 
@@ -46,15 +107,98 @@ class PPath(pathlib.Path):
         """
         self._planned_delete = True
 
+        record = getattr(self, "_record", None)
+        if record is not None:
+            from .record import FLAG_PLANNED_DELETE
+
+            record.flags |= FLAG_PLANNED_DELETE
+
     def delete_if_planned(self) -> None:
         """Delete the file if planned for deletion.
 
         This method checks if the file has been planned for deletion using the
         `plan_delete` method. If it has been planned for deletion, the file is deleted.
+        If the deletion is held (see `hold_delete`), it is postponed until the last
+        hold is released.
         """
-        if self._planned_delete:
+        with _delete_lock:
+            if not getattr(self, "_planned_delete", False):
+                return
+            parent = getattr(self, "_delete_parent", None)
+            if parent is None and getattr(self, "_delete_holds", 0):
+                return
+            self._planned_delete = False
+        if parent is not None:
+            parent.plan_delete()
+        else:
             self.delete()
 
+    def hold_delete(self) -> None:
+        """Postpone the planned deletion of the file.
+
+        Used by rules that still need the file after the rule chain has been
+        executed, like rules writing in a background thread.
+        """
+        parent = getattr(self, "_delete_parent", None)
+        if parent is not None:
+            parent.hold_delete()
+            return
+        with _delete_lock:
+            self._delete_holds = getattr(self, "_delete_holds", 0) + 1
+
+    def release_delete(self) -> None:
+        """Release a hold taken with `hold_delete`.
+
+        If this was the last hold and the file is planned for deletion, the file
+        is deleted.
+        """
+        parent = getattr(self, "_delete_parent", None)
+        if parent is not None:
+            parent.release_delete()
+            return
+        with _delete_lock:
+            self._delete_holds = getattr(self, "_delete_holds", 0) - 1
+        self.delete_if_planned()
+
+    def branch(self) -> "PPath":
+        """Return a copy of the path for a branch of a rule tree.
+
+        The copy has its own deletion plan, so that a branch planning the
+        deletion of the file does not affect the other branches. Deleting the
+        copy only plans the deletion of this path, and its holds are holds on
+        this path.
+
+        Returns:
+            PPath: The copy of the path, with a copy of its stat data.
+        """
+        branch = PPath(self)
+        branch._delete_parent = self
+        record = getattr(self, "_record", None)
+        if record is not None:
+            from .record import FLAG_PLANNED_DELETE
+
+            branch._record = record.copy()
+            branch._record.flags &= ~FLAG_PLANNED_DELETE
+        return branch
+
+    @property
+    def record(self) -> "FileRecord":
+        """The stat data of the path.
+
+        Paths built from a RecordTable carry the record taken during the scan,
+        so no additional stat call is needed. Otherwise, the path is stat-ed
+        once and the record is kept.
+
+        Returns:
+            FileRecord: The record of the path.
+        """
+        record = getattr(self, "_record", None)
+        if record is None:
+            from .record import FileRecord
+
+            record = self._record = FileRecord.from_stat(-1, self.name, self.stat())
+        return record
+
     @property
     def extension(self) -> str:
         """The path extension.
@@ -91,4 +235,6 @@ class PPath(pathlib.Path):
         """
 
 
+_delete_lock = threading.Lock()
+
 PathLike = Union[PPath, pathlib.Path, str, os.PathLike]
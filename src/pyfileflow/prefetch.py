@@ -0,0 +1,189 @@
+"""Readahead prefetching.
+
+Implement Prefetcher, which asks the kernel to read the next files of a rule
+chain into the page cache while the current one is processed, with
+POSIX_FADV_WILLNEED. It can also drop each file from the cache once it was
+processed, with POSIX_FADV_DONTNEED, so that large runs do not evict the rest
+of the system's cache. As this also drops the files that were cached before
+the run, it is only done on request.
+
+On platforms without posix_fadvise, files are passed through unchanged.
+"""
+
+import os
+from collections import deque
+from collections.abc import Iterable, Iterator
+
+from typing_extensions import Optional
+
+from .ppath import PPath
+
+DEPTH = 8
+"""Default number of upcoming files prefetched."""
+
+BUDGET = 256 * 1024**2
+"""Default maximum number of bytes prefetched and not yet processed."""
+
+
+def advise(path: PPath, advice: int, length: int = 0) -> bool:
+    """Give an access advice on a file to the kernel.
+
+    Args:
+        path (PPath): The file.
+        advice (int): One of the os.POSIX_FADV_* constants.
+        length (int): The number of bytes concerned, 0 for the whole file.
+
+    Returns:
+        bool: False if the advice could not be given.
+    """
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return False
+    try:
+        os.posix_fadvise(fd, 0, length, advice)
+    except OSError:  # pragma: no cover
+        return False
+    finally:
+        os.close(fd)
+    return True
+
+
+class Prefetcher:
+    """Prefetch the upcoming files of an iteration, within a memory budget.
+
+    Attributes:
+        depth (int): The number of upcoming files prefetched.
+        budget (int): The maximum number of bytes prefetched and not processed.
+        drop (bool): Whether processed files are dropped from the page cache.
+    """
+
+    def __init__(
+        self, depth: int = DEPTH, budget: int = BUDGET, drop: bool = False
+    ) -> None:
+        """Initialize a Prefetcher instance.
+
+        Args:
+            depth (int): The number of upcoming files prefetched. Defaults to DEPTH.
+            budget (int):
+                The maximum number of bytes prefetched and not yet processed. The
+                next file is always prefetched, up to this size. Defaults to BUDGET.
+            drop (bool):
+                If True, files are dropped from the page cache once processed,
+                even if they were cached before. Defaults to False.
+        """
+        self.depth = depth
+        self.budget = budget
+        self.drop = drop
+
+    @property
+    def supported(self) -> bool:
+        """Whether the platform supports access advices.
+
+        Returns:
+            bool: True if os.posix_fadvise is available.
+        """
+        return hasattr(os, "posix_fadvise")
+
+    def iterate(self, paths: Iterable[PPath]) -> Iterator[PPath]:
+        """Iterate over paths, prefetching the next ones.
+
+        The sizes are read from the records of the paths, which are already
+        known when they come from a scan.
+
+        Args:
+            paths (Iterable[PPath]): The paths, in processing order.
+
+        Yields:
+            PPath: The same paths. A path is dropped from the page cache when
+            the next one is requested.
+        """
+        if not self.supported:  # pragma: no cover
+            yield from paths
+            return
+
+        # Paths, with the number of bytes prefetched (None if not yet).
+        window: deque[list] = deque()
+        pending = 0
+        iterator = iter(paths)
+        while True:
+            for path in iterator:
+                window.append([path, None])
+                if len(window) >= self.depth:
+                    break
+            if not window:
+                return
+
+            pending = self._advise(window, pending)
+            path, length = window.popleft()
+            pending -= length
+            yield path
+            if self.drop and length:
+                advise(path, os.POSIX_FADV_DONTNEED)
+
+    def _advise(self, window: deque[list], pending: int) -> int:
+        """Prefetch the paths of the window that are not yet, within the budget.
+
+        The first path of the window is always prefetched.
+
+        Args:
+            window (deque[list]):
+                The paths, with the number of bytes prefetched (None if not yet).
+            pending (int): The number of bytes prefetched and not processed.
+
+        Returns:
+            int: The new number of bytes prefetched and not processed.
+        """
+        for item in window:
+            if item[1] is not None:
+                continue
+            length = self._length(item[0])
+            if item is not window[0] and pending + length > self.budget:
+                break
+            if length:
+                advise(item[0], os.POSIX_FADV_WILLNEED, length)
+            item[1] = length
+            pending += length
+        return pending
+
+    def _length(self, path: PPath) -> int:
+        """Return the number of bytes of a file to prefetch.
+
+        Args:
+            path (PPath): The file.
+
+        Returns:
+            int: The size of the file, within the budget. 0 for folders and
+            files that no longer exist.
+        """
+        try:
+            record = path.record
+        except OSError:
+            return 0
+        return 0 if record.is_dir else min(record.size, self.budget)
+
+    def __eq__(self, other: object) -> bool:
+        """Compare two prefetchers for equality.
+
+        Args:
+            other (object): The other prefetcher to compare.
+
+        Returns:
+            bool: True if both prefetchers have the same settings.
+        """
+        return isinstance(other, Prefetcher) and self.__dict__ == other.__dict__
+
+
+def prefetched(
+    paths: Iterable[PPath], prefetcher: Optional[Prefetcher]
+) -> Iterable[PPath]:
+    """Prefetch paths if a prefetcher is given.
+
+    Args:
+        paths (Iterable[PPath]): The paths, in processing order.
+        prefetcher (Optional[Prefetcher]): The prefetcher, if any.
+
+    Returns:
+        Iterable[PPath]: The paths, prefetched by the prefetcher if any.
+    """
+    return paths if prefetcher is None else prefetcher.iterate(paths)
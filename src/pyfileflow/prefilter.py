@@ -0,0 +1,323 @@
+"""Traversal prefilters.
+
+Implement Prefilter, a description of the entries a rule may apply to, that
+the traversal checks on the scanned stat data, before building any PPath or
+calling any condition.
+
+Built-in conditions expose their prefilter with a `prefilter` method. Any
+condition can do the same: the prefilter must accept at least every entry the
+condition accepts.
+"""
+
+import fnmatch
+import os
+
+from typing_extensions import Any, Iterable, Optional
+
+from . import utils
+from .record import FileRecord
+
+
+def suffixes(name: str) -> list[str]:
+    """Return the suffixes of a file name, like PurePath.suffixes.
+
+    Args:
+        name (str): The file name.
+
+    Returns:
+        list[str]: The suffixes of the name.
+    """
+    if name.endswith("."):
+        return []
+    return ["." + suffix for suffix in name.lstrip(".").split(".")[1:]]
+
+
+def is_within(path: str, folder: str) -> bool:
+    """Check if a normalized path is a folder or is inside it.
+
+    Args:
+        path (str): The normalized path.
+        folder (str): The normalized folder.
+
+    Returns:
+        bool: True if the path is the folder or is inside it.
+    """
+    return path == folder or path.startswith(folder.rstrip(os.sep) + os.sep)
+
+
+class Prefilter:
+    """Necessary conditions on an entry, checked on its scanned stat data.
+
+    Every constraint must be satisfied. Each extension set, pattern set and
+    folder set is a constraint on its own, satisfied when any of its items
+    matches.
+
+    Attributes:
+        extensions (tuple[frozenset[str], ...]):
+            Extension sets, matched against the last suffix or all the suffixes.
+        patterns (tuple[tuple[str, ...], ...]): Glob pattern sets for the name.
+        folders (tuple[tuple[str, ...], ...]): Normalized folder sets.
+        size_above (Optional[int]): The size must be strictly greater.
+        size_below (Optional[int]): The size must be strictly smaller.
+        mtime_after (Optional[float]): The mtime must be strictly greater.
+        mtime_before (Optional[float]): The mtime must be strictly smaller.
+        is_dir (Optional[bool]): Whether the entry must be a directory.
+    """
+
+    __slots__ = (
+        "extensions",
+        "patterns",
+        "folders",
+        "size_above",
+        "size_below",
+        "mtime_after",
+        "mtime_before",
+        "is_dir",
+    )
+
+    def __init__(
+        self,
+        extensions: Iterable[str] | None = None,
+        patterns: Iterable[str] | None = None,
+        folders: Iterable[Any] | None = None,
+        size_above: Optional[int] = None,
+        size_below: Optional[int] = None,
+        mtime_after: Optional[float] = None,
+        mtime_before: Optional[float] = None,
+        is_dir: Optional[bool] = None,
+    ) -> None:
+        """Initialize a Prefilter instance.
+
+        Args:
+            extensions (Iterable[str] | None):
+                Lowercase extensions with their leading dot. Defaults to None.
+            patterns (Iterable[str] | None): Glob patterns. Defaults to None.
+            folders (Iterable[Any] | None):
+                Folders the entry must be in. Defaults to None.
+            size_above (Optional[int]): Exclusive minimum size. Defaults to None.
+            size_below (Optional[int]): Exclusive maximum size. Defaults to None.
+            mtime_after (Optional[float]): Exclusive minimum mtime. Defaults to None.
+            mtime_before (Optional[float]):
+                Exclusive maximum mtime. Defaults to None.
+            is_dir (Optional[bool]):
+                Whether the entry must be a directory. Defaults to None.
+        """
+        self.extensions = (frozenset(extensions),) if extensions is not None else ()
+        self.patterns = (tuple(patterns),) if patterns is not None else ()
+        self.folders = (
+            (tuple(utils.normalize_path(folder) for folder in folders),)
+            if folders is not None
+            else ()
+        )
+        self.size_above = size_above
+        self.size_below = size_below
+        self.mtime_after = mtime_after
+        self.mtime_before = mtime_before
+        self.is_dir = is_dir
+
+    def intersect(self, other: "Prefilter") -> "Prefilter":
+        """Combine two prefilters, both must accept an entry.
+
+        Args:
+            other (Prefilter): The other prefilter.
+
+        Returns:
+            Prefilter: The combined prefilter.
+        """
+
+        def pick(a: Any, b: Any, choose: Any) -> Any:
+            return b if a is None else a if b is None else choose(a, b)
+
+        result = Prefilter()
+        result.extensions = self.extensions + other.extensions
+        result.patterns = self.patterns + other.patterns
+        result.folders = self.folders + other.folders
+        result.size_above = pick(self.size_above, other.size_above, max)
+        result.size_below = pick(self.size_below, other.size_below, min)
+        result.mtime_after = pick(self.mtime_after, other.mtime_after, max)
+        result.mtime_before = pick(self.mtime_before, other.mtime_before, min)
+        # Conflicting types cannot both be satisfied: keeping either one still
+        # accepts every entry accepted by both.
+        result.is_dir = pick(self.is_dir, other.is_dir, lambda a, b: a)
+        return result
+
+    @property
+    def accepts_all(self) -> bool:
+        """Whether the prefilter accepts every entry.
+
+        Returns:
+            bool: True if the prefilter has no constraint.
+        """
+        return all(getattr(self, name) in (None, ()) for name in self.__slots__)
+
+    def accepts(self, record: FileRecord, folder: str) -> bool:
+        """Check an entry against the prefilter.
+
+        Args:
+            record (FileRecord): The record of the entry.
+            folder (str): The normalized folder containing the entry.
+
+        Returns:
+            bool: False if no condition can accept the entry.
+        """
+        return (
+            self._accepts_stat(record)
+            and self._accepts_extensions(record)
+            and self._accepts_patterns(record)
+            and self._accepts_folders(record, folder)
+        )
+
+    def _accepts_stat(self, record: FileRecord) -> bool:
+        """Check the type, size and mtime of an entry.
+
+        Args:
+            record (FileRecord): The record of the entry.
+
+        Returns:
+            bool: False if the entry fails a type, size or mtime constraint.
+        """
+        if self.is_dir is not None and record.is_dir != self.is_dir:
+            return False
+        if self.size_above is not None and not record.size > self.size_above:
+            return False
+        if self.size_below is not None and not record.size < self.size_below:
+            return False
+        if self.mtime_after is not None and not record.mtime > self.mtime_after:
+            return False
+        return self.mtime_before is None or record.mtime < self.mtime_before
+
+    def _accepts_extensions(self, record: FileRecord) -> bool:
+        """Check the extension of an entry against every extension set.
+
+        Args:
+            record (FileRecord): The record of the entry.
+
+        Returns:
+            bool: False if an extension set matches neither the last suffix nor
+            all the suffixes of the name.
+        """
+        if not self.extensions:
+            return True
+        name_suffixes = suffixes(record.name)
+        suffix = name_suffixes[-1].lower() if name_suffixes else ""
+        extension = "".join(name_suffixes).lower()
+        return all(
+            suffix in extensions or extension in extensions
+            for extensions in self.extensions
+        )
+
+    def _accepts_patterns(self, record: FileRecord) -> bool:
+        """Check the name of an entry against every pattern set.
+
+        Args:
+            record (FileRecord): The record of the entry.
+
+        Returns:
+            bool: False if no pattern of a set matches the name.
+        """
+        return all(
+            any(fnmatch.fnmatch(record.name, pattern) for pattern in patterns)
+            for patterns in self.patterns
+        )
+
+    def _accepts_folders(self, record: FileRecord, folder: str) -> bool:
+        """Check the location of an entry against every folder set.
+
+        Args:
+            record (FileRecord): The record of the entry.
+            folder (str): The normalized folder containing the entry.
+
+        Returns:
+            bool: False if the entry is in no folder of a set.
+        """
+        if not self.folders:
+            return True
+        path = os.path.join(folder, os.path.normcase(record.name))
+        return all(
+            any(is_within(path, other) for other in folders) for folders in self.folders
+        )
+
+    def may_contain(self, folder: str) -> bool:
+        """Check if a folder may contain accepted entries.
+
+        Args:
+            folder (str): The normalized folder.
+
+        Returns:
+            bool: False if the whole folder can be skipped.
+        """
+        return all(
+            any(
+                is_within(folder, other) or is_within(other, folder)
+                for other in folders
+            )
+            for folders in self.folders
+        )
+
+
+def prefilter_of(conditions: list[Any]) -> Prefilter:
+    """Combine the prefilters of the conditions of a rule.
+
+    Args:
+        conditions (list[Any]): The conditions of the rule.
+
+    Returns:
+        Prefilter: The combined prefilter. Conditions without prefilter do not
+        restrict it.
+    """
+    result = Prefilter()
+    for condition in conditions:
+        prefilter = getattr(condition, "prefilter", None)
+        if callable(prefilter):
+            condition_prefilter = prefilter()
+            if condition_prefilter is not None:
+                result = result.intersect(condition_prefilter)
+    return result
+
+
+class PrefilterSet:
+    """Prefilters of several rules, an entry is kept if any of them accepts it.
+
+    Attributes:
+        prefilters (list[Prefilter]): The prefilters.
+    """
+
+    def __init__(self, prefilters: list[Prefilter]) -> None:
+        """Initialize a PrefilterSet instance.
+
+        Args:
+            prefilters (list[Prefilter]): The prefilters.
+        """
+        self.prefilters = prefilters
+
+    @property
+    def accepts_all(self) -> bool:
+        """Whether every entry is accepted.
+
+        Returns:
+            bool: True if any prefilter has no constraint.
+        """
+        return any(prefilter.accepts_all for prefilter in self.prefilters)
+
+    def accepts(self, record: FileRecord, folder: str) -> bool:
+        """Check an entry against the prefilters.
+
+        Args:
+            record (FileRecord): The record of the entry.
+            folder (str): The normalized folder containing the entry.
+
+        Returns:
+            bool: True if any prefilter accepts the entry.
+        """
+        return any(prefilter.accepts(record, folder) for prefilter in self.prefilters)
+
+    def may_contain(self, folder: str) -> bool:
+        """Check if a folder may contain accepted entries.
+
+        Args:
+            folder (str): The normalized folder.
+
+        Returns:
+            bool: False if the whole folder can be skipped.
+        """
+        return any(prefilter.may_contain(folder) for prefilter in self.prefilters)
@@ -0,0 +1,539 @@
+"""Compact file records.
+
+Implement FileRecord, a slotted representation of a directory entry, and
+RecordTable, which stores records along with their shared parent folders.
+
+Entries are identified by their device and inode packed in a single integer
+(see inode_key), so that sets of visited folders or processed files stay
+compact over large trees.
+"""
+
+import os
+import stat
+from collections.abc import Iterable, Iterator
+
+from typing_extensions import TYPE_CHECKING, Literal, Optional, TypeAlias
+
+from . import utils
+from .backend import Backend, DirEntry, get_backend
+from .ppath import PathLike, PPath
+
+if TYPE_CHECKING:  # pragma: no cover
+    from .prefilter import PrefilterSet
+
+FLAG_DIR = 1
+FLAG_SYMLINK = 2
+FLAG_PLANNED_DELETE = 4
+
+SymlinksStr: TypeAlias = Literal["keep", "follow", "ignore"]
+"""How a scan handles symbolic links.
+
+- "keep": links are entries like the others, linked folders are not descended.
+- "follow": linked folders are descended, each folder at most once.
+- "ignore": links are skipped.
+"""
+
+
+def inode_key(dev: int, ino: int) -> int:
+    """Pack a device and an inode number in a single integer.
+
+    Args:
+        dev (int): The device.
+        ino (int): The inode number.
+
+    Returns:
+        int: The key, equal for all the links to the same inode.
+    """
+    return (dev << 64) | ino
+
+
+def unique_inodes(records: Iterable["FileRecord"]) -> Iterator["FileRecord"]:
+    """Skip the records of inodes that were already seen.
+
+    Args:
+        records (Iterable[FileRecord]): The records.
+
+    Yields:
+        FileRecord: The first record of every inode, for example the first
+        hard link of a file.
+    """
+    seen: set[int] = set()
+    for record in records:
+        key = inode_key(record.dev, record.ino)
+        if key not in seen:
+            seen.add(key)
+            yield record
+
+
+class FileRecord:
+    """Compact snapshot of a directory entry.
+
+    A record only stores the index of its parent folder in a RecordTable, its
+    name and the packed stat fields needed by the rules. A PPath is only built
+    when needed, with RecordTable.path.
+
+    Attributes:
+        parent (int): Index of the parent folder in the RecordTable.
+        name (str): The entry name.
+        size (int): The entry size in bytes.
+        mtime_ns (int): The entry modification time in nanoseconds.
+        mode (int): The entry mode, as returned by os.stat.
+        flags (int): A combination of the FLAG_* constants.
+        dev (int): The device of the entry.
+        ino (int): The inode number of the entry.
+    """
+
+    __slots__ = ("parent", "name", "size", "mtime_ns", "mode", "flags", "dev", "ino")
+
+    def __init__(
+        self,
+        parent: int,
+        name: str,
+        size: int = 0,
+        mtime_ns: int = 0,
+        mode: int = 0,
+        flags: int = 0,
+        dev: int = 0,
+        ino: int = 0,
+    ) -> None:
+        """Initialize a FileRecord instance.
+
+        Args:
+            parent (int): Index of the parent folder in the RecordTable.
+            name (str): The entry name.
+            size (int): The entry size in bytes. Defaults to 0.
+            mtime_ns (int): The modification time in nanoseconds. Defaults to 0.
+            mode (int): The entry mode. Defaults to 0.
+            flags (int): A combination of the FLAG_* constants. Defaults to 0.
+            dev (int): The device of the entry. Defaults to 0.
+            ino (int): The inode number of the entry. Defaults to 0.
+        """
+        self.parent = parent
+        self.name = name
+        self.size = size
+        self.mtime_ns = mtime_ns
+        self.mode = mode
+        self.flags = flags
+        self.dev = dev
+        self.ino = ino
+
+    @classmethod
+    def from_stat(cls, parent: int, name: str, st: os.stat_result) -> "FileRecord":
+        """Build a record from a stat result.
+
+        Args:
+            parent (int): Index of the parent folder in the RecordTable.
+            name (str): The entry name.
+            st (os.stat_result): The stat result of the entry.
+
+        Returns:
+            FileRecord: The new record.
+        """
+        flags = FLAG_DIR if stat.S_ISDIR(st.st_mode) else 0
+        return cls(
+            parent,
+            name,
+            st.st_size,
+            st.st_mtime_ns,
+            st.st_mode,
+            flags,
+            st.st_dev,
+            st.st_ino,
+        )
+
+    @classmethod
+    def from_entry(cls, parent: int, entry: DirEntry) -> "FileRecord":
+        """Build a record from an os.scandir (or Backend.scandir) entry.
+
+        The stat data of symbolic links is the one of their target. Broken
+        links, and link loops, keep the stat data of the link itself.
+
+        Args:
+            parent (int): Index of the parent folder in the RecordTable.
+            entry (DirEntry): The directory entry.
+
+        Returns:
+            FileRecord: The new record.
+        """
+        try:
+            st = entry.stat()
+        except OSError:
+            if not entry.is_symlink():
+                raise
+            st = entry.stat(follow_symlinks=False)
+        record = cls.from_stat(parent, entry.name, st)
+        if entry.is_symlink():
+            record.flags |= FLAG_SYMLINK
+        return record
+
+    def copy(self, parent: Optional[int] = None) -> "FileRecord":
+        """Copy the record.
+
+        Args:
+            parent (Optional[int]):
+                Index of the parent folder of the copy. Defaults to the parent
+                of the record.
+
+        Returns:
+            FileRecord: The new record.
+        """
+        return FileRecord(
+            self.parent if parent is None else parent,
+            self.name,
+            self.size,
+            self.mtime_ns,
+            self.mode,
+            self.flags,
+            self.dev,
+            self.ino,
+        )
+
+    @property
+    def identity(self) -> tuple[int, int, int, int]:
+        """Identify the content of the entry.
+
+        The identity changes whenever the entry is replaced or modified.
+
+        Returns:
+            tuple[int, int, int, int]: The device, inode, size and mtime.
+        """
+        return (self.dev, self.ino, self.size, self.mtime_ns)
+
+    @property
+    def inode(self) -> int:
+        """The device and inode of the entry, see inode_key.
+
+        Returns:
+            int: The packed device and inode.
+        """
+        return inode_key(self.dev, self.ino)
+
+    @property
+    def is_dir(self) -> bool:
+        """Whether the entry is a directory.
+
+        Returns:
+            bool: True if the entry is a directory, False otherwise.
+        """
+        return bool(self.flags & FLAG_DIR)
+
+    @property
+    def is_symlink(self) -> bool:
+        """Whether the entry is a symbolic link.
+
+        Returns:
+            bool: True if the entry is a symbolic link, False otherwise.
+        """
+        return bool(self.flags & FLAG_SYMLINK)
+
+    @property
+    def planned_delete(self) -> bool:
+        """Whether the entry is planned for deletion.
+
+        Returns:
+            bool: True if the entry is planned for deletion, False otherwise.
+        """
+        return bool(self.flags & FLAG_PLANNED_DELETE)
+
+    @property
+    def mtime(self) -> float:
+        """The modification time in seconds.
+
+        Returns:
+            float: The modification time in seconds since the epoch.
+        """
+        return self.mtime_ns / 1e9
+
+    def __repr__(self) -> str:
+        """Return the representation of the record.
+
+        Returns:
+            str: The representation of the record.
+        """
+        return (
+            f"FileRecord(parent={self.parent}, name={self.name!r}, "
+            f"size={self.size}, mtime_ns={self.mtime_ns}, flags={self.flags})"
+        )
+
+
+class RecordTable:
+    """Table of FileRecord sharing their parent folders.
+
+    Parent folders are stored once, records only keep their index. This keeps
+    the memory used per queued entry small, even for millions of entries.
+
+    Attributes:
+        parents (list[str]): The parent folders of the records.
+        records (list[FileRecord]): The stored records.
+    """
+
+    def __init__(self) -> None:
+        """Initialize an empty RecordTable instance."""
+        self.parents: list[str] = []
+        self.records: list[FileRecord] = []
+        self._parent_index: dict[str, int] = {}
+
+    def add_parent(self, folder: PathLike) -> int:
+        """Register a parent folder.
+
+        Args:
+            folder (PathLike): The parent folder.
+
+        Returns:
+            int: The index of the folder in the table.
+        """
+        folder = os.fspath(folder)
+        index = self._parent_index.get(folder)
+        if index is None:
+            index = self._parent_index[folder] = len(self.parents)
+            self.parents.append(folder)
+        return index
+
+    def add(self, record: FileRecord) -> FileRecord:
+        """Store a record in the table.
+
+        Args:
+            record (FileRecord): The record to store.
+
+        Returns:
+            FileRecord: The stored record.
+        """
+        self.records.append(record)
+        return record
+
+    def scan(
+        self,
+        folder: PathLike,
+        store: bool = True,
+        recursive: bool = False,
+        prefilter: "Optional[PrefilterSet]" = None,
+        batch_size: int = 0,
+        symlinks: SymlinksStr = "keep",
+    ) -> Iterator[FileRecord]:
+        """Scan the entries of a folder, with the current backend.
+
+        Broken symbolic links are kept, with the stat data of the link itself.
+        Entries removed while the folder is listed are skipped.
+
+        Args:
+            folder (PathLike): The folder to scan.
+            store (bool):
+                If True, the records are kept in the table. Otherwise they are
+                only yielded. Defaults to True.
+            recursive (bool):
+                If True, sub-folders are scanned too, and only the entries that
+                are not folders are yielded. Defaults to False.
+            prefilter (Optional[PrefilterSet]):
+                If given, entries it rejects are skipped, and so are the
+                sub-folders that cannot contain accepted entries.
+                Defaults to None.
+            batch_size (int):
+                If positive, the prefilter is evaluated over blocks of this many
+                entries with NumPy, see pyfileflow.batch. Accepted entries are
+                then yielded once their block is full. Defaults to 0.
+            symlinks (SymlinksStr):
+                How symbolic links are handled, see SymlinksStr. When following
+                them, the visited folders are tracked by inode, so that links
+                to a parent folder do not make the scan endless.
+                Defaults to "keep".
+
+        Yields:
+            FileRecord: A record for every (accepted) entry of the folder.
+        """
+        if prefilter is not None and prefilter.accepts_all:
+            prefilter = None
+        entries = self._walk(os.fspath(folder), recursive, prefilter, symlinks)
+        if prefilter is not None and batch_size:
+            yield from self._batched(entries, prefilter, batch_size, store)
+            return
+
+        for record, normalized in entries:
+            if prefilter is None or prefilter.accepts(record, normalized):
+                yield self.add(record) if store else record
+
+    def _walk(
+        self,
+        folder: str,
+        recursive: bool,
+        prefilter: "Optional[PrefilterSet]",
+        symlinks: SymlinksStr,
+    ) -> Iterator[tuple[FileRecord, str]]:
+        """Walk a folder, see `scan`.
+
+        Args:
+            folder (str): The folder to scan.
+            recursive (bool): If True, sub-folders are scanned too.
+            prefilter (Optional[PrefilterSet]): The prefilter, if any.
+            symlinks (SymlinksStr): How symbolic links are handled.
+
+        Yields:
+            tuple[FileRecord, str]: The record of every entry that is not a
+            descended folder, and its normalized folder ("" without prefilter).
+        """
+        backend = get_backend()
+        folders = [folder]
+        visited: set[int] = set()
+        if symlinks == "follow":
+            st = backend.stat(folder)
+            visited.add(inode_key(st.st_dev, st.st_ino))
+        while folders:
+            current = folders.pop()
+            parent = self.add_parent(current)
+            normalized = utils.normalize_path(current) if prefilter is not None else ""
+
+            for record in self._list(backend, current, parent, symlinks):
+                if not (recursive and record.is_dir):
+                    yield record, normalized
+                elif self._descend(record, normalized, prefilter, symlinks, visited):
+                    folders.append(os.path.join(current, record.name))
+
+    @staticmethod
+    def _descend(
+        record: FileRecord,
+        normalized: str,
+        prefilter: "Optional[PrefilterSet]",
+        symlinks: SymlinksStr,
+        visited: set[int],
+    ) -> bool:
+        """Decide whether a recursive scan descends into a folder.
+
+        Args:
+            record (FileRecord): The record of the folder.
+            normalized (str): The normalized folder containing the folder.
+            prefilter (Optional[PrefilterSet]): The prefilter, if any.
+            symlinks (SymlinksStr): How symbolic links are handled.
+            visited (set[int]):
+                The inodes of the folders already descended when following
+                links, updated with the folder.
+
+        Returns:
+            bool: False if the folder is a link that is not followed, cannot
+            contain entries accepted by the prefilter, or was already visited.
+        """
+        if record.is_symlink and symlinks != "follow":
+            return False
+        if prefilter is not None and not prefilter.may_contain(
+            os.path.join(normalized, os.path.normcase(record.name))
+        ):
+            return False
+        if symlinks == "follow":
+            if record.inode in visited:
+                return False
+            visited.add(record.inode)
+        return True
+
+    def _batched(
+        self,
+        entries: Iterable[tuple[FileRecord, str]],
+        prefilter: "PrefilterSet",
+        batch_size: int,
+        store: bool,
+    ) -> Iterator[FileRecord]:
+        """Evaluate a prefilter over blocks of scanned records.
+
+        Args:
+            entries (Iterable[tuple[FileRecord, str]]):
+                The records, with their normalized folder.
+            prefilter (PrefilterSet): The prefilter.
+            batch_size (int): The number of records evaluated together.
+            store (bool): If True, the accepted records are kept in the table.
+
+        Yields:
+            FileRecord: The accepted records, once their block is full.
+        """
+        block: list[FileRecord] = []
+        block_folders: list[str] = []
+        for record, normalized in entries:
+            block.append(record)
+            block_folders.append(normalized)
+            if len(block) >= batch_size:
+                yield from self._accepted(block, block_folders, prefilter, store)
+                block, block_folders = [], []
+        if block:
+            yield from self._accepted(block, block_folders, prefilter, store)
+
+    @staticmethod
+    def _list(
+        backend: Backend, folder: str, parent: int, symlinks: SymlinksStr
+    ) -> list[FileRecord]:
+        """List the entries of a folder at once.
+
+        The whole folder is listed before any of its entries is processed, so
+        that the files created by the rules in the folder are not processed too.
+        Only the records are kept, not the directory entries, which are several
+        times larger.
+
+        Args:
+            backend (Backend): The file system backend.
+            folder (str): The folder.
+            parent (int): Index of the folder in the table.
+            symlinks (SymlinksStr): How symbolic links are handled.
+
+        Returns:
+            list[FileRecord]: The records of the entries.
+        """
+        listing = []
+        with backend.scandir(folder) as entries:
+            for entry in entries:
+                if symlinks == "ignore" and entry.is_symlink():
+                    continue
+                try:
+                    listing.append(FileRecord.from_entry(parent, entry))
+                except FileNotFoundError:
+                    # Removed since the folder was listed.
+                    continue
+        return listing
+
+    def _accepted(
+        self,
+        records: list[FileRecord],
+        folders: list[str],
+        prefilter: "PrefilterSet",
+        store: bool,
+    ) -> Iterator[FileRecord]:
+        """Evaluate a prefilter over a block of scanned records.
+
+        Args:
+            records (list[FileRecord]): The records.
+            folders (list[str]): The normalized folder of each record.
+            prefilter (PrefilterSet): The prefilter.
+            store (bool): If True, the accepted records are kept in the table.
+
+        Yields:
+            FileRecord: The accepted records.
+        """
+        from .batch import accepted
+
+        for record in accepted(records, folders, prefilter):
+            yield self.add(record) if store else record
+
+    def path(self, record: FileRecord) -> PPath:
+        """Materialise the PPath of a record.
+
+        Args:
+            record (FileRecord): The record.
+
+        Returns:
+            PPath: The path of the record, carrying the record's stat data.
+        """
+        path = PPath(self.parents[record.parent], record.name)
+        path._record = record
+        if record.planned_delete:
+            path.plan_delete()
+        return path
+
+    def __iter__(self) -> Iterator[FileRecord]:
+        """Iterate over the stored records.
+
+        Returns:
+            Iterator[FileRecord]: An iterator over the stored records.
+        """
+        return iter(self.records)
+
+    def __len__(self) -> int:
+        """Return the number of stored records.
+
+        Returns:
+            int: The number of stored records.
+        """
+        return len(self.records)
@@ -3,13 +3,36 @@
 Implement classes for all rules in pyfileflow.
 """
 
-import shutil
+import os
+from concurrent.futures import ThreadPoolExecutor
 from types import TracebackType
 
-from typing_extensions import Any, Callable, Literal, Optional, Self, TypeAlias, Union
-
-from . import utils
+from typing_extensions import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Iterable,
+    Literal,
+    Optional,
+    Self,
+    TypeAlias,
+    Union,
+)
+
+from . import transfer, utils
+from .adaptive import AdaptiveConditions
+from .archive import ArchiveFormat, ArchiveWriter, Compression
+from .backend import get_backend
+from .compress import BLOCK_SIZE, SUFFIXES, CompressFormat, compress_file
 from .ppath import PathLike, PPath
+from .prefetch import prefetched
+from .prefilter import Prefilter, PrefilterSet, prefilter_of
+from .record import RecordTable, SymlinksStr, inode_key, unique_inodes
+
+if TYPE_CHECKING:  # pragma: no cover
+    from .index import MetadataIndex
+    from .prefetch import Prefetcher
+    from .workqueue import WorkQueue
 
 SortBy: TypeAlias = Callable[[PPath], Any]
 Condition: TypeAlias = Callable[[PPath], bool]
@@ -18,6 +41,10 @@ ActionStr: TypeAlias = Literal[
     "copy",
     "move",
     "copy_by_value",
+    "archive",
+    "compress",
+    "branch",
+    "switch",
 ]
 
 
@@ -34,6 +61,7 @@ class Rule:
         self,
         next: Optional["Rule"] = None,
         condition: Optional[Union[Condition, list[Condition]]] = None,
+        adaptive: bool = False,
     ) -> None:
         """Initialize a Rule instance.
 
@@ -42,6 +70,11 @@ class Rule:
             condition (Optional[Union[Condition, list[Condition]]]):
                 Conditions to apply the rule. Should return True if you want the
                 rule to be applied to files matching the condition, False otherwise.
+            adaptive (bool):
+                If True, the conditions are reordered while the rule runs, so that
+                cheap and selective conditions are evaluated first (see
+                pyfileflow.adaptive). Conditions must then not have side effects.
+                Defaults to False.
 
         Raises:
             TypeError: The next value is not a Rule instance or None
@@ -52,6 +85,7 @@ class Rule:
             raise TypeError("The next rule must be a Rule instance or None.")
 
         self.condition: list[Condition] = utils.parse_args(condition)
+        self.adaptive = AdaptiveConditions(self.condition) if adaptive else None
 
     def check_path(self, path: PPath) -> bool:
         """Check if a file path satisfies all conditions of the rule.
@@ -62,6 +96,8 @@ class Rule:
         Returns:
             bool: True if the file path satisfies the conditions, False otherwise.
         """
+        if self.adaptive is not None:
+            return self.adaptive(path)
         return all(condition(path) for condition in self.condition)
 
     def apply_rule(self, path: PPath) -> bool:  # pragma: no cover
@@ -82,20 +118,112 @@ class Rule:
             path (PathLike): The path of the file to be processed.
         """
         path = PPath(path) if not isinstance(path, PPath) else path
+        self._process_checked(path, self.check_path(path))
 
-        if self.check_path(path):
+    def _process_checked(self, path: PPath, matched: bool) -> None:
+        """Process a file whose conditions were already checked, see process_file.
+
+        Args:
+            path (PPath): The path of the file to be processed.
+            matched (bool): Whether the file satisfies the conditions of the rule.
+        """
+        if matched:
             self.apply_rule(path)
+        self._process_next(path)
+
+    def _process_next(self, path: PPath) -> None:
+        """Pass a file to the next rule, or end its processing.
 
+        Args:
+            path (PPath): The path of the file being processed.
+        """
         if self.next is not None:
             self.next.process_file(path)
         else:
             path.delete_if_planned()
 
-    def process(self, folder: PathLike) -> None:
+    def _process_claimed(self, path: PPath, queue: "WorkQueue", folder: PPath) -> None:
+        """Process a file if it can be claimed in a work queue.
+
+        Args:
+            path (PPath): The path of the file to be processed.
+            queue (WorkQueue): The work queue.
+            folder (PPath): The folder being processed.
+        """
+        key = queue.file_key(path, folder)
+        if not queue.claim(key):
+            return
+        try:
+            self.process_file(path)
+        except BaseException:
+            queue.release(key, done=False)
+            raise
+        queue.release(key)
+
+    def prefilter(self) -> Prefilter:
+        """Describe the entries this rule may apply to.
+
+        Returns:
+            Prefilter: The combined prefilter of the conditions of the rule.
+        """
+        return prefilter_of(self.condition)
+
+    def prefilters(self) -> list[Prefilter]:
+        """Describe the entries this rule and the next rules may apply to.
+
+        Returns:
+            list[Prefilter]: The prefilters of the rules of the chain.
+        """
+        prefilters = [self.prefilter()]
+        if self.next is not None:
+            prefilters += self.next.prefilters()
+        return prefilters
+
+    def process(
+        self,
+        folder: PathLike,
+        recursive: bool = False,
+        index: "Optional[MetadataIndex]" = None,
+        queue: "Optional[WorkQueue]" = None,
+        prefetch: "Optional[Prefetcher]" = None,
+        symlinks: SymlinksStr = "keep",
+        unique: bool = False,
+        batch_size: int = 0,
+    ) -> None:
         """Process all files in a folder using all rules.
 
+        Entries that no rule of the chain can apply to, according to the
+        prefilters of their conditions, are skipped without building a PPath,
+        and so are the sub-folders that cannot contain such entries.
+
         Args:
             folder (PathLike): The folder containing the files to be processed.
+            recursive (bool):
+                If True, the files of the sub-folders are processed too (the
+                sub-folders themselves are not). Defaults to False.
+            index (Optional[MetadataIndex]):
+                If given, the entries are queried from this index instead of
+                walking the folder. The index should be refreshed first.
+                Defaults to None.
+            queue (Optional[WorkQueue]):
+                If given, each file is only processed once it is claimed in
+                this queue, so that several workers can process the same folder.
+                Defaults to None.
+            prefetch (Optional[Prefetcher]):
+                If given, the next files are read ahead into the page cache while
+                the current one is processed. Defaults to None.
+            symlinks (SymlinksStr):
+                How symbolic links are handled, see SymlinksStr. Linked folders
+                can only be followed when walking the folder, not with an index.
+                Defaults to "keep".
+            unique (bool):
+                If True, each inode is processed once: only the first hard link
+                of a file, or the first link to it, is processed. Defaults to False.
+            batch_size (int):
+                If positive and NumPy is installed, the prefilters are evaluated
+                over blocks of this many entries when walking the folder, see
+                pyfileflow.batch. The first file is then only processed once its
+                block is full. Defaults to 0.
 
         Raises:
             NotADirectoryError: If the provided path is not a directory.
@@ -105,8 +233,71 @@ class Rule:
         if not folder.is_dir():
             raise NotADirectoryError("The path to process must be a directory.")
 
-        for path in folder.iterdir():  # pragma: no branch
-            self.process_file(path)
+        table = RecordTable()
+        prefilter = PrefilterSet(self.prefilters())
+        if index is not None:
+            records = index.scan(table, folder, recursive, prefilter, symlinks)
+        else:
+            if batch_size:
+                from . import batch
+
+                batch_size = batch_size if batch.available() else 0
+            records = table.scan(
+                folder, False, recursive, prefilter, batch_size, symlinks
+            )
+        if unique:
+            records = unique_inodes(records)
+        paths = (table.path(record) for record in records)
+        self.process_paths(folder, paths, queue, prefetch)
+
+    def process_paths(
+        self,
+        folder: PPath,
+        paths: Iterable[PPath],
+        queue: "Optional[WorkQueue]" = None,
+        prefetch: "Optional[Prefetcher]" = None,
+    ) -> None:
+        """Process some files of a folder using all rules, see `process`.
+
+        Args:
+            folder (PPath): The folder being processed.
+            paths (Iterable[PPath]): The files of the folder to process.
+            queue (Optional[WorkQueue]):
+                If given, each file is only processed once it is claimed in
+                this queue. Defaults to None.
+            prefetch (Optional[Prefetcher]):
+                If given, the next files are read ahead into the page cache while
+                the current one is processed. Defaults to None.
+        """
+        self.open(folder)
+        try:
+            for path in prefetched(paths, prefetch):  # pragma: no branch
+                if queue is None:
+                    self.process_file(path)
+                else:
+                    self._process_claimed(path, queue, folder)
+        finally:
+            self.close()
+
+    def open(self, folder: PPath) -> None:
+        """Prepare the rule and the next rules to process a folder.
+
+        Called at the start of `process`.
+
+        Args:
+            folder (PPath): The folder being processed.
+        """
+        if self.next is not None:
+            self.next.open(folder)
+
+    def close(self) -> None:
+        """Finish the pending work of the rule and of the next rules.
+
+        Called at the end of `process`, and when leaving the context manager.
+        Rules doing work in the background wait for it here.
+        """
+        if self.next is not None:
+            self.next.close()
 
     def __enter__(self) -> Self:
         """Context manager entry point.
@@ -129,6 +320,7 @@ class Rule:
             v (BaseException | None): The exception instance, if raised.
             tb (TracebackType | None): Traceback information.
         """
+        self.close()
 
     def __eq__(self, other: Any) -> bool:  # pragma: no cover
         """Compare two Rule instances for equality.
@@ -169,6 +361,7 @@ class DeleteRule(Rule):
         self,
         next: Rule | None = None,
         condition: Condition | list[Condition] | None = None,
+        adaptive: bool = False,
     ) -> None:
         """Initialize a DeleteRule instance.
 
@@ -177,8 +370,11 @@ class DeleteRule(Rule):
             condition (Optional[Union[Condition, list[Condition]]]):
                 Conditions to apply the rule. Should return True if you want the
                 rule to be applied to files matching the condition, False otherwise.
+            adaptive (bool):
+                If True, the conditions are reordered while the rule runs, see
+                Rule. Defaults to False.
         """
-        super().__init__(next, condition)
+        super().__init__(next, condition, adaptive)
 
     def apply_rule(self, path: PPath) -> bool:
         """Apply the delete rule to a file.
@@ -189,7 +385,9 @@ class DeleteRule(Rule):
         Returns:
             bool: Always returns False after deleting the file.
         """
-        path.delete() if self.next is None else path.plan_delete()
+        path.plan_delete()
+        if self.next is None:
+            path.delete_if_planned()
         return False
 
 
@@ -207,6 +405,12 @@ class CopyRule(Rule):
         next: Rule | None = None,
         condition: Condition | list[Condition] | None = None,
         destination: Optional[Union[PathLike, list[PathLike]]] = None,
+        verify: bool | str = False,
+        manifest: PathLike | None = None,
+        sync: bool | str = False,
+        delta_threshold: int | str | None = transfer.DELTA_THRESHOLD,
+        hardlinks: bool = False,
+        adaptive: bool = False,
     ) -> None:
         """Initialize a Rule instance.
 
@@ -217,14 +421,49 @@ class CopyRule(Rule):
                 rule to be applied to files matching the condition, False otherwise.
             destination (Optional[Union[PathLike, list[PathLike]]]):
                 The destination in which the file should be copied.
+            verify (bool | str):
+                If True, or the name of a hashlib algorithm, every copy is hashed
+                while written, and read back once to check it ("sha256" if True).
+                Defaults to False.
+            manifest (PathLike | None):
+                A file in which the digests of the verified copies are recorded.
+                Defaults to None.
+            sync (bool | str):
+                If True, destinations with the same size and modification time
+                as the file are skipped. If the name of a hashlib algorithm,
+                destinations with the same size and digest are skipped. Copies
+                keep the modification time of the file. Defaults to False.
+            delta_threshold (int | str | None):
+                When synchronising, outdated destinations at least this large,
+                in bytes or as a string like "64MB", are updated in place with a
+                delta transfer. If None, they are copied again. Defaults to 64 MiB.
+            hardlinks (bool):
+                If True, the files with several hard links are only copied once:
+                the next links are created as hard links to the first copy, if
+                it is on the same file system. Defaults to False.
+            adaptive (bool):
+                If True, the conditions are reordered while the rule runs, see
+                Rule. Defaults to False.
         """
-        super().__init__(next, condition)
+        super().__init__(next, condition, adaptive)
 
         self.destination: list[PPath] = [
             PPath(path) if not isinstance(path, PPath) else path
             for path in utils.parse_args(destination)
         ]
 
+        self.verify: str | None = (
+            "sha256" if verify is True else (verify if verify else None)
+        )
+        self.manifest = transfer.Manifest(manifest) if manifest is not None else None
+        self.sync: str | None = "mtime" if sync is True else (sync if sync else None)
+        self.delta_threshold = (
+            utils.parse_size(delta_threshold) if delta_threshold is not None else None
+        )
+        self.hardlinks = hardlinks
+        # The copies of the files with several links, by inode (see inode_key).
+        self._links: dict[int, list[PPath]] = {}
+
     def apply_rule(self, path: PPath) -> bool:
         """Apply the copy rule to a file.
 
@@ -234,10 +473,135 @@ class CopyRule(Rule):
         Returns:
             bool: Always returns True after copying the file.
         """
-        for destination in self.destination:
-            shutil.copy(path, destination)
+        key = None
+        links = None
+        if self.hardlinks:
+            st = path.stat()
+            if st.st_nlink > 1:
+                key = inode_key(st.st_dev, st.st_ino)
+                links = self._links.get(key)
+
+        copies = []
+        for index, destination in enumerate(self.destination):
+            if links is not None:
+                target = transfer.target_path(path, destination)
+                if transfer.link(links[index], target):
+                    copies.append(target)
+                    continue
+            copies.append(
+                transfer.copy(
+                    path,
+                    destination,
+                    self.verify,
+                    self.manifest,
+                    self.sync,
+                    self.delta_threshold,
+                )
+            )
+
+        if key is not None and links is None:
+            self._links[key] = copies
         return True  # pragma: no cover
 
+    def close(self) -> None:
+        """Forget the copies of the linked files, and close the next rules."""
+        self._links.clear()
+        super().close()
+
+
+class CompressRule(Rule):
+    """A rule for writing compressed copies of files.
+
+    Large files are split in blocks compressed concurrently on a thread pool,
+    and written as multi-member gzip or multi-stream xz files.
+
+    Attributes:
+        action (ActionStr): The rule type. (here action = "compress").
+    """
+
+    action = "compress"
+
+    def __init__(
+        self,
+        next: Rule | None = None,
+        condition: Condition | list[Condition] | None = None,
+        destination: Optional[Union[PathLike, list[PathLike]]] = None,
+        format: CompressFormat = "gzip",
+        level: int = 6,
+        block_size: int | str = BLOCK_SIZE,
+        workers: int | None = None,
+        adaptive: bool = False,
+    ) -> None:
+        """Initialize a compress rule instance.
+
+        Args:
+            next (Optional[Rule]): The next rule in the processing chain.
+            condition (Optional[Union[Condition, list[Condition]]]):
+                Conditions to apply the rule. Should return True if you want the
+                rule to be applied to files matching the condition, False otherwise.
+            destination (Optional[Union[PathLike, list[PathLike]]]):
+                The folders in which the compressed files are written.
+            format (CompressFormat): The format, "gzip" or "xz". Defaults to "gzip".
+            level (int): The compression level. Defaults to 6.
+            block_size (int | str):
+                The size of the blocks, in bytes or as a string like "4MB". Files
+                no larger than a block are compressed at once. Defaults to 4 MiB.
+            workers (int | None):
+                The number of compression threads. Defaults to the number of CPUs.
+            adaptive (bool):
+                If True, the conditions are reordered while the rule runs, see
+                Rule. Defaults to False.
+
+        Raises:
+            ValueError: The format is unknown.
+        """
+        super().__init__(next, condition, adaptive)
+
+        if format not in SUFFIXES:
+            raise ValueError(f"Unknown compression format: {format!r}.")
+
+        self.destination: list[PPath] = [
+            PPath(path) if not isinstance(path, PPath) else path
+            for path in utils.parse_args(destination)
+        ]
+        self.format = format
+        self.level = level
+        self.block_size = utils.parse_size(block_size)
+        self.workers = workers
+
+        self._executor: ThreadPoolExecutor | None = None
+
+    def apply_rule(self, path: PPath) -> bool:
+        """Apply the compress rule to a file.
+
+        Args:
+            path (PPath): The path of the file to apply the rule to.
+
+        Returns:
+            bool: Always returns True because the original file is not deleted.
+        """
+        if self._executor is None and path.record.size > self.block_size:
+            self._executor = ThreadPoolExecutor(self.workers or os.cpu_count())
+
+        for destination in self.destination:
+            compress_file(
+                path,
+                destination / (path.name + SUFFIXES[self.format]),
+                self.format,
+                self.level,
+                self.block_size,
+                self._executor,
+                self.workers,
+            )
+        return True
+
+    def close(self) -> None:
+        """Stop the compression threads."""
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+        super().close()
+
 
 class MoveRule(Rule):
     """A rule for moving files.
@@ -253,6 +617,9 @@ class MoveRule(Rule):
         next: Rule | None = None,
         condition: Condition | list[Condition] | None = None,
         destination: Optional[Union[PathLike, list[PathLike]]] = None,
+        verify: bool | str = False,
+        manifest: PathLike | None = None,
+        adaptive: bool = False,
     ) -> None:
         """Initialize a Rule instance.
 
@@ -263,14 +630,29 @@ class MoveRule(Rule):
                 rule to be applied to files matching the condition, False otherwise.
             destination (Optional[Union[PathLike, list[PathLike]]]):
                 The destination in which the file should be moved.
+            verify (bool | str):
+                If True, or the name of a hashlib algorithm, every copy is hashed
+                while written, and read back once to check it ("sha256" if True).
+                Defaults to False.
+            manifest (PathLike | None):
+                A file in which the digests of the verified copies are recorded.
+                Defaults to None.
+            adaptive (bool):
+                If True, the conditions are reordered while the rule runs, see
+                Rule. Defaults to False.
         """
-        super().__init__(next, condition)
+        super().__init__(next, condition, adaptive)
 
         self.destination: list[PPath] = [
             PPath(path) if not isinstance(path, PPath) else path
             for path in utils.parse_args(destination)
         ]
 
+        self.verify: str | None = (
+            "sha256" if verify is True else (verify if verify else None)
+        )
+        self.manifest = transfer.Manifest(manifest) if manifest is not None else None
+
     def apply_rule(self, path: PPath) -> bool:
         """Apply the move rule to a file.
 
@@ -281,9 +663,11 @@ class MoveRule(Rule):
             bool: Always returns False after moving the file.
         """
         for destination in self.destination:
-            shutil.copy(path, destination / path.name)
+            transfer.copy(path, destination / path.name, self.verify, self.manifest)
 
-        path.delete() if self.next is None else path.plan_delete()
+        path.plan_delete()
+        if self.next is None:
+            path.delete_if_planned()
         return False
 
 
@@ -305,6 +689,7 @@ class CopyByValueRule(Rule):
         destination: PathLike | list[PathLike] | None = None,
         sort_by: SortBy | None = None,
         skip_on_error: bool | type[BaseException] = False,
+        adaptive: bool = False,
     ) -> None:
         """Initialize a copy by value rule instance.
 
@@ -321,8 +706,11 @@ class CopyByValueRule(Rule):
                 If the function sort_by throws an error, does the program should
                 skip the file?
                 Default to False.
+            adaptive (bool):
+                If True, the conditions are reordered while the rule runs, see
+                Rule. Defaults to False.
         """
-        super().__init__(next, condition)
+        super().__init__(next, condition, adaptive)
 
         self.destination: list[PPath] = [
             PPath(path) if not isinstance(path, PPath) else path
@@ -366,6 +754,270 @@ class CopyByValueRule(Rule):
             folder = PPath((destination / folder_name))
             folder.mkdir(exist_ok=True)
 
-            shutil.copy(path, folder)
+            get_backend().copy(path, folder)
+
+        return True
+
+
+class ArchiveRule(Rule):
+    """A rule for packing files into rolling tar or zip archives.
+
+    Files are written by a background thread, see ArchiveWriter. Archives are
+    completed when the rule is closed (at the end of `process`, or when leaving
+    the context manager). Files are named in the archives by their path
+    relative to the processed folder.
+
+    Attributes:
+        action (ActionStr): The rule type. (here action = "archive").
+    """
+
+    action = "archive"
 
+    def __init__(
+        self,
+        next: Rule | None = None,
+        condition: Condition | list[Condition] | None = None,
+        destination: PathLike | None = None,
+        format: ArchiveFormat = "tar",
+        compression: Compression = None,
+        max_size: int | str | None = None,
+        max_count: int | None = None,
+        remove_source: bool = False,
+        prefix: str = "archive",
+        adaptive: bool = False,
+    ) -> None:
+        """Initialize an archive rule instance.
+
+        Args:
+            next (Optional[Rule]): The next rule in the processing chain.
+            condition (Optional[Union[Condition, list[Condition]]]):
+                Conditions to apply the rule. Should return True if you want the
+                rule to be applied to files matching the condition, False otherwise.
+            destination (PathLike | None):
+                The folder in which the archives are written.
+            format (ArchiveFormat): The archive format, "tar" or "zip".
+                Defaults to "tar".
+            compression (Compression):
+                The compression, "gz", "bz2", "xz" or None. Defaults to None.
+            max_size (int | str | None):
+                The maximum total size of the files in an archive, in bytes or as
+                a string like "1GB". Defaults to None.
+            max_count (int | None):
+                The maximum number of files in an archive. Defaults to None.
+            remove_source (bool):
+                If True, the files are deleted once archived. Defaults to False.
+            prefix (str): The prefix of the archive names. Defaults to "archive".
+            adaptive (bool):
+                If True, the conditions are reordered while the rule runs, see
+                Rule. Defaults to False.
+        """
+        super().__init__(next, condition, adaptive)
+
+        self.destination = PPath(destination if destination is not None else ".")
+        self.format = format
+        self.compression = compression
+        self.max_size = utils.parse_size(max_size) if max_size is not None else None
+        self.max_count = max_count
+        self.remove_source = remove_source
+        self.prefix = prefix
+
+        self._writer: ArchiveWriter | None = None
+        self._root: PPath | None = None
+        self._make_writer()  # Check the options early.
+
+    @property
+    def skipped(self) -> list[tuple[PPath, OSError]]:
+        """The files that could not be archived, with the error.
+
+        Returns:
+            list[tuple[PPath, OSError]]: The skipped files, see ArchiveWriter.
+        """
+        return self._writer.skipped if self._writer is not None else []
+
+    def _make_writer(self) -> ArchiveWriter:
+        """Build the archive writer of the rule.
+
+        Returns:
+            ArchiveWriter: The archive writer.
+        """
+        return ArchiveWriter(
+            self.destination,
+            self.format,
+            self.compression,
+            self.max_size,
+            self.max_count,
+            self.prefix,
+        )
+
+    def apply_rule(self, path: PPath) -> bool:
+        """Apply the archive rule to a file.
+
+        Args:
+            path (PPath): The path of the file to apply the rule to.
+
+        Returns:
+            bool: False if the file will be deleted once archived, True otherwise.
+        """
+        if self._writer is None:
+            self._writer = self._make_writer()
+
+        name = None
+        if self._root is not None and path.is_relative_to(self._root):
+            name = path.relative_to(self._root).as_posix()
+
+        if self.remove_source:
+            path.plan_delete()
+        self._writer.add(path, name)
+        return not self.remove_source
+
+    def open(self, folder: PPath) -> None:
+        """Name the archived files by their path relative to the folder.
+
+        Args:
+            folder (PPath): The folder being processed.
+        """
+        self._root = folder
+        super().open(folder)
+
+    def close(self) -> None:
+        """Complete the current archive, and delete the archived files if needed."""
+        try:
+            if self._writer is not None:
+                self._writer.close()
+        finally:
+            self._root = None
+            super().close()
+
+
+class BranchRule(Rule):
+    """A rule passing files to several independent rule chains.
+
+    Every branch gets every file, in turn, during the same traversal. Each
+    branch has its own deletion plan: a branch deleting or moving a file does
+    not hide it from the other branches, and the file is only deleted once all
+    the branches and the next rules processed it.
+
+    Attributes:
+        action (ActionStr): The rule type. (here action = "branch").
+    """
+
+    action = "branch"
+
+    def __init__(
+        self,
+        next: Rule | None = None,
+        condition: Condition | list[Condition] | None = None,
+        branches: list[Rule] | None = None,
+        adaptive: bool = False,
+    ) -> None:
+        """Initialize a BranchRule instance.
+
+        Args:
+            next (Optional[Rule]): The next rule in the processing chain.
+            condition (Optional[Union[Condition, list[Condition]]]):
+                Conditions to apply the rule. Should return True if you want the
+                rule to be applied to files matching the condition, False otherwise.
+            branches (list[Rule] | None): The first rule of each branch.
+            adaptive (bool):
+                If True, the conditions are reordered while the rule runs, see
+                Rule. Defaults to False.
+
+        Raises:
+            TypeError: A branch is not a Rule instance.
+        """
+        super().__init__(next, condition, adaptive)
+
+        self.branches: list[Rule] = list(branches) if branches is not None else []
+        if not all(isinstance(branch, Rule) for branch in self.branches):
+            raise TypeError("The branches must be Rule instances.")
+
+    def _process_checked(self, path: PPath, matched: bool) -> None:
+        """Process a file using the branches, then call the next rule.
+
+        The deletion of the file is held until the next rules processed it.
+
+        Args:
+            path (PPath): The path of the file to be processed.
+            matched (bool): Whether the file satisfies the conditions of the rule.
+        """
+        path.hold_delete()
+        try:
+            super()._process_checked(path, matched)
+        finally:
+            path.release_delete()
+
+    def apply_rule(self, path: PPath) -> bool:
+        """Pass a file to every branch.
+
+        Args:
+            path (PPath): The path of the file to apply the rule to.
+
+        Returns:
+            bool: Always returns True, as the deletion is only planned.
+        """
+        for branch in self.branches:
+            branch.process_file(path.branch())
+        return True
+
+    def prefilters(self) -> list[Prefilter]:
+        """Describe the entries the branches and the next rules may apply to.
+
+        Returns:
+            list[Prefilter]: The prefilters of the rules of the branches,
+            restricted by the conditions of this rule, and of the next rules.
+        """
+        own = self.prefilter()
+        prefilters = [
+            own.intersect(prefilter)
+            for branch in self.branches
+            for prefilter in branch.prefilters()
+        ]
+        if self.next is not None:
+            prefilters += self.next.prefilters()
+        return prefilters
+
+    def open(self, folder: PPath) -> None:
+        """Prepare the branches and the next rules to process a folder.
+
+        Args:
+            folder (PPath): The folder being processed.
+        """
+        for branch in self.branches:
+            branch.open(folder)
+        super().open(folder)
+
+    def close(self) -> None:
+        """Finish the pending work of the branches and of the next rules."""
+        for branch in self.branches:
+            branch.close()
+        super().close()
+
+
+class SwitchRule(BranchRule):
+    """A rule passing each file to the first matching rule chain.
+
+    A file goes to the first branch whose first rule's conditions it satisfies,
+    and is processed by this branch like by any rule chain, without checking
+    these conditions again. A branch starting with a rule without conditions
+    matches every file, and can be used as a default.
+
+    Attributes:
+        action (ActionStr): The rule type. (here action = "switch").
+    """
+
+    action = "switch"
+
+    def apply_rule(self, path: PPath) -> bool:
+        """Pass a file to the first matching branch.
+
+        Args:
+            path (PPath): The path of the file to apply the rule to.
+
+        Returns:
+            bool: Always returns True, as the deletion is only planned.
+        """
+        for branch in self.branches:
+            if branch.check_path(path):
+                branch._process_checked(path.branch(), True)
+                break
         return True
@@ -0,0 +1,379 @@
+"""Tree snapshots.
+
+Implement Snapshot, a compact and serialisable state of a folder tree built
+from the stat data of the current backend (see pyfileflow.backend), and the diff
+of two snapshots.
+
+Taking a snapshot from a previous one only lists again the folders whose
+modification time changed. A folder's modification time does not change when a
+file is modified in place, so such a snapshot only catches modifications of the
+entries of the listed folders.
+"""
+
+import marshal
+import os
+import time
+from collections.abc import Iterator
+
+from typing_extensions import NamedTuple, Optional, TypeAlias
+
+from .backend import get_backend
+from .index import RACY_NS
+from .ppath import PathLike, PPath
+from .record import (
+    FLAG_DIR,
+    FLAG_SYMLINK,
+    FileRecord,
+    RecordTable,
+    SymlinksStr,
+    unique_inodes,
+)
+
+SNAPSHOT_VERSION = 1
+
+Entry: TypeAlias = tuple[int, int, int, int, int, int]
+"""The size, mtime_ns, mode, flags, dev and ino of an entry."""
+
+Folder: TypeAlias = tuple[Optional[int], dict[str, Entry]]
+"""The trusted modification time of a folder, and its entries by name."""
+
+
+def _is_folder(entry: Entry) -> bool:
+    """Check if an entry is a folder to descend into.
+
+    Args:
+        entry (Entry): The entry.
+
+    Returns:
+        bool: True if the entry is a folder, and not a symbolic link.
+    """
+    return entry[3] & (FLAG_DIR | FLAG_SYMLINK) == FLAG_DIR
+
+
+def _diff_entries(
+    relative: str, old: dict[str, Entry], new: dict[str, Entry]
+) -> tuple[dict[str, Entry], dict[str, Entry], dict[str, Entry]]:
+    """Compare the entries of a folder in two snapshots.
+
+    Args:
+        relative (str): The path of the folder, relative to the root.
+        old (dict[str, Entry]): The entries of the folder in the first snapshot.
+        new (dict[str, Entry]): The entries of the folder in the later snapshot.
+
+    Returns:
+        tuple[dict[str, Entry], dict[str, Entry], dict[str, Entry]]: The added,
+        removed and modified entries, by path relative to the root. Modified
+        entries have their new state.
+    """
+    added, removed, modified = {}, {}, {}
+    for name, entry in new.items():
+        path = os.path.join(relative, name)
+        previous = old.get(name)
+        if previous is None:
+            added[path] = entry
+        elif previous != entry and not (
+            # The changes of a folder are reported by its entries.
+            _is_folder(previous)
+            and _is_folder(entry)
+        ):
+            modified[path] = entry
+    for name, entry in old.items():
+        if name not in new:
+            removed[os.path.join(relative, name)] = entry
+    return added, removed, modified
+
+
+def _pair_renames(
+    added: dict[str, Entry], removed: dict[str, Entry]
+) -> list[tuple[str, str]]:
+    """Pair removed and added entries with the same inode as renames.
+
+    The paired entries are taken out of the added and removed entries.
+
+    Args:
+        added (dict[str, Entry]): The added entries, by path.
+        removed (dict[str, Entry]): The removed entries, by path.
+
+    Returns:
+        list[tuple[str, str]]: The renames, as (old, new) paths.
+    """
+    by_inode = {(entry[4], entry[5]): path for path, entry in removed.items()}
+    renamed = []
+    for path, entry in list(added.items()):
+        old_path = by_inode.pop((entry[4], entry[5]), None)
+        if old_path is not None:
+            renamed.append((old_path, path))
+            del removed[old_path]
+            del added[path]
+    return renamed
+
+
+class SnapshotDiff(NamedTuple):
+    """The changes between two snapshots of a tree.
+
+    Paths are relative to the root of the tree.
+
+    Attributes:
+        root (str): The root of the tree.
+        added (list[str]): The new entries.
+        removed (list[str]): The entries that no longer exist.
+        modified (list[str]): The entries whose content or metadata changed.
+        renamed (list[tuple[str, str]]):
+            The entries moved in the tree, as (old, new) paths, detected by their
+            inode.
+        records (dict[str, FileRecord]):
+            The new records of the added, modified and renamed entries.
+    """
+
+    root: str
+    added: list[str]
+    removed: list[str]
+    modified: list[str]
+    renamed: list[tuple[str, str]]
+    records: dict[str, FileRecord]
+
+    def __bool__(self) -> bool:
+        """Check if there is any change.
+
+        Returns:
+            bool: True if the tree changed.
+        """
+        return bool(self.added or self.removed or self.modified or self.renamed)
+
+    def changed(
+        self, symlinks: SymlinksStr = "keep", unique: bool = False
+    ) -> Iterator[PPath]:
+        """Iterate over the files to process again, for Rule.process_file.
+
+        The records of the diff are not modified: each path carries a copy.
+
+        Args:
+            symlinks (SymlinksStr):
+                How symbolic links are handled, see SymlinksStr. A snapshot does
+                not descend into linked folders, so they cannot be followed.
+                Defaults to "keep".
+            unique (bool):
+                If True, only the first path to each inode is yielded. Defaults
+                to False.
+
+        Yields:
+            PPath: The added, modified and renamed entries that are not folders,
+            carrying their snapshot stat data.
+
+        Raises:
+            ValueError: symlinks is "follow".
+        """
+        if symlinks == "follow":
+            raise ValueError("A snapshot cannot follow symbolic links.")
+
+        table = RecordTable()
+        parents: dict[str, int] = {}
+        records = []
+        paths = [*self.added, *self.modified, *(new for _, new in self.renamed)]
+        for relative in sorted(paths):
+            record = self.records[relative]
+            if record.is_dir or (symlinks == "ignore" and record.is_symlink):
+                continue
+            folder = os.path.join(self.root, os.path.dirname(relative))
+            if folder not in parents:
+                parents[folder] = table.add_parent(folder)
+            records.append(record.copy(parents[folder]))
+
+        if unique:
+            records = list(unique_inodes(records))
+        for record in records:
+            yield table.path(record)
+
+
+class Snapshot:
+    """The state of a folder tree.
+
+    Attributes:
+        root (str): The absolute root of the tree.
+        recursive (bool): Whether the sub-folders are part of the snapshot.
+        folders (dict[str, Folder]):
+            The folders, by path relative to the root ("" for the root).
+    """
+
+    def __init__(
+        self,
+        root: PathLike,
+        recursive: bool = True,
+        folders: Optional[dict[str, Folder]] = None,
+    ) -> None:
+        """Initialize a Snapshot instance.
+
+        Args:
+            root (PathLike): The root of the tree.
+            recursive (bool):
+                Whether the sub-folders are part of the snapshot. Defaults to True.
+            folders (Optional[dict[str, Folder]]):
+                The folders, see the class attributes. Defaults to None.
+        """
+        self.root = os.path.abspath(root)
+        self.recursive = recursive
+        self.folders = folders if folders is not None else {}
+
+    @classmethod
+    def take(
+        cls,
+        root: PathLike,
+        recursive: bool = True,
+        previous: Optional["Snapshot"] = None,
+    ) -> "Snapshot":
+        """Take a snapshot of a tree.
+
+        Args:
+            root (PathLike): The root of the tree.
+            recursive (bool):
+                If True, the sub-folders are part of the snapshot. Defaults to True.
+            previous (Optional[Snapshot]):
+                A previous snapshot of the same tree. Its folders whose
+                modification time did not change are reused instead of being
+                listed again. Defaults to None.
+
+        Returns:
+            Snapshot: The snapshot.
+        """
+        snapshot = cls(root, recursive)
+        reusable = (
+            previous.folders
+            if previous is not None and previous.root == snapshot.root
+            else {}
+        )
+        start_ns = time.time_ns()
+
+        stack = [""]
+        while stack:
+            relative = stack.pop()
+            folder = os.path.join(snapshot.root, relative)
+            try:
+                mtime_ns = get_backend().stat(folder).st_mtime_ns
+                state = reusable.get(relative)
+                if state is None or state[0] != mtime_ns:
+                    racy = mtime_ns > start_ns - RACY_NS
+                    state = (None if racy else mtime_ns, cls._list(folder))
+            except (FileNotFoundError, NotADirectoryError):
+                # The folder was removed, or replaced by a file, while walking.
+                continue
+
+            snapshot.folders[relative] = state
+            if recursive:
+                stack.extend(
+                    os.path.join(relative, name)
+                    for name, entry in state[1].items()
+                    if _is_folder(entry)
+                )
+        return snapshot
+
+    @staticmethod
+    def _list(folder: str) -> dict[str, Entry]:
+        """List the entries of a folder.
+
+        Args:
+            folder (str): The folder.
+
+        Returns:
+            dict[str, Entry]: The entries, by name.
+        """
+        entries = {}
+        with get_backend().scandir(folder) as scanner:
+            for entry in scanner:
+                try:
+                    record = FileRecord.from_entry(0, entry)
+                except OSError:
+                    continue
+                entries[entry.name] = (
+                    record.size,
+                    record.mtime_ns,
+                    record.mode,
+                    record.flags,
+                    record.dev,
+                    record.ino,
+                )
+        return entries
+
+    def diff(self, other: "Snapshot") -> SnapshotDiff:
+        """Compare the snapshot with a later one of the same tree.
+
+        Folders whose state is shared with the later snapshot, because they were
+        reused by Snapshot.take, are not compared.
+
+        Args:
+            other (Snapshot): The later snapshot.
+
+        Returns:
+            SnapshotDiff: The changes from this snapshot to the other one.
+        """
+        added: dict[str, Entry] = {}
+        removed: dict[str, Entry] = {}
+        modified: dict[str, Entry] = {}
+
+        for relative in self.folders.keys() | other.folders.keys():
+            old = self.folders.get(relative)
+            new = other.folders.get(relative)
+            if old is new:
+                continue
+            old_entries = old[1] if old is not None else {}
+            new_entries = new[1] if new is not None else {}
+            if old_entries != new_entries:
+                changes = _diff_entries(relative, old_entries, new_entries)
+                added.update(changes[0])
+                removed.update(changes[1])
+                modified.update(changes[2])
+
+        records = {
+            path: FileRecord(0, os.path.basename(path), *entry)
+            for path, entry in (modified | added).items()
+        }
+        renamed = _pair_renames(added, removed)
+        return SnapshotDiff(
+            self.root,
+            sorted(added),
+            sorted(removed),
+            sorted(modified),
+            sorted(renamed),
+            records,
+        )
+
+    def to_bytes(self) -> bytes:
+        """Serialise the snapshot.
+
+        Returns:
+            bytes: The serialised snapshot, see Snapshot.from_bytes.
+        """
+        return marshal.dumps(
+            (SNAPSHOT_VERSION, self.root, self.recursive, self.folders)
+        )
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "Snapshot":
+        """Deserialise a snapshot.
+
+        Args:
+            data (bytes): The serialised snapshot, see Snapshot.to_bytes.
+
+        Returns:
+            Snapshot: The snapshot.
+
+        Raises:
+            ValueError: The data is not a snapshot of this version.
+        """
+        try:
+            version, root, recursive, folders = marshal.loads(data)
+        except (EOFError, TypeError, ValueError) as error:
+            raise ValueError("Invalid snapshot data.") from error
+        if version != SNAPSHOT_VERSION:
+            raise ValueError(f"Unsupported snapshot version: {version}.")
+        return cls(root, recursive, folders)
+
+    def __eq__(self, other: object) -> bool:
+        """Compare two snapshots for equality.
+
+        Args:
+            other (object): The other snapshot to compare.
+
+        Returns:
+            bool: True if both snapshots have the same state.
+        """
+        return isinstance(other, Snapshot) and self.__dict__ == other.__dict__
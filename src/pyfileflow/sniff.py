@@ -0,0 +1,162 @@
+"""Content sniffing.
+
+Implement the detection of file types from their magic numbers. Only the
+header of a file is read, with a single bounded read, and the results are
+cached by file identity.
+"""
+
+import threading
+from collections import OrderedDict
+
+from typing_extensions import NamedTuple, Optional
+
+from .backend import get_backend
+from .ppath import PathLike, PPath
+
+HEADER_SIZE = 4096
+"""Number of bytes read at the start of a file to detect its type."""
+
+CACHE_SIZE = 65536
+"""Maximum number of results kept in the cache."""
+
+
+class FileType(NamedTuple):
+    """A detected file type.
+
+    Attributes:
+        kind (str): The family of the type: image, video, archive or document.
+        name (str): The type name, like "png" or "pdf".
+    """
+
+    kind: str
+    name: str
+
+
+# (offset, magic number, type). Checked in order, the first match wins.
+SIGNATURES: list[tuple[int, bytes, FileType]] = [
+    (0, b"\xff\xd8\xff", FileType("image", "jpeg")),
+    (0, b"\x89PNG\r\n\x1a\n", FileType("image", "png")),
+    (0, b"GIF87a", FileType("image", "gif")),
+    (0, b"GIF89a", FileType("image", "gif")),
+    (0, b"BM", FileType("image", "bmp")),
+    (0, b"II*\x00", FileType("image", "tiff")),
+    (0, b"MM\x00*", FileType("image", "tiff")),
+    (0, b"\x00\x00\x01\x00", FileType("image", "ico")),
+    (0, b"\x1aE\xdf\xa3", FileType("video", "matroska")),
+    (0, b"FLV\x01", FileType("video", "flv")),
+    (0, b"\x00\x00\x01\xba", FileType("video", "mpeg")),
+    (0, b"%PDF-", FileType("document", "pdf")),
+    (0, b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1", FileType("document", "ole")),
+    (0, b"{\\rtf", FileType("document", "rtf")),
+    (0, b"PK\x03\x04", FileType("archive", "zip")),
+    (0, b"PK\x05\x06", FileType("archive", "zip")),
+    (0, b"\x1f\x8b", FileType("archive", "gzip")),
+    (0, b"BZh", FileType("archive", "bzip2")),
+    (0, b"\xfd7zXZ\x00", FileType("archive", "xz")),
+    (0, b"7z\xbc\xaf\x27\x1c", FileType("archive", "7z")),
+    (0, b"Rar!\x1a\x07", FileType("archive", "rar")),
+    (0, b"(\xb5/\xfd", FileType("archive", "zstd")),
+    (257, b"ustar", FileType("archive", "tar")),
+]
+
+# RIFF containers: the form type is at offset 8.
+RIFF_TYPES = {
+    b"WEBP": FileType("image", "webp"),
+    b"AVI ": FileType("video", "avi"),
+}
+
+# ISO base media files: the major brand is at offset 8, after "ftyp".
+FTYP_BRANDS = {
+    b"heic": FileType("image", "heic"),
+    b"heix": FileType("image", "heic"),
+    b"mif1": FileType("image", "heif"),
+    b"avif": FileType("image", "avif"),
+    b"qt  ": FileType("video", "quicktime"),
+}
+
+# Zip based documents, recognised from the name of their first member.
+ZIP_DOCUMENTS = (b"mimetypeapplication/vnd.oasis", b"[Content_Types].xml")
+
+_cache: "OrderedDict[tuple, Optional[FileType]]" = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def read_header(path: PathLike, size: int = HEADER_SIZE) -> bytes:
+    """Read the first bytes of a file with a single bounded read.
+
+    The file is read through the current backend, see pyfileflow.backend.
+
+    Args:
+        path (PathLike): The file path.
+        size (int): The maximum number of bytes to read. Defaults to HEADER_SIZE.
+
+    Returns:
+        bytes: The first bytes of the file.
+    """
+    return get_backend().pread(path, size)
+
+
+def detect(header: bytes) -> Optional[FileType]:
+    """Detect a file type from the header of a file.
+
+    Args:
+        header (bytes): The first bytes of the file.
+
+    Returns:
+        Optional[FileType]: The detected type, None if it is unknown.
+    """
+    if header[:4] == b"RIFF" and header[8:12] in RIFF_TYPES:
+        return RIFF_TYPES[header[8:12]]
+
+    if header[4:8] == b"ftyp":
+        return FTYP_BRANDS.get(header[8:12], FileType("video", "mp4"))
+
+    for offset, magic, file_type in SIGNATURES:
+        if header.startswith(magic, offset):
+            if file_type.name == "zip" and header.startswith(ZIP_DOCUMENTS, 30):
+                return FileType("document", "office")
+            return file_type
+    return None
+
+
+def sniff(path: PPath) -> Optional[FileType]:
+    """Detect the type of a file from its content.
+
+    The result is cached by file identity (device, inode, size and modification
+    time), so a file is read at most once while it is not modified.
+
+    Args:
+        path (PPath): The file path.
+
+    Returns:
+        Optional[FileType]: The detected type, None if it is unknown or if the
+        path is not a regular file.
+    """
+    record = path.record
+    if record.is_dir:
+        return None
+
+    # Without an inode number (like on some Windows file systems), the path
+    # is used to tell files apart.
+    identity = record.identity if record.ino else (str(path), *record.identity)
+    with _cache_lock:
+        if identity in _cache:
+            _cache.move_to_end(identity)
+            return _cache[identity]
+
+    try:
+        file_type = detect(read_header(path))
+    except OSError:
+        return None
+
+    with _cache_lock:
+        _cache[identity] = file_type
+        if len(_cache) > CACHE_SIZE:
+            _cache.popitem(last=False)
+    return file_type
+
+
+def clear_cache() -> None:
+    """Clear the cache of detected types."""
+    with _cache_lock:
+        _cache.clear()
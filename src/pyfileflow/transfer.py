@@ -0,0 +1,360 @@
+"""File transfers.
+
+Implement verified copies: the data is hashed while it is copied, and the
+destination is read back once to check it. Digests can be recorded in a
+sidecar manifest, in the format of sha256sum and similar tools.
+
+Copies can also synchronise their destination: up-to-date destinations are
+skipped, and large outdated ones are updated in place with a delta transfer,
+see pyfileflow.delta.
+
+The other hard links of an already copied file can be recreated as hard links
+to its copy, with link, instead of copying the data again.
+"""
+
+import contextlib
+import hashlib
+import os
+import shutil
+import tempfile
+import threading
+
+from typing_extensions import Optional
+
+from . import delta, utils
+from .backend import get_backend
+from .ppath import PathLike, PPath
+
+BLOCK_SIZE = 1024**2
+"""Size of the blocks read and written during a copy."""
+
+DELTA_THRESHOLD = 64 * 1024**2
+"""Minimum size of the synchronised files updated with a delta transfer."""
+
+
+class CopyVerificationError(OSError):
+    """Raised when the destination of a copy does not match its source."""
+
+
+def target_path(source: PathLike, destination: PathLike) -> PPath:
+    """Return the path a file is copied to, like shutil.copy.
+
+    Args:
+        source (PathLike): The copied file.
+        destination (PathLike): The destination file or folder.
+
+    Returns:
+        PPath: destination/name if the destination is a folder, the destination
+        itself otherwise.
+    """
+    destination = PPath(destination)
+    return destination / PPath(source).name if destination.is_dir() else destination
+
+
+def _drop_cache(fd: int) -> None:
+    """Evict a file from the page cache, so that it is read back from the disk.
+
+    Args:
+        fd (int): The file descriptor.
+    """
+    if hasattr(os, "posix_fadvise"):
+        try:
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+        except OSError:  # pragma: no cover
+            pass
+
+
+def file_digest(path: PathLike, algorithm: str = "sha256") -> str:
+    """Hash a file.
+
+    Args:
+        path (PathLike): The file to hash.
+        algorithm (str): The hashlib algorithm. Defaults to "sha256".
+
+    Returns:
+        str: The hexadecimal digest.
+    """
+    digest = hashlib.new(algorithm)
+    with open(path, "rb") as file:
+        while block := file.read(BLOCK_SIZE):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def copy_verified(
+    source: PathLike, destination: PathLike, algorithm: str = "sha256"
+) -> str:
+    """Copy a file, and verify the copy.
+
+    The source is hashed while it is copied, so it is only read once. The copy
+    is written to a temporary file in the destination folder, synced, evicted
+    from the page cache when possible, and read back once to compare its
+    digest. Only a verified copy replaces the destination, a corrupted one is
+    removed.
+
+    Args:
+        source (PathLike): The file to copy.
+        destination (PathLike): The destination file or folder.
+        algorithm (str): The hashlib algorithm. Defaults to "sha256".
+
+    Returns:
+        str: The hexadecimal digest of the file.
+
+    Raises:
+        CopyVerificationError: The copy does not match the source.
+    """
+    target = target_path(source, destination)
+    fd, temporary = tempfile.mkstemp(
+        prefix=f".{target.name}.", suffix=".part", dir=target.parent
+    )
+    try:
+        expected = _copy_hashed(source, fd, algorithm)
+        shutil.copymode(source, temporary)
+        if file_digest(temporary, algorithm) != expected:
+            raise CopyVerificationError(
+                f"The copy of {source} to {target} is corrupted."
+            )
+        os.replace(temporary, target)
+    except BaseException:
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(temporary)
+        raise
+    utils.sync_folder(target.parent)
+    return expected
+
+
+def _copy_hashed(source: PathLike, fd: int, algorithm: str) -> str:
+    """Copy a file into an opened file, hashing it, and sync the copy.
+
+    Args:
+        source (PathLike): The file to copy.
+        fd (int): The file descriptor of the copy, closed once written.
+        algorithm (str): The hashlib algorithm.
+
+    Returns:
+        str: The hexadecimal digest of the source.
+    """
+    digest = hashlib.new(algorithm)
+    with open(source, "rb") as input, open(fd, "wb") as output:
+        while block := input.read(BLOCK_SIZE):
+            digest.update(block)
+            output.write(block)
+        output.flush()
+        os.fsync(output.fileno())
+        _drop_cache(output.fileno())
+    return digest.hexdigest()
+
+
+class Manifest:
+    """A sidecar file recording the digests of copied files.
+
+    Lines are formatted as "<digest>  <path>", like sha256sum, so the manifest
+    can be checked with `sha256sum -c`.
+
+    Attributes:
+        path (PPath): The manifest file.
+    """
+
+    def __init__(self, path: PathLike) -> None:
+        """Initialize a Manifest instance.
+
+        Args:
+            path (PathLike): The manifest file.
+        """
+        self.path = PPath(path)
+        self._lock = threading.Lock()
+
+    def add(self, path: PathLike, digest: str) -> None:
+        """Record the digest of a file.
+
+        Args:
+            path (PathLike): The file.
+            digest (str): The hexadecimal digest of the file.
+        """
+        with self._lock, open(self.path, "a", encoding="utf-8") as manifest:
+            manifest.write(f"{digest}  {os.fspath(path)}\n")
+
+    def read(self) -> dict[str, str]:
+        """Read the recorded digests.
+
+        Returns:
+            dict[str, str]: The digests, by path.
+        """
+        digests: dict[str, str] = {}
+        with open(self.path, encoding="utf-8") as manifest:
+            for line in manifest:
+                digest, _, path = line.rstrip("\n").partition("  ")
+                digests[path] = digest
+        return digests
+
+    def __eq__(self, other: object) -> bool:
+        """Compare two manifests for equality.
+
+        Args:
+            other (object): The other manifest to compare.
+
+        Returns:
+            bool: True if both manifests are the same file, False otherwise.
+        """
+        return isinstance(other, Manifest) and self.path == other.path
+
+    def __getstate__(self) -> dict:
+        """Return the state of the manifest, without its lock.
+
+        Returns:
+            dict: The state of the manifest.
+        """
+        return {"path": self.path}
+
+    def __setstate__(self, state: dict) -> None:
+        """Restore the state of the manifest.
+
+        Args:
+            state (dict): The state of the manifest.
+        """
+        self.__init__(state["path"])  # type: ignore[misc]
+
+
+def is_up_to_date(source: PathLike, target: PathLike, sync: str = "mtime") -> bool:
+    """Check if a copy of a file is up to date.
+
+    Args:
+        source (PathLike): The copied file.
+        target (PathLike): The copy.
+        sync (str):
+            "mtime" to compare the sizes and modification times, or the hashlib
+            algorithm used to compare the sizes and contents. Defaults to "mtime".
+
+    Returns:
+        bool: True if the copy exists and matches the file.
+    """
+    try:
+        target_stat = os.stat(target)
+    except FileNotFoundError:
+        return False
+    source_stat = os.stat(source)
+
+    if source_stat.st_size != target_stat.st_size:
+        return False
+    if sync == "mtime":
+        return source_stat.st_mtime_ns == target_stat.st_mtime_ns
+    return file_digest(source, sync) == file_digest(target, sync)
+
+
+def _patch(
+    source: PathLike,
+    target: PPath,
+    verify: Optional[str],
+    manifest: Optional[Manifest],
+) -> None:
+    """Update an outdated copy in place with a delta transfer.
+
+    Args:
+        source (PathLike): The copied file.
+        target (PPath): The outdated copy.
+        verify (Optional[str]): The hashlib algorithm used to verify the copy.
+        manifest (Optional[Manifest]): The manifest recording the digest.
+
+    Raises:
+        CopyVerificationError: The destination does not match the source.
+    """
+    delta.patch(source, target)
+    shutil.copystat(source, target)
+    if verify is None:
+        return
+
+    expected = file_digest(source, verify)
+    if file_digest(target, verify) != expected:
+        raise CopyVerificationError(f"The copy of {source} to {target} is corrupted.")
+    if manifest is not None:
+        manifest.add(target, expected)
+
+
+def copy(
+    source: PathLike,
+    destination: PathLike,
+    verify: Optional[str] = None,
+    manifest: Optional[Manifest] = None,
+    sync: Optional[str] = None,
+    delta_threshold: Optional[int] = DELTA_THRESHOLD,
+) -> PPath:
+    """Copy a file, verifying the copy if needed.
+
+    Plain copies, neither verified nor synchronised, go through the current
+    backend (see pyfileflow.backend), the others read the files from the
+    operating system.
+
+    Args:
+        source (PathLike): The file to copy.
+        destination (PathLike): The destination file or folder.
+        verify (Optional[str]):
+            The hashlib algorithm used to verify the copy. If None, the copy is
+            not verified. Defaults to None.
+        manifest (Optional[Manifest]):
+            The manifest recording the digest of the copy. Only used when the
+            copy is verified. Defaults to None.
+        sync (Optional[str]):
+            If given, the destination is skipped when it is up to date (see
+            is_up_to_date), and the modification time of the source is kept so
+            that the next comparison succeeds. Defaults to None.
+        delta_threshold (Optional[int]):
+            When synchronising, outdated destinations at least this large are
+            updated in place with a delta transfer. If None, they are always
+            copied again. Defaults to DELTA_THRESHOLD.
+
+    Returns:
+        PPath: The path of the copy.
+    """
+    if verify is None and sync is None:
+        return PPath(get_backend().copy(source, destination))
+
+    target = target_path(source, destination)
+    if sync is not None:
+        if is_up_to_date(source, target, sync):
+            return target
+        if (
+            delta_threshold is not None
+            and target.is_file()
+            and os.stat(source).st_size >= delta_threshold
+        ):
+            _patch(source, target, verify, manifest)
+            return target
+
+    if verify is None:
+        shutil.copy(source, target)
+    else:
+        digest = copy_verified(source, target, verify)
+        if manifest is not None:
+            manifest.add(target, digest)
+    if sync is not None:
+        shutil.copystat(source, target)
+    return target
+
+
+def link(existing: PathLike, target: PathLike) -> bool:
+    """Make a file a hard link to an existing file, replacing it if needed.
+
+    Args:
+        existing (PathLike): The existing file, like the copy of another hard
+            link of the source.
+        target (PathLike): The file to create or replace.
+
+    Returns:
+        bool: False if the link could not be created, for example because both
+        files are on different file systems.
+    """
+    target = PPath(target)
+    with contextlib.suppress(FileNotFoundError):
+        if os.path.samefile(existing, target):
+            return True
+
+    temporary = target.with_name(f".{target.name}.link")
+    with contextlib.suppress(FileNotFoundError):
+        # Left by an interrupted run.
+        os.unlink(temporary)
+    try:
+        os.link(existing, temporary)
+    except OSError:
+        return False
+    os.replace(temporary, target)
+    return True
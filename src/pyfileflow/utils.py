@@ -3,7 +3,8 @@
 Implement some utils functions.
 """
 
-from typing import Any, List, Optional, Union
+import os
+from typing import Any, List, Optional, Tuple, Union
 
 
 def parse_args(original_arg: Optional[Union[Any, List[Any]]]) -> List[Any]:
@@ -29,3 +30,120 @@ def parse_args(original_arg: Optional[Union[Any, List[Any]]]) -> List[Any]:
     parsed_arg = [arg for arg in parsed_arg if arg is not None]
 
     return parsed_arg
+
+
+_SIZE_UNITS = {
+    "": 1,
+    "B": 1,
+    "K": 1024,
+    "KB": 1024,
+    "M": 1024**2,
+    "MB": 1024**2,
+    "G": 1024**3,
+    "GB": 1024**3,
+    "T": 1024**4,
+    "TB": 1024**4,
+}
+
+_DURATION_UNITS = {
+    "": 1,
+    "s": 1,
+    "m": 60,
+    "h": 3600,
+    "d": 86400,
+    "w": 604800,
+}
+
+
+def _split_unit(value: str) -> Tuple[float, str]:
+    """Split a string like "10MB" into its number and its unit.
+
+    Args:
+        value (str): The string to split.
+
+    Returns:
+        Tuple[float, str]: The number and the unit.
+
+    Raises:
+        ValueError: The string does not start with a number.
+    """
+    value = value.strip()
+    index = len(value)
+    while index and not (value[index - 1].isdigit() or value[index - 1] == "."):
+        index -= 1
+    if not index:
+        raise ValueError(f"Invalid value: {value!r}.")
+    return float(value[:index]), value[index:].strip()
+
+
+def parse_size(value: Union[int, float, str]) -> int:
+    """Parse a size into a number of bytes.
+
+    Args:
+        value (Union[int, float, str]):
+            The size, either as a number of bytes or as a string with a binary
+            unit, like "10MB" or "1.5G".
+
+    Returns:
+        int: The size in bytes.
+
+    Raises:
+        ValueError: The unit is unknown.
+    """
+    if not isinstance(value, str):
+        return int(value)
+    number, unit = _split_unit(value)
+    if unit.upper() not in _SIZE_UNITS:
+        raise ValueError(f"Unknown size unit: {unit!r}.")
+    return int(number * _SIZE_UNITS[unit.upper()])
+
+
+def parse_duration(value: Union[int, float, str]) -> float:
+    """Parse a duration into a number of seconds.
+
+    Args:
+        value (Union[int, float, str]):
+            The duration, either as a number of seconds or as a string with a
+            unit (s, m, h, d or w), like "30d".
+
+    Returns:
+        float: The duration in seconds.
+
+    Raises:
+        ValueError: The unit is unknown.
+    """
+    if not isinstance(value, str):
+        return float(value)
+    number, unit = _split_unit(value)
+    if unit not in _DURATION_UNITS:
+        raise ValueError(f"Unknown duration unit: {unit!r}.")
+    return number * _DURATION_UNITS[unit]
+
+
+def normalize_path(path: Any) -> str:
+    """Return the normalized absolute form of a path, to compare folders.
+
+    Args:
+        path (Any): The path.
+
+    Returns:
+        str: The normalized absolute path.
+    """
+    return os.path.normcase(os.path.abspath(path))
+
+
+def sync_folder(path: Any) -> None:
+    """Flush the entries of a folder to the disk, like a file renamed into it.
+
+    Folders cannot be opened on Windows, where the entries are not flushed.
+
+    Args:
+        path (Any): The folder.
+    """
+    if os.name == "nt":  # pragma: no cover
+        return
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
@@ -0,0 +1,292 @@
+"""Lease-based work queue.
+
+Implement WorkQueue, which lets several workers, in several processes or on
+several hosts, process the same folder without racing on its files. The queue
+is a folder, usually on the shared file system next to the processed folder:
+
+- a worker claims an item by creating ``claims/<key>`` with O_EXCL, which only
+  one worker can do,
+- a claim is a lease: it expires when its modification time is older than the
+  lease duration, so the items of dead workers are claimed again. A background
+  thread renews the claims of a worker while it holds them,
+- a processed item gets a ``done/<key>`` marker, so it is not processed again.
+
+Lease expiry compares the modification time of the claim, set by the file
+server, with the local clock: the clocks of the hosts should be synchronised
+well within the lease duration.
+"""
+
+import contextlib
+import hashlib
+import os
+import socket
+import threading
+import time
+
+from typing_extensions import Optional
+
+from .ppath import PathLike, PPath
+
+LEASE = 300.0
+"""Default lease duration, in seconds."""
+
+
+def default_worker() -> str:
+    """Return an identifier of the current worker.
+
+    Returns:
+        str: The host name and process id.
+    """
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+class WorkQueue:
+    """A lease-based work queue on a (shared) file system.
+
+    Attributes:
+        folder (PPath): The folder of the queue.
+        lease (float): The lease duration, in seconds.
+        worker (str): The identifier of this worker, written in its claims.
+    """
+
+    def __init__(
+        self, folder: PathLike, lease: float = LEASE, worker: Optional[str] = None
+    ) -> None:
+        """Initialize a WorkQueue instance, creating its folders if needed.
+
+        Args:
+            folder (PathLike): The folder of the queue.
+            lease (float): The lease duration, in seconds. Defaults to LEASE.
+            worker (Optional[str]):
+                The identifier of this worker. Defaults to the host name and
+                process id.
+        """
+        self.folder = PPath(folder)
+        self.lease = lease
+        self.worker = worker if worker is not None else default_worker()
+        (self.folder / "claims").mkdir(parents=True, exist_ok=True)
+        (self.folder / "done").mkdir(exist_ok=True)
+
+        self._held: set[str] = set()
+        self._lock = threading.Lock()
+        self._heartbeat: Optional[threading.Thread] = None
+
+    @staticmethod
+    def file_key(path: PPath, root: Optional[PathLike] = None) -> str:
+        """Return the key of a file, which changes when the file is replaced.
+
+        The device and inode are not used, as they differ between the hosts
+        sharing a network file system. So does the absolute path when the hosts
+        mount it at different places: the path relative to the processed
+        folder is used instead.
+
+        Args:
+            path (PPath): The file.
+            root (Optional[PathLike]):
+                The processed folder. Defaults to None, for the absolute path.
+
+        Returns:
+            str: The key.
+        """
+        record = path.record
+        if root is not None:
+            name = PPath(os.path.relpath(path, root)).as_posix()
+        else:
+            name = os.path.abspath(path)
+        identity = f"{name}\0{record.size}\0{record.mtime_ns}"
+        return hashlib.sha256(identity.encode(errors="surrogateescape")).hexdigest()
+
+    def _claim_path(self, key: str) -> str:
+        """Return the claim file of a key.
+
+        Args:
+            key (str): The key.
+
+        Returns:
+            str: The claim file.
+        """
+        return os.path.join(self.folder, "claims", key)
+
+    def _done_path(self, key: str) -> str:
+        """Return the done marker of a key.
+
+        Args:
+            key (str): The key.
+
+        Returns:
+            str: The done marker.
+        """
+        return os.path.join(self.folder, "done", key)
+
+    def _create_claim(self, key: str) -> bool:
+        """Atomically create the claim of a key.
+
+        Args:
+            key (str): The key.
+
+        Returns:
+            bool: False if the key is already claimed.
+        """
+        try:
+            fd = os.open(self._claim_path(key), os.O_WRONLY | os.O_CREAT | os.O_EXCL)
+        except FileExistsError:
+            return False
+        with os.fdopen(fd, "w", encoding="utf-8") as claim:
+            claim.write(self.worker)
+        return True
+
+    def _break_expired(self, key: str) -> None:
+        """Remove the claim of a key if its lease expired.
+
+        The claim is first renamed to a name unique to this worker, so that
+        only one worker breaks it. If the lease was renewed in between, the
+        claim is restored.
+
+        Args:
+            key (str): The key.
+        """
+        claim = self._claim_path(key)
+        try:
+            if time.time() - os.stat(claim).st_mtime < self.lease:
+                return
+            broken = f"{claim}.{hashlib.sha256(self.worker.encode()).hexdigest()[:16]}"
+            os.rename(claim, broken)
+        except FileNotFoundError:
+            return
+
+        if time.time() - os.stat(broken).st_mtime < self.lease:
+            # Renewed meanwhile: give it back, unless it was claimed again.
+            with contextlib.suppress(FileExistsError):
+                os.link(broken, claim)
+        os.unlink(broken)
+
+    def claim(self, key: str) -> bool:
+        """Claim an item for this worker.
+
+        Args:
+            key (str): The key of the item.
+
+        Returns:
+            bool: True if the item was claimed, False if it is claimed by
+            another worker or already done.
+        """
+        if self.is_done(key):
+            return False
+        if not self._create_claim(key):
+            self._break_expired(key)
+            if not self._create_claim(key):
+                return False
+        if self.is_done(key):
+            # Done by another worker between the check and the claim.
+            self.release(key, done=False)
+            return False
+        self._hold(key)
+        return True
+
+    def renew(self, key: str) -> None:
+        """Extend the lease of a claimed item.
+
+        Held claims are renewed by a background thread, see `claim`.
+
+        Args:
+            key (str): The key of the item.
+        """
+        os.utime(self._claim_path(key))
+
+    def _hold(self, key: str) -> None:
+        """Renew the claim of a key in the background until it is released.
+
+        Args:
+            key (str): The key.
+        """
+        with self._lock:
+            self._held.add(key)
+            if self._heartbeat is None:
+                self._heartbeat = threading.Thread(target=self._renew_held, daemon=True)
+                self._heartbeat.start()
+
+    def _renew_held(self) -> None:
+        """Renew the held claims every third of the lease, in the heartbeat thread.
+
+        The thread stops once no claim is held.
+        """
+        while True:
+            time.sleep(self.lease / 3)
+            with self._lock:
+                if not self._held:
+                    self._heartbeat = None
+                    return
+                keys = list(self._held)
+            for key in keys:
+                with contextlib.suppress(FileNotFoundError):
+                    self.renew(key)
+
+    def release(self, key: str, done: bool = True) -> None:
+        """Release a claimed item.
+
+        Args:
+            key (str): The key of the item.
+            done (bool):
+                If True, the item is marked as done and will not be claimed
+                again. Otherwise another worker may claim it. Defaults to True.
+        """
+        with self._lock:
+            self._held.discard(key)
+        if done:
+            with open(self._done_path(key), "w", encoding="utf-8") as marker:
+                marker.write(self.worker)
+        claim = self._claim_path(key)
+        with contextlib.suppress(FileNotFoundError):
+            # The lease may have expired and been claimed by another worker.
+            with open(claim, encoding="utf-8") as file:
+                owner = file.read()
+            if owner == self.worker:
+                os.unlink(claim)
+
+    def is_done(self, key: str) -> bool:
+        """Check if an item is done.
+
+        Args:
+            key (str): The key of the item.
+
+        Returns:
+            bool: True if the item was processed.
+        """
+        return os.path.exists(self._done_path(key))
+
+    def prune(self, older_than: float) -> int:
+        """Remove old done markers.
+
+        Markers of files that were moved or deleted are never used again. They
+        can be pruned once no worker can still hold an outdated listing.
+
+        Args:
+            older_than (float): The minimum age of the removed markers, in seconds.
+
+        Returns:
+            int: The number of removed markers.
+        """
+        limit = time.time() - older_than
+        removed = 0
+        with os.scandir(self.folder / "done") as markers:
+            for marker in markers:
+                with contextlib.suppress(FileNotFoundError):
+                    if marker.stat().st_mtime < limit:
+                        os.unlink(marker.path)
+                        removed += 1
+        return removed
+
+    def __eq__(self, other: object) -> bool:
+        """Compare two queues for equality.
+
+        Args:
+            other (object): The other queue to compare.
+
+        Returns:
+            bool: True if both queues use the same folder and lease.
+        """
+        return (
+            isinstance(other, WorkQueue)
+            and self.folder == other.folder
+            and self.lease == other.lease
+        )
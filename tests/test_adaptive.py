@@ -0,0 +1,77 @@
+"""Test module for pyfileflow.adaptive module.
+
+This module contains unit tests for the adaptive ordering of conditions.
+"""
+
+import time
+
+import pytest
+
+from pyfileflow.adaptive import AdaptiveConditions
+from pyfileflow.ppath import PPath
+from pyfileflow.rule import DeleteRule, Rule
+
+
+def slow_condition(path: PPath) -> bool:
+    """An expensive condition, that is almost always True.
+
+    Args:
+        path (PPath): The path to check.
+
+    Returns:
+        bool: True, unless the path is named "slow".
+    """
+    time.sleep(0.0001)
+    return path.name != "slow"
+
+
+def cheap_condition(path: PPath) -> bool:
+    """A cheap and selective condition.
+
+    Args:
+        path (PPath): The path to check.
+
+    Returns:
+        bool: True if the path has a .jpg suffix.
+    """
+    return path.suffix == ".jpg"
+
+
+def test_reorder() -> None:
+    """Test that the cheap selective condition is moved first."""
+    conditions = AdaptiveConditions([slow_condition, cheap_condition], 16)
+    paths = [PPath(f"{index}.txt") for index in range(32)]
+
+    for path in paths:
+        assert not conditions(path)
+
+    assert conditions.order == [cheap_condition, slow_condition]
+    assert conditions.stats[1].calls < len(paths)
+
+
+def test_reorder_every_invalid() -> None:
+    """Test that the reordering period must be positive."""
+    with pytest.raises(ValueError, match="reorder_every"):
+        AdaptiveConditions([cheap_condition], 0)
+
+
+def test_same_semantics() -> None:
+    """Test that adaptive rules accept the same paths as regular ones."""
+    regular = Rule(condition=[slow_condition, cheap_condition])
+    adaptive = Rule(condition=[slow_condition, cheap_condition], adaptive=True)
+    paths = [PPath(name) for name in ("a.jpg", "b.txt", "slow", "c.jpg")] * 10
+
+    assert [adaptive.check_path(path) for path in paths] == [
+        regular.check_path(path) for path in paths
+    ]
+
+
+def test_equality() -> None:
+    """Test that statistics do not change the equality of rules."""
+    rule = DeleteRule(condition=[slow_condition, cheap_condition], adaptive=True)
+    rule.check_path(PPath("a.txt"))
+
+    assert rule == DeleteRule(
+        condition=[slow_condition, cheap_condition], adaptive=True
+    )
+    assert rule != DeleteRule(condition=[slow_condition, cheap_condition])
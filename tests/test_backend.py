@@ -0,0 +1,141 @@
+"""Test module for pyfileflow.backend module.
+
+This module contains unit tests for the file system backends.
+"""
+
+import os
+import time
+from pathlib import Path
+
+import pytest
+
+from pyfileflow.backend import (
+    Backend,
+    MemoryBackend,
+    OSBackend,
+    get_backend,
+    set_backend,
+    use_backend,
+)
+from pyfileflow.conditions import HasExtension, OlderThan
+from pyfileflow.ppath import PPath
+from pyfileflow.rule import CopyRule, DeleteRule, MoveRule
+
+
+def test_use_backend() -> None:
+    """Test selecting a backend temporarily."""
+    default = get_backend()
+    assert isinstance(default, OSBackend)
+
+    memory = MemoryBackend()
+    with use_backend(memory) as backend:
+        assert backend is memory
+        assert get_backend() is memory
+    assert get_backend() is default
+
+    assert set_backend(memory) is default
+    assert set_backend(default) is memory
+
+
+def test_abstract_backend() -> None:
+    """Test that a backend must implement every operation."""
+
+    class StatOnly(Backend):
+        def stat(self, path, follow_symlinks=True):  # type: ignore[no-untyped-def]
+            return os.stat(path, follow_symlinks=follow_symlinks)
+
+    with pytest.raises(TypeError):
+        StatOnly()  # type: ignore[abstract]
+    with pytest.raises(TypeError):
+        Backend()  # type: ignore[abstract]
+
+
+def test_memory_backend() -> None:
+    """Test the basic operations of the in-memory backend."""
+    backend = MemoryBackend(dev=7)
+    backend.add_file("/data/sub/f1.txt", size=10, mtime_ns=5_000_000_000)
+
+    st = backend.stat("/data/sub/f1.txt")
+    assert (st.st_size, st.st_mtime_ns, st.st_mtime, st.st_dev) == (10, 5e9, 5.0, 7)
+    with backend.scandir("/data") as entries:
+        assert [(entry.name, entry.is_dir()) for entry in entries] == [("sub", True)]
+
+    backend.mkdir("/data/other")
+    with pytest.raises(FileExistsError):
+        backend.mkdir("/data/other")
+    with pytest.raises(FileNotFoundError):
+        backend.mkdir("/missing/other")
+
+    backend.add_file("/data/sub/header.bin", size=6, data=b"abcd")
+    assert backend.pread("/data/sub/header.bin", 3, 1) == b"bcd"
+    assert backend.pread("/data/sub/header.bin", 10) == b"abcd\x00\x00"
+    with pytest.raises(IsADirectoryError):
+        backend.pread("/data/sub", 10)
+    backend.unlink("/data/sub/header.bin")
+
+    assert backend.copy("/data/sub/f1.txt", "/data/other") == "/data/other/f1.txt"
+    assert backend.stat("/data/other/f1.txt").st_size == 10
+    assert backend.copy("/data/sub/f1.txt", "/data/f2.txt") == "/data/f2.txt"
+    with pytest.raises(IsADirectoryError):
+        backend.copy("/data/sub", "/data/other")
+
+    with pytest.raises(IsADirectoryError):
+        backend.unlink("/data/sub")
+    with pytest.raises(NotADirectoryError):
+        backend.rmtree("/data/f2.txt")
+    with pytest.raises(NotADirectoryError):
+        backend.stat("/data/f2.txt/child")
+    backend.unlink("/data/f2.txt")
+    backend.rmtree("/data/sub")
+    with pytest.raises(FileNotFoundError):
+        backend.stat("/data/sub/f1.txt")
+    with pytest.raises(FileNotFoundError):
+        backend.unlink("/data/sub")
+
+
+def test_ppath_memory_backend(tmp_path: Path) -> None:
+    """Test that PPath operations use the current backend."""
+    with use_backend(MemoryBackend()):
+        path = PPath(tmp_path, "a", "b")
+        path.mkdir(parents=True)
+        path.mkdir(exist_ok=True)
+        assert path.is_dir()
+        with pytest.raises(FileExistsError):
+            path.mkdir()
+
+        path.delete()
+        assert not path.exists()
+        PPath(tmp_path, "f").unlink(missing_ok=True)
+
+    assert not (tmp_path / "a").exists()
+
+
+def test_chain_memory_backend(tmp_path: Path) -> None:
+    """Test running a rule chain over synthetic entries."""
+    backend = MemoryBackend()
+    old = time.time_ns() - 100 * 86400 * 10**9
+    for index in range(1000):
+        backend.add_file(tmp_path / "inbox" / f"{index}.txt", index, old)
+        backend.add_file(tmp_path / "inbox" / "sub" / f"{index}.tmp", index)
+    backend.mkdir(tmp_path / "backup")
+
+    rule = CopyRule(
+        DeleteRule(condition=HasExtension(".tmp")),
+        condition=HasExtension(".txt"),
+        destination=tmp_path / "backup",
+    )
+    with use_backend(backend):
+        rule.process(tmp_path / "inbox", recursive=True)
+        MoveRule(condition=OlderThan("30d"), destination=tmp_path / "backup").process(
+            tmp_path / "inbox"
+        )
+
+        with backend.scandir(tmp_path / "backup") as entries:
+            assert len(list(entries)) == 1000
+        with backend.scandir(tmp_path / "inbox") as entries:
+            assert [entry.name for entry in entries] == ["sub"]
+        with backend.scandir(tmp_path / "inbox" / "sub") as entries:
+            assert not list(entries)
+        assert PPath(tmp_path, "backup", "999.txt").stat().st_size == 999
+
+    assert not os.path.exists(tmp_path / "inbox")
@@ -0,0 +1,100 @@
+"""Test module for pyfileflow.batch module.
+
+This module contains unit tests for the vectorised evaluation of prefilters.
+"""
+
+import os
+import random
+from unittest import mock
+
+import pytest
+from pyfakefs.fake_filesystem import FakeFilesystem
+
+from pyfileflow.conditions import (
+    HasExtension,
+    InFolder,
+    IsDir,
+    LargerThan,
+    NameMatches,
+    NewerThan,
+    SmallerThan,
+)
+from pyfileflow.prefilter import PrefilterSet
+from pyfileflow.record import FLAG_DIR, FileRecord, RecordTable
+from pyfileflow.rule import DeleteRule
+
+pytest.importorskip("numpy")
+
+from pyfileflow import batch  # noqa: E402
+
+NAMES = ["a.txt", "b.TXT", "c.tar.gz", "d.gz", ".bashrc", "e.", "f", "g..txt", "x.jpg"]
+
+
+def random_records(count: int) -> list[FileRecord]:
+    """Build reproducible random records."""
+    generator = random.Random(0)
+    return [
+        FileRecord(
+            0,
+            generator.choice(NAMES),
+            size=generator.randrange(200),
+            mtime_ns=generator.randrange(2 * 10**18),
+            flags=generator.choice([0, FLAG_DIR]),
+        )
+        for _ in range(count)
+    ]
+
+
+@pytest.mark.parametrize(
+    "conditions",
+    [
+        [[HasExtension(".txt")]],
+        [[HasExtension([".gz", ""])], [HasExtension(".tar.gz")]],
+        [[LargerThan(50), SmallerThan(150)], [IsDir(True)]],
+        [[NameMatches(["*.gz", "?.txt"]), NewerThan(10**9)]],
+        [[InFolder("/other")], [InFolder("/folder"), HasExtension(".jpg")]],
+    ],
+)
+def test_accepted(conditions: list) -> None:
+    """Test that blocks are filtered exactly like records one by one."""
+    prefilter = PrefilterSet(
+        [
+            condition[0].prefilter().intersect(condition[-1].prefilter())
+            for condition in conditions
+        ]
+    )
+    records = random_records(1000)
+    folders = ["/folder"] * len(records)
+
+    expected = [record for record in records if prefilter.accepts(record, "/folder")]
+    assert batch.accepted(records, folders, prefilter) == expected
+    assert expected
+
+
+def test_scan_batch(fs: FakeFilesystem) -> None:
+    """Test that a batched scan yields the same records as a plain one."""
+    for index in range(50):
+        fs.create_file(f"/folder/sub/f{index}.{'txt' if index % 3 else 'jpg'}")
+    prefilter = PrefilterSet([HasExtension(".txt").prefilter()])
+
+    plain = RecordTable().scan("/folder", True, True, prefilter)
+    batched = RecordTable().scan("/folder", True, True, prefilter, batch_size=8)
+    assert [record.name for record in batched] == [record.name for record in plain]
+
+
+def test_process_batch(fs: FakeFilesystem) -> None:
+    """Test that a rule chain only checks blocks of entries on request."""
+    for index in range(10):
+        fs.create_file(f"/folder/f{index}.{'txt' if index % 2 else 'jpg'}")
+    rule = DeleteRule(condition=HasExtension(".txt"))
+
+    with mock.patch.object(batch, "accepted", wraps=batch.accepted) as accepted:
+        rule.process("/folder")
+        assert not accepted.called
+        fs.create_file("/folder/f11.txt")
+        rule.process("/folder", batch_size=4)
+        assert accepted.call_count == 2
+
+    assert sorted(os.listdir("/folder")) == [
+        f"f{index}.jpg" for index in (0, 2, 4, 6, 8)
+    ]
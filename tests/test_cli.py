@@ -0,0 +1,160 @@
+"""Test module for pyfileflow.cli module.
+
+This module contains unit tests for the command-line interface and the lazy
+loading of the package.
+"""
+
+import os
+import subprocess  # nosec B404
+import sys
+from pathlib import Path
+from unittest import mock
+
+import pytest
+
+import pyfileflow
+from pyfileflow import cli
+from pyfileflow.cli import main
+
+CONFIG = """
+[[chain]]
+folder = "{inbox}"
+
+[[chain.rule]]
+action = "copy"
+destination = "{backup}"
+when = {{ extension = ".jpg" }}
+"""
+
+
+@pytest.fixture
+def config(tmp_path: Path) -> Path:
+    """Create a configuration with an inbox and a backup folder.
+
+    Args:
+        tmp_path (Path): The pytest temporary folder.
+
+    Returns:
+        Path: The configuration file.
+    """
+    (tmp_path / "inbox").mkdir()
+    (tmp_path / "backup").mkdir()
+    (tmp_path / "inbox" / "a.jpg").touch()
+    (tmp_path / "inbox" / "b.txt").touch()
+
+    path = tmp_path / "config.toml"
+    path.write_text(
+        CONFIG.format(
+            inbox=(tmp_path / "inbox").as_posix(),
+            backup=(tmp_path / "backup").as_posix(),
+        )
+    )
+    return path
+
+
+def test_lazy_import() -> None:
+    """Test that importing pyfileflow does not import the heavy modules."""
+    code = (
+        "import sys, pyfileflow; "
+        "print(any(name in sys.modules for name in "
+        "('pyfileflow.rule', 'typing_extensions', 'importlib.metadata')))"
+    )
+    env = {**os.environ, "PYTHONPATH": os.pathsep.join(sys.path)}
+    output = subprocess.run(  # nosec B603
+        [sys.executable, "-c", code], env=env, capture_output=True, check=True
+    )
+    assert output.stdout.strip() == b"False"
+
+
+def test_lazy_attributes() -> None:
+    """Test that the public attributes are loaded on access."""
+    from pyfileflow.rule import DeleteRule
+
+    assert pyfileflow.DeleteRule is DeleteRule
+    assert isinstance(pyfileflow.__version__, str)
+    assert "CopyRule" in dir(pyfileflow)
+
+    with pytest.raises(AttributeError):
+        pyfileflow.UnknownRule
+
+
+def test_version_from_wheel(tmp_path: Path) -> None:
+    """Test that the version is read from the .dist-info folder of a wheel."""
+    (tmp_path / "pyfileflow").mkdir()
+    (tmp_path / "pyfileflow-2.1.0.dist-info").mkdir()
+
+    init = str(tmp_path / "pyfileflow" / "__init__.py")
+    with mock.patch.object(pyfileflow, "__file__", init):
+        assert pyfileflow._get_version() == "2.1.0"
+
+
+def test_plan(config: Path, capsys: pytest.CaptureFixture) -> None:
+    """Test that plan prints the actions without applying them."""
+    assert main(["plan", str(config)]) == 0
+
+    output = capsys.readouterr().out
+    assert output.startswith("copy\t") and output.strip().endswith("a.jpg")
+    assert not (config.parent / "backup" / "a.jpg").exists()
+
+
+def test_run(config: Path) -> None:
+    """Test that run applies the rules of the configuration."""
+    assert main(["run", str(config), "--no-cache"]) == 0
+
+    assert (config.parent / "backup" / "a.jpg").exists()
+    assert not (config.parent / "backup" / "b.txt").exists()
+
+
+def test_watch(config: Path) -> None:
+    """Test that watch runs the configuration the given number of times."""
+    assert main(["watch", str(config), "--interval", "0", "--iterations", "2"]) == 0
+
+    assert (config.parent / "backup" / "a.jpg").exists()
+
+
+def test_watch_changes(config: Path) -> None:
+    """Test that watch --changes processes the files changed between two runs."""
+    argv = ["watch", str(config), "--interval", "0", "--iterations", "2", "--changes"]
+    assert main(argv) == 0
+
+    assert (config.parent / "backup" / "a.jpg").exists()
+
+
+def test_error(tmp_path: Path, capsys: pytest.CaptureFixture) -> None:
+    """Test that errors are reported with a non-zero exit code."""
+    assert main(["run", str(tmp_path / "missing.toml")]) == 1
+    assert "error" in capsys.readouterr().err
+
+
+def test_bench(config: Path, capsys: pytest.CaptureFixture) -> None:
+    """Test that bench times a cold startup of the CLI against the budget."""
+    with mock.patch.object(cli, "measure_startup", return_value=0.0):
+        assert main(["bench", str(config), "--repeat", "1"]) == 0
+    with mock.patch.object(cli, "measure_startup", side_effect=[0.0, 1.0]):
+        assert main(["bench", str(config), "--repeat", "1"]) == 1
+    assert "budget" in capsys.readouterr().out
+
+    for cache, mode in ((True, "cache"), (False, "no-cache")):
+        with mock.patch("subprocess.run") as run:
+            cli.measure_startup(str(config), cache, 1)
+        argvs = [call.args[0][1:] for call in run.call_args_list]
+        assert sorted(argvs) == sorted(
+            [["-c", "pass"], ["-c", cli.STARTUP_CODE, str(config), mode]]
+        )
+
+
+def test_plan_branches(tmp_path: Path) -> None:
+    """Test that plan lists the rules of the branches that apply to a file."""
+    from pyfileflow.conditions import HasExtension
+    from pyfileflow.config import Chain
+    from pyfileflow.rule import BranchRule, CopyRule, DeleteRule, SwitchRule
+
+    (tmp_path / "a.jpg").touch()
+    copy = CopyRule(destination=tmp_path, condition=HasExtension(".jpg"))
+    other = CopyRule(destination=tmp_path)
+    delete = DeleteRule()
+    switch = SwitchRule(branches=[copy, other])
+    branch = BranchRule(branches=[delete], next=switch)
+
+    planned = [rule for rule, _ in cli._plan_chain(Chain(tmp_path, branch))]
+    assert planned == [branch, delete, switch, copy]
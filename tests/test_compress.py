@@ -0,0 +1,98 @@
+"""Test module for pyfileflow.compress module.
+
+This module contains unit tests for the parallel block compression and the
+CompressRule class.
+"""
+
+import gzip
+import lzma
+import os
+from pathlib import Path
+
+import pytest
+
+from pyfileflow.compress import compress_file
+from pyfileflow.ppath import PPath
+from pyfileflow.rule import CompressRule
+
+
+@pytest.fixture
+def data() -> bytes:
+    """Return compressible data spanning several blocks.
+
+    Returns:
+        bytes: The data.
+    """
+    return b"".join(b"line %d\n" % index for index in range(20000)) + os.urandom(1000)
+
+
+@pytest.mark.parametrize(
+    ("format", "decompress", "magic"),
+    [("gzip", gzip.decompress, b"\x1f\x8b\x08"), ("xz", lzma.decompress, b"\xfd7zXZ")],
+)
+def test_compress_blocks(
+    tmp_path: Path, data: bytes, format: str, decompress: object, magic: bytes
+) -> None:
+    """Test that large files are written as several members or streams."""
+    source = tmp_path / "source"
+    source.write_bytes(data)
+    destination = tmp_path / "destination"
+
+    compress_file(source, destination, format, block_size=16 * 1024)  # type: ignore
+
+    compressed = destination.read_bytes()
+    assert decompress(compressed) == data  # type: ignore[operator]
+    assert compressed.count(magic) > 1
+
+
+def test_compress_small_file(tmp_path: Path) -> None:
+    """Test that small files are written as a single member."""
+    source = tmp_path / "source"
+    source.write_bytes(b"small")
+    destination = tmp_path / "destination"
+
+    compress_file(source, destination)
+
+    assert gzip.decompress(destination.read_bytes()) == b"small"
+
+
+def test_compress_invalid_format(tmp_path: Path) -> None:
+    """Test that unknown formats raise ValueError."""
+    with pytest.raises(ValueError):
+        compress_file(tmp_path, tmp_path / "x", "zstd")  # type: ignore[arg-type]
+
+    with pytest.raises(ValueError):
+        CompressRule(format="zstd")  # type: ignore[arg-type]
+
+
+def test_compress_rule(tmp_path: Path, data: bytes) -> None:
+    """Test that CompressRule writes compressed copies and keeps the source."""
+    source = tmp_path / "source"
+    source.mkdir()
+    (source / "big.log").write_bytes(data)
+    (source / "small.log").write_bytes(b"small")
+    destination = tmp_path / "destination"
+    destination.mkdir()
+
+    rule = CompressRule(destination=destination, block_size="16KB", workers=2)
+    rule.process(source)
+
+    assert gzip.decompress((destination / "big.log.gz").read_bytes()) == data
+    assert gzip.decompress((destination / "small.log.gz").read_bytes()) == b"small"
+    assert PPath(source / "big.log").exists()
+    assert rule._executor is None
+
+
+@pytest.mark.parametrize(("size", "members"), [(1024, 1), (1025, 2), (3072, 3)])
+def test_compress_block_boundaries(tmp_path: Path, size: int, members: int) -> None:
+    """Test that each block is read and compressed once."""
+    data = bytes(range(256)) * (size // 256) + b"x" * (size % 256)
+    source = tmp_path / "source"
+    source.write_bytes(data)
+    destination = tmp_path / "destination"
+
+    compress_file(source, destination, block_size=1024, workers=1)
+
+    compressed = destination.read_bytes()
+    assert gzip.decompress(compressed) == data
+    assert compressed.count(b"\x1f\x8b\x08\x00") == members
@@ -0,0 +1,78 @@
+"""Test module for pyfileflow.conditions module.
+
+This module contains unit tests for the built-in conditions.
+"""
+
+import os
+import pickle
+import time
+
+from pyfakefs.fake_filesystem import FakeFilesystem
+
+from pyfileflow.conditions import (
+    HasExtension,
+    IsDir,
+    LargerThan,
+    NameMatches,
+    NewerThan,
+    OlderThan,
+    SmallerThan,
+)
+from pyfileflow.ppath import PPath
+
+
+def test_has_extension() -> None:
+    """Test the HasExtension condition with full and last extensions."""
+    condition = HasExtension([".jpg", "gz"])
+
+    assert condition(PPath("photo.JPG"))
+    assert condition(PPath("archive.tar.gz"))
+    assert not condition(PPath("notes.txt"))
+
+
+def test_name_matches() -> None:
+    """Test the NameMatches condition."""
+    condition = NameMatches(["*.log", "core.*"])
+
+    assert condition(PPath("/var/app.log"))
+    assert condition(PPath("core.1234"))
+    assert not condition(PPath("app.txt"))
+
+
+def test_size(fs: FakeFilesystem) -> None:
+    """Test the LargerThan and SmallerThan conditions."""
+    fs.create_file("/big", st_size=2048)
+
+    assert LargerThan("1KB")(PPath("/big"))
+    assert not LargerThan(4096)(PPath("/big"))
+    assert SmallerThan("1M")(PPath("/big"))
+
+
+def test_age(fs: FakeFilesystem) -> None:
+    """Test the OlderThan and NewerThan conditions."""
+    fs.create_file("/old")
+    fs.create_file("/new")
+    two_days_ago = time.time() - 2 * 86400
+    os.utime("/old", (two_days_ago, two_days_ago))
+
+    assert OlderThan("1d")(PPath("/old"))
+    assert not OlderThan("1d")(PPath("/new"))
+    assert NewerThan("1h")(PPath("/new"))
+
+
+def test_is_dir(fs: FakeFilesystem) -> None:
+    """Test the IsDir condition."""
+    fs.create_dir("/folder")
+    fs.create_file("/file")
+
+    assert IsDir()(PPath("/folder"))
+    assert IsDir(False)(PPath("/file"))
+
+
+def test_equality_and_pickle() -> None:
+    """Test that built-in conditions can be compared and pickled."""
+    condition = HasExtension(".jpg")
+
+    assert condition == HasExtension("jpg")
+    assert condition != NameMatches("*.jpg")
+    assert pickle.loads(pickle.dumps(condition)) == condition
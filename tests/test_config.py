@@ -0,0 +1,389 @@
+"""Test module for pyfileflow.config module.
+
+This module contains unit tests for the TOML configuration loader.
+"""
+
+import json
+import os
+import subprocess  # nosec B404
+import sys
+import tomllib
+from pathlib import Path
+from unittest import mock
+
+import pytest
+from pyfakefs.fake_filesystem import FakeFilesystem
+
+import pyfileflow
+from pyfileflow import config
+from pyfileflow.conditions import HasExtension, OlderThan
+from pyfileflow.extractors import modified_date
+from pyfileflow.ppath import PPath
+from pyfileflow.prefetch import Prefetcher
+from pyfileflow.rule import BranchRule, CopyByValueRule, CopyRule, DeleteRule, MoveRule
+
+CONFIG = """
+[[chain]]
+folder = "/inbox"
+
+[[chain.rule]]
+action = "copy"
+destination = "/backup"
+when = { extension = [".jpg"] }
+
+[[chain.rule]]
+action = "copy_by_value"
+destination = "/sorted"
+sort_by = "modified_date"
+
+[[chain.rule]]
+action = "delete"
+when = { older_than = "30d" }
+"""
+
+
+def test_compile() -> None:
+    """Test compiling a configuration into rule chains."""
+    pipeline = config.compile_config(
+        {
+            "chain": [
+                {
+                    "folder": "/inbox",
+                    "rule": [
+                        {"action": "copy", "destination": "/backup"},
+                        {"action": "delete", "when": {"extension": "tmp"}},
+                    ],
+                }
+            ]
+        }
+    )
+
+    (chain,) = pipeline.chains
+    assert chain.folder == PPath("/inbox")
+    assert chain.rule == CopyRule(
+        DeleteRule(condition=HasExtension(".tmp")), destination="/backup"
+    )
+
+
+@pytest.mark.parametrize(
+    "rule",
+    [
+        {"action": "unknown"},
+        {"action": "delete", "when": {"unknown": 1}},
+        {"action": "delete", "when": {"larger_than": "10 parsecs"}},
+        {"action": "delete", "destination": "/"},
+        {"action": "copy_by_value", "sort_by": "unknown"},
+        {"action": "branch", "branch": {"rule": []}},
+        {"action": "branch", "branch": [{"rule": []}]},
+        {"action": "branch", "branch": [{"rule": {"action": "delete"}}]},
+    ],
+)
+def test_compile_invalid_rule(rule: dict) -> None:
+    """Test that invalid rules raise ConfigError."""
+    with pytest.raises(config.ConfigError):
+        config.compile_config({"chain": [{"folder": "/", "rule": [rule]}]})
+
+
+def test_compile_invalid_chain() -> None:
+    """Test that chains without folder or rules raise ConfigError."""
+    with pytest.raises(config.ConfigError):
+        config.compile_config({"chain": [{"rule": [{"action": "delete"}]}]})
+
+    with pytest.raises(config.ConfigError):
+        config.compile_config({"chain": [{"folder": "/"}]})
+
+    rules = [{"action": "delete"}]
+    with pytest.raises(config.ConfigError):
+        config.compile_config(
+            {"chain": [{"folder": "/", "recursive": 1, "rule": rules}]}
+        )
+    with pytest.raises(config.ConfigError):
+        config.compile_config({"chain": [{"folder": "/", "index": 1, "rule": rules}]})
+    with pytest.raises(config.ConfigError):
+        config.compile_config({"chain": [{"folder": "/", "queue": 1, "rule": rules}]})
+    with pytest.raises(config.ConfigError):
+        config.compile_config(
+            {"chain": [{"folder": "/", "prefetch": 0, "rule": rules}]}
+        )
+    for options in (
+        {"symlinks": "always"},
+        {"symlinks": "follow", "index": "/index.sqlite"},
+        {"unique": "yes"},
+        {"prefetch": 4, "prefetch_drop": "yes"},
+        {"batch_size": -1},
+    ):
+        with pytest.raises(config.ConfigError):
+            config.compile_config(
+                {"chain": [{"folder": "/", **options, "rule": rules}]}
+            )
+    with pytest.raises(config.ConfigError):
+        config.compile_config(
+            {
+                "chain": [
+                    {
+                        "folder": "/",
+                        "prefetch": 4,
+                        "prefetch_budget": "1 parsec",
+                        "rule": rules,
+                    }
+                ]
+            }
+        )
+
+
+def test_compile_branch() -> None:
+    """Test compiling a branch rule and its branches."""
+    pipeline = config.compile_config(
+        tomllib.loads(
+            """
+            [[chain]]
+            folder = "/inbox"
+
+            [[chain.rule]]
+            action = "branch"
+
+            [[chain.rule.branch]]
+            [[chain.rule.branch.rule]]
+            action = "copy"
+            destination = "/backup"
+
+            [[chain.rule.branch]]
+            [[chain.rule.branch.rule]]
+            action = "move"
+            destination = "/archive"
+            [[chain.rule.branch.rule]]
+            action = "delete"
+
+            [[chain.rule]]
+            action = "delete"
+            """
+        )
+    )
+
+    assert pipeline.chains[0].rule == BranchRule(
+        DeleteRule(),
+        branches=[
+            CopyRule(destination="/backup"),
+            MoveRule(DeleteRule(), destination="/archive"),
+        ],
+    )
+
+
+def test_compile_links() -> None:
+    """Test compiling the symbolic and hard link options."""
+    pipeline = config.compile_config(
+        {
+            "chain": [
+                {
+                    "folder": "/",
+                    "symlinks": "follow",
+                    "unique": True,
+                    "rule": [
+                        {"action": "copy", "destination": "/b", "hardlinks": True}
+                    ],
+                }
+            ]
+        }
+    )
+    (chain,) = pipeline.chains
+    assert chain.symlinks == "follow"
+    assert chain.unique
+    assert chain.rule == CopyRule(destination="/b", hardlinks=True)
+
+
+def test_compile_prefetch() -> None:
+    """Test compiling the prefetch and batch options of a chain."""
+    pipeline = config.compile_config(
+        {
+            "chain": [
+                {
+                    "folder": "/",
+                    "prefetch": 4,
+                    "prefetch_budget": "1MB",
+                    "prefetch_drop": True,
+                    "batch_size": 64,
+                    "rule": [{"action": "delete"}],
+                }
+            ]
+        }
+    )
+    assert pipeline.chains[0].prefetch == Prefetcher(4, 1024**2, drop=True)
+    assert pipeline.chains[0].batch_size == 64
+
+
+def test_load_and_cache(fs: FakeFilesystem) -> None:
+    """Test loading a configuration file, and the compiled cache.
+
+    The cache must be reused while the configuration does not change, and
+    invalidated once it does.
+    """
+    fs.create_file("/config.toml", contents=CONFIG)
+
+    pipeline = config.load("/config.toml")
+    (chain,) = pipeline.chains
+    assert chain.rule == CopyRule(
+        CopyByValueRule(
+            DeleteRule(condition=OlderThan("30d")),
+            destination="/sorted",
+            sort_by=modified_date,
+        ),
+        condition=HasExtension(".jpg"),
+        destination="/backup",
+    )
+
+    cache = config.cache_path("/config.toml")
+    assert cache.exists()
+    assert config.load("/config.toml") == pipeline
+
+    PPath("/config.toml").write_text(CONFIG.replace("/backup", "/other"))
+    assert config.load("/config.toml").chains[0].rule.destination == [PPath("/other")]
+
+
+def test_load_invalid_toml(fs: FakeFilesystem) -> None:
+    """Test that an invalid TOML file raises ConfigError."""
+    fs.create_file("/config.toml", contents="[[chain]")
+
+    with pytest.raises(config.ConfigError):
+        config.load("/config.toml", cache=False)
+
+
+def test_run(fs: FakeFilesystem) -> None:
+    """Test running a compiled pipeline."""
+    fs.create_file("/inbox/a.jpg")
+    fs.create_file("/inbox/b.txt")
+    fs.create_dir("/backup")
+    fs.create_dir("/sorted")
+    fs.create_file("/config.toml", contents=CONFIG)
+
+    config.load("/config.toml").run()
+
+    assert PPath("/backup/a.jpg").exists()
+    assert not PPath("/backup/b.txt").exists()
+    assert len(list(PPath("/sorted").iterdir())) == 1
+
+
+def test_run_with_index(tmp_path: Path) -> None:
+    """Test running a recursive chain with a metadata index."""
+    (tmp_path / "inbox" / "sub").mkdir(parents=True)
+    (tmp_path / "inbox" / "sub" / "f1.txt").touch()
+    (tmp_path / "inbox" / "f2.jpg").touch()
+
+    pipeline = config.compile_config(
+        {
+            "chain": [
+                {
+                    "folder": str(tmp_path / "inbox"),
+                    "recursive": True,
+                    "index": str(tmp_path / "index.sqlite"),
+                    "queue": str(tmp_path / "queue"),
+                    "rule": [{"action": "delete", "when": {"extension": [".txt"]}}],
+                }
+            ]
+        }
+    )
+    pipeline.run()
+
+    assert not (tmp_path / "inbox" / "sub" / "f1.txt").exists()
+    assert (tmp_path / "inbox" / "f2.jpg").exists()
+    assert (tmp_path / "index.sqlite").exists()
+    assert len(os.listdir(tmp_path / "queue" / "done")) == 1
+
+
+def test_run_changes(tmp_path: Path) -> None:
+    """Test that a chain only processes the files changed since its snapshot."""
+    (tmp_path / "inbox").mkdir()
+    (tmp_path / "backup").mkdir()
+    (tmp_path / "inbox" / "a.jpg").touch()
+    chain = config.Chain(tmp_path / "inbox", CopyRule(destination=tmp_path / "backup"))
+
+    snapshot = chain.run_changes()
+    assert (tmp_path / "backup" / "a.jpg").exists()
+
+    (tmp_path / "backup" / "a.jpg").unlink()
+    (tmp_path / "inbox" / "b.jpg").touch()
+    chain.run_changes(snapshot)
+    assert not (tmp_path / "backup" / "a.jpg").exists()
+    assert (tmp_path / "backup" / "b.jpg").exists()
+
+
+def test_run_changes_options(tmp_path: Path) -> None:
+    """Test that the links and work queue options apply to the changes."""
+    (tmp_path / "inbox").mkdir()
+    (tmp_path / "backup").mkdir()
+    chain = config.Chain(
+        tmp_path / "inbox",
+        CopyRule(destination=tmp_path / "backup"),
+        queue=tmp_path / "queue",
+        symlinks="ignore",
+        unique=True,
+    )
+    snapshot = chain.run_changes()
+
+    (tmp_path / "inbox" / "a.jpg").touch()
+    os.link(tmp_path / "inbox" / "a.jpg", tmp_path / "inbox" / "b.jpg")
+    os.symlink(tmp_path / "inbox" / "a.jpg", tmp_path / "inbox" / "c.jpg")
+    chain.run_changes(snapshot)
+
+    assert os.listdir(tmp_path / "backup") == ["a.jpg"]
+    assert len(os.listdir(tmp_path / "queue" / "done")) == 1
+
+
+def test_lazy_imports(tmp_path: Path) -> None:
+    """Test that a cached configuration is loaded without parsing or compiling.
+
+    Neither the TOML parser nor the rule modules are imported until the chains
+    are used.
+    """
+    path = tmp_path / "config.toml"
+    path.write_text(CONFIG)
+    config.load(path)
+
+    modules = (
+        "tomllib",
+        "pyfileflow.rule",
+        "pyfileflow.conditions",
+        "pyfileflow.archive",
+        "pyfileflow.compress",
+        "pyfileflow.delta",
+        "pyfileflow.transfer",
+        "pyfileflow.sniff",
+    )
+    code = (
+        "import sys; from pyfileflow import config; "
+        f"pipeline = config.load({str(path)!r}); "
+        f"print(*[name for name in {modules!r} if name in sys.modules]); "
+        "pipeline.chains; print('pyfileflow.rule' in sys.modules)"
+    )
+    env = {**os.environ, "PYTHONPATH": os.pathsep.join(sys.path)}
+    output = subprocess.run(  # nosec B603
+        [sys.executable, "-c", code], env=env, capture_output=True, check=True
+    )
+    assert output.stdout.split(b"\n")[:2] == [b"", b"True"]
+
+
+def test_cache_is_data(fs: FakeFilesystem) -> None:
+    """Test that the cache holds the configuration tables, keyed by version."""
+    fs.create_file("/config.toml", contents=CONFIG)
+    pipeline = config.load("/config.toml")
+
+    header, data = config.cache_path("/config.toml").read_bytes().split(b"\n", 1)
+    cache_version, version, _ = header.decode().split()
+    assert int(cache_version) == config.CACHE_VERSION
+    assert version == pyfileflow.__version__
+    assert json.loads(data)[0]["folder"] == "/inbox"
+
+    with mock.patch.object(pyfileflow, "__version__", "0.0.0"):
+        # Written by another version of pyfileflow: compiled again.
+        with mock.patch.object(config, "compile_config") as compile_config:
+            config.load("/config.toml")
+    compile_config.assert_called_once()
+    assert config.load("/config.toml") == pipeline
+
+
+def test_tables() -> None:
+    """Test that the tables of the configuration are built on access."""
+    assert config.RULES["copy"] is CopyRule
+    assert config.CONDITIONS["extension"] is HasExtension
+    assert config.SORT_BY["modified_date"] is modified_date
+    with pytest.raises(AttributeError):
+        config.UNKNOWN  # noqa: B018
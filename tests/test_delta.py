@@ -0,0 +1,71 @@
+"""Test module for pyfileflow.delta module.
+
+This module contains unit tests for the rolling-checksum delta transfer.
+"""
+
+import random
+from pathlib import Path
+
+import pytest
+
+from pyfileflow import delta
+
+BLOCK = 1024
+
+
+@pytest.fixture
+def data() -> bytes:
+    """Return reproducible random data, 100 blocks and a partial one."""
+    return random.Random(0).randbytes(100 * BLOCK + 17)
+
+
+def patch(tmp_path: Path, old: bytes, new: bytes) -> int:
+    """Patch a file containing old data to new data, and check the result."""
+    (tmp_path / "source").write_bytes(new)
+    (tmp_path / "destination").write_bytes(old)
+    written = delta.patch(tmp_path / "source", tmp_path / "destination", BLOCK)
+    assert (tmp_path / "destination").read_bytes() == new
+    return written
+
+
+def test_identical(tmp_path: Path, data: bytes) -> None:
+    """Test that an identical file is not written."""
+    assert patch(tmp_path, data, data) == 0
+
+
+def test_modified_block(tmp_path: Path, data: bytes) -> None:
+    """Test that a modified byte only rewrites its block."""
+    new = bytearray(data)
+    new[50 * BLOCK + 3] ^= 1
+    assert patch(tmp_path, data, bytes(new)) == BLOCK
+
+
+def test_deleted_range(tmp_path: Path, data: bytes) -> None:
+    """Test that data after a deleted range is found at its new offset."""
+    new = data[: 90 * BLOCK] + data[91 * BLOCK + 5 :]
+    assert patch(tmp_path, data, new) < 10 * BLOCK
+
+
+def test_inserted_data(tmp_path: Path, data: bytes) -> None:
+    """Test that inserted data is transferred, rewriting the rest of the file."""
+    patch(tmp_path, data, data[: 10 * BLOCK] + b"inserted" + data[10 * BLOCK :])
+
+
+@pytest.mark.parametrize("size", [0, 100, 3 * BLOCK])
+def test_sizes(tmp_path: Path, data: bytes, size: int) -> None:
+    """Test truncated, grown and emptied files."""
+    patch(tmp_path, data, data[:size])
+    patch(tmp_path, data[:size], data)
+
+
+def test_delta_operations(data: bytes, tmp_path: Path) -> None:
+    """Test that blocks are only reused at their offset or earlier."""
+    (tmp_path / "old").write_bytes(data)
+    (tmp_path / "new").write_bytes(data[BLOCK:])
+    with open(tmp_path / "old", "rb") as old, open(tmp_path / "new", "rb") as new:
+        operations = list(delta.delta(new, delta.signature(old, BLOCK), BLOCK))
+
+    assert operations[0] == (0, 1)
+    for offset, operation in operations:
+        if isinstance(operation, int):
+            assert operation * BLOCK >= offset
@@ -0,0 +1,213 @@
+"""Test module for pyfileflow.extractors module.
+
+This module contains unit tests for the built-in sort_by extractors.
+"""
+
+import pickle
+import struct
+from pathlib import Path
+
+import pytest
+
+from pyfileflow import extractors
+from pyfileflow.ppath import PPath
+
+
+def make_tiff(model: bytes, date: bytes, order: str = "<") -> bytes:
+    """Build TIFF data with a camera model and an EXIF DateTimeOriginal.
+
+    Args:
+        model (bytes): The camera model, NUL terminated.
+        date (bytes): The date, NUL terminated.
+        order (str): The byte order. Defaults to "<".
+
+    Returns:
+        bytes: The TIFF data.
+    """
+    header = (b"II*\x00" if order == "<" else b"MM\x00*") + struct.pack(f"{order}I", 8)
+    ifd0_size = 2 + 2 * 12 + 4
+    exif_offset = 8 + ifd0_size
+    exif_size = 2 + 12 + 4
+    model_offset = exif_offset + exif_size
+    date_offset = model_offset + len(model)
+
+    ifd0 = struct.pack(f"{order}H", 2)
+    ifd0 += struct.pack(f"{order}HHII", 0x0110, 2, len(model), model_offset)
+    ifd0 += struct.pack(f"{order}HHII", 0x8769, 4, 1, exif_offset)
+    ifd0 += struct.pack(f"{order}I", 0)
+
+    exif = struct.pack(f"{order}H", 1)
+    exif += struct.pack(f"{order}HHII", 0x9003, 2, len(date), date_offset)
+    exif += struct.pack(f"{order}I", 0)
+    return header + ifd0 + exif + model + date
+
+
+def make_jpeg(tiff: bytes) -> bytes:
+    """Build a JPEG header with an APP0 segment and an EXIF segment.
+
+    Args:
+        tiff (bytes): The TIFF data of the EXIF segment.
+
+    Returns:
+        bytes: The JPEG data.
+    """
+    app0 = b"JFIF\x00" + bytes(9)
+    app1 = extractors.EXIF_HEADER + tiff
+    return (
+        b"\xff\xd8"
+        + b"\xff\xe0"
+        + struct.pack(">H", len(app0) + 2)
+        + app0
+        + b"\xff\xe1"
+        + struct.pack(">H", len(app1) + 2)
+        + app1
+        + b"\xff\xda"
+        + bytes(1024)
+    )
+
+
+def make_mp4(created: int, version: int = 0) -> bytes:
+    """Build an MP4 file with the movie header after the media data.
+
+    Args:
+        created (int): The creation time, in seconds since 1904.
+        version (int): The version of the movie header. Defaults to 0.
+
+    Returns:
+        bytes: The MP4 data.
+    """
+    ftyp = struct.pack(">I4s", 16, b"ftyp") + b"isom" + bytes(4)
+    mdat = struct.pack(">I4s", 8 + 4096, b"mdat") + bytes(4096)
+    times = ">QQ" if version == 1 else ">II"
+    mvhd_content = bytes([version, 0, 0, 0]) + struct.pack(times, created, created)
+    mvhd = struct.pack(">I4s", 8 + len(mvhd_content), b"mvhd") + mvhd_content
+    moov = struct.pack(">I4s", 8 + len(mvhd), b"moov") + mvhd
+    return ftyp + mdat + moov
+
+
+@pytest.mark.parametrize("order", ["<", ">"])
+def test_jpeg_exif(tmp_path: Path, order: str) -> None:
+    """Test reading the date and the camera model of a JPEG file."""
+    path = tmp_path / "photo.jpg"
+    path.write_bytes(make_jpeg(make_tiff(b"Camera X\x00", b"2023:07:14 10:30:00\x00")))
+
+    assert extractors.date_taken(PPath(path)) == "2023-07-14"
+    assert extractors.camera_model(PPath(path)) == "Camera X"
+    assert extractors.capture_date(PPath(path)) == "2023-07-14"
+
+
+def test_tiff_exif(tmp_path: Path) -> None:
+    """Test reading the date of a TIFF file."""
+    path = tmp_path / "photo.tif"
+    path.write_bytes(make_tiff(b"Camera\x00", b"2020:01:02 03:04:05\x00", ">"))
+
+    assert extractors.date_taken(PPath(path)) == "2020-01-02"
+
+
+def test_jpeg_without_exif(tmp_path: Path) -> None:
+    """Test that a JPEG file without EXIF data raises KeyError."""
+    path = tmp_path / "photo.jpg"
+    path.write_bytes(b"\xff\xd8\xff\xe0\x00\x04\x00\x00\xff\xda")
+
+    with pytest.raises(KeyError):
+        extractors.date_taken(PPath(path))
+
+
+def test_not_an_image(tmp_path: Path) -> None:
+    """Test that unsupported files raise ValueError."""
+    path = tmp_path / "notes.txt"
+    path.write_text("not an image")
+
+    with pytest.raises(ValueError):
+        extractors.camera_model(PPath(path))
+
+    with pytest.raises(ValueError):
+        extractors.capture_date(PPath(path))
+
+
+def test_media_created(tmp_path: Path) -> None:
+    """Test reading the creation date of an MP4 file."""
+    path = tmp_path / "video.mp4"
+    path.write_bytes(make_mp4(1689330600 - extractors.MP4_EPOCH))
+
+    assert extractors.media_created(PPath(path)) == "2023-07-14"
+    assert extractors.capture_date(PPath(path)) == "2023-07-14"
+
+
+def test_media_created_version_1(tmp_path: Path) -> None:
+    """Test reading the 64-bit creation date of a version 1 movie header."""
+    path = tmp_path / "video.mov"
+    path.write_bytes(make_mp4(1689330600 - extractors.MP4_EPOCH, version=1))
+
+    assert extractors.media_created(PPath(path)) == "2023-07-14"
+
+
+@pytest.mark.parametrize("version, size", [(0, 7), (1, 8), (1, 11)])
+def test_media_created_truncated(tmp_path: Path, version: int, size: int) -> None:
+    """Test that a movie header too short for its version raises KeyError."""
+    mvhd_content = bytes([version, 0, 0, 0]) + b"\x01" * (size - 4)
+    mvhd = struct.pack(">I4s", 8 + size, b"mvhd") + mvhd_content
+    # The movie header box is followed by another box, which must not be read.
+    free = struct.pack(">I4s", 16, b"free") + b"\x01" * 8
+    moov = struct.pack(">I4s", 8 + len(mvhd) + len(free), b"moov") + mvhd + free
+    path = tmp_path / "video.mov"
+    path.write_bytes(moov)
+
+    with pytest.raises(KeyError, match="Truncated"):
+        extractors.media_created(PPath(path))
+
+
+def test_media_created_missing(tmp_path: Path) -> None:
+    """Test that videos without a creation date raise KeyError."""
+    path = tmp_path / "video.mp4"
+    path.write_bytes(make_mp4(0))
+
+    with pytest.raises(KeyError):
+        extractors.media_created(PPath(path))
+
+    path.write_bytes(make_mp4(0)[:-28])
+    with pytest.raises(KeyError):
+        extractors.media_created(PPath(path))
+
+
+def test_truncated(tmp_path: Path) -> None:
+    """Test that truncated headers raise ValueError."""
+    path = tmp_path / "photo.tif"
+    path.write_bytes(b"II*\x00\x08")
+    with pytest.raises(ValueError, match="Truncated"):
+        extractors.date_taken(PPath(path))
+
+    path = tmp_path / "video.mp4"
+    path.write_bytes(struct.pack(">I4s", 1, b"moov"))
+    with pytest.raises(ValueError, match="Truncated"):
+        extractors.media_created(PPath(path))
+
+
+@pytest.mark.parametrize("length", [0, 1])
+def test_jpeg_invalid_segment_length(tmp_path: Path, length: int) -> None:
+    """Test that a JPEG segment shorter than its own length raises ValueError."""
+    path = tmp_path / "photo.jpg"
+    for marker in (b"\xe0", b"\xe1"):
+        path.write_bytes(b"\xff\xd8\xff" + marker + struct.pack(">H", length))
+        with pytest.raises(ValueError, match="segment length"):
+            extractors.date_taken(PPath(path))
+
+
+def test_non_ascii_tags(tmp_path: Path) -> None:
+    """Test that tags of another type are treated as missing."""
+    header = b"II*\x00" + struct.pack("<I", 8)
+    ifd = struct.pack("<H", 2)
+    ifd += struct.pack("<HHIH", 0x0110, 3, 1, 7) + bytes(2)
+    ifd += struct.pack("<HHI", 0x0132, 4, 1) + struct.pack("<I", 7)
+    path = tmp_path / "photo.tif"
+    path.write_bytes(header + ifd + bytes(4))
+
+    with pytest.raises(KeyError):
+        extractors.camera_model(PPath(path))
+    with pytest.raises(KeyError):
+        extractors.date_taken(PPath(path))
+
+
+def test_picklable() -> None:
+    """Test that extractors can be sent to a process pool."""
+    assert pickle.loads(pickle.dumps(extractors.date_taken)) is extractors.date_taken
@@ -0,0 +1,181 @@
+"""Test module for pyfileflow.index module.
+
+This module contains unit tests for the MetadataIndex class.
+"""
+
+import os
+from pathlib import Path
+
+import pytest
+
+from pyfileflow.backend import MemoryBackend, use_backend
+from pyfileflow.conditions import HasExtension, LargerThan, OlderThan
+from pyfileflow.index import MetadataIndex
+from pyfileflow.prefilter import PrefilterSet
+from pyfileflow.record import RecordTable
+from pyfileflow.rule import DeleteRule
+
+OLD = 1_000_000_000
+
+
+def make_tree(root: Path) -> None:
+    """Create a small tree, with modification times old enough to be trusted."""
+    (root / "sub" / "deeper").mkdir(parents=True)
+    (root / "f1.txt").write_bytes(b"a" * 10)
+    (root / "f2.jpg").write_bytes(b"a" * 1000)
+    (root / "sub" / "f3.txt").write_bytes(b"a" * 1000)
+    (root / "sub" / "deeper" / "f4.txt").write_bytes(b"")
+    age(root)
+
+
+def age(root: Path) -> None:
+    """Set an old modification time on every folder of a tree."""
+    for folder, _, _ in os.walk(root):
+        os.utime(folder, ns=(OLD, OLD))
+
+
+def names(index: MetadataIndex, folder: Path, **kwargs) -> list[str]:
+    """Return the sorted names of the indexed entries of a folder."""
+    table = RecordTable()
+    return sorted(record.name for record in index.scan(table, folder, **kwargs))
+
+
+def test_refresh_incremental(tmp_path: Path) -> None:
+    """Test that only the modified folders are listed again."""
+    make_tree(tmp_path / "tree")
+    with MetadataIndex(tmp_path / "index.sqlite") as index:
+        assert index.refresh(tmp_path / "tree") == 3
+        assert index.refresh(tmp_path / "tree") == 0
+
+        (tmp_path / "tree" / "sub" / "f5.txt").touch()
+        os.utime(tmp_path / "tree" / "sub", ns=(OLD, OLD + 1))
+        assert index.refresh(tmp_path / "tree") == 1
+        assert names(index, tmp_path / "tree" / "sub") == ["deeper", "f3.txt", "f5.txt"]
+
+        assert index.refresh(tmp_path / "tree", full=True) == 3
+
+
+def test_refresh_racy_folder(tmp_path: Path) -> None:
+    """Test that recently modified folders are listed again on the next refresh."""
+    (tmp_path / "tree").mkdir()
+    with MetadataIndex(tmp_path / "index.sqlite") as index:
+        assert index.refresh(tmp_path / "tree") == 1
+        assert index.refresh(tmp_path / "tree") == 1
+
+
+def test_refresh_removed_folder(tmp_path: Path) -> None:
+    """Test that removed folders are removed from the index with their entries."""
+    make_tree(tmp_path / "tree")
+    with MetadataIndex(tmp_path / "index.sqlite") as index:
+        index.refresh(tmp_path / "tree")
+
+        (tmp_path / "tree" / "sub" / "deeper" / "f4.txt").unlink()
+        (tmp_path / "tree" / "sub" / "deeper").rmdir()
+        age(tmp_path / "tree")
+        os.utime(tmp_path / "tree" / "sub", ns=(OLD, OLD + 1))
+        index.refresh(tmp_path / "tree")
+
+        assert names(index, tmp_path / "tree", recursive=True) == [
+            "f1.txt",
+            "f2.jpg",
+            "f3.txt",
+        ]
+
+
+def test_index_persists(tmp_path: Path) -> None:
+    """Test that the index is kept between two sessions."""
+    make_tree(tmp_path / "tree")
+    with MetadataIndex(tmp_path / "index.sqlite") as index:
+        index.refresh(tmp_path / "tree")
+    with MetadataIndex(tmp_path / "index.sqlite") as index:
+        assert index.refresh(tmp_path / "tree") == 0
+        assert names(index, tmp_path / "tree") == ["f1.txt", "f2.jpg", "sub"]
+
+
+def test_scan_prefilter(tmp_path: Path) -> None:
+    """Test querying the index with prefilters."""
+    make_tree(tmp_path / "tree")
+    with MetadataIndex(tmp_path / "index.sqlite") as index:
+        index.refresh(tmp_path / "tree")
+        prefilter = PrefilterSet(
+            [HasExtension(".txt").prefilter().intersect(LargerThan(100).prefilter())]
+        )
+        assert names(index, tmp_path / "tree", recursive=True, prefilter=prefilter) == [
+            "f3.txt"
+        ]
+
+
+def test_scan_sibling_prefix(tmp_path: Path) -> None:
+    """Test that a folder query does not return the entries of similar folders."""
+    (tmp_path / "tree").mkdir()
+    (tmp_path / "tree_2").mkdir()
+    (tmp_path / "tree_2" / "f1.txt").touch()
+    with MetadataIndex(tmp_path / "index.sqlite") as index:
+        index.refresh(tmp_path / "tree")
+        index.refresh(tmp_path / "tree_2")
+        assert names(index, tmp_path / "tree", recursive=True) == []
+
+
+def test_process_with_index(tmp_path: Path) -> None:
+    """Test running a rule chain on index queries."""
+    make_tree(tmp_path / "tree")
+    with MetadataIndex(tmp_path / "index.sqlite") as index:
+        index.refresh(tmp_path / "tree")
+        rule = DeleteRule(condition=[HasExtension(".txt")])
+        rule.process(tmp_path / "tree", recursive=True, index=index)
+
+    assert not (tmp_path / "tree" / "f1.txt").exists()
+    assert not (tmp_path / "tree" / "sub" / "deeper" / "f4.txt").exists()
+    assert (tmp_path / "tree" / "f2.jpg").exists()
+
+
+def test_process_modified_in_place(tmp_path: Path) -> None:
+    """Test that rules see the current data of a file modified in place."""
+    folder = tmp_path / "logs"
+    folder.mkdir()
+    (folder / "app.log").write_text("old\n")
+    (folder / "removed.log").write_text("old\n")
+    os.utime(folder / "app.log", ns=(OLD, OLD))
+    os.utime(folder / "removed.log", ns=(OLD, OLD))
+    age(folder)
+
+    with MetadataIndex(tmp_path / "index.sqlite") as index:
+        index.refresh(folder)
+
+        # Appending to the log updates its modification time, not its folder's.
+        with open(folder / "app.log", "a") as log:
+            log.write("new\n")
+        (folder / "removed.log").unlink()
+        age(folder)
+        assert index.refresh(folder) == 0
+
+        DeleteRule(condition=OlderThan("30d")).process(folder, index=index)
+
+    assert (folder / "app.log").read_text() == "old\nnew\n"
+
+
+def test_scan_symlinks(tmp_path: Path) -> None:
+    """Test ignoring symbolic links, and that they cannot be followed."""
+    make_tree(tmp_path / "tree")
+    os.symlink(tmp_path / "tree" / "f1.txt", tmp_path / "tree" / "f5.txt")
+
+    with MetadataIndex(tmp_path / "index.sqlite") as index:
+        index.refresh(tmp_path / "tree")
+        assert "f5.txt" in names(index, tmp_path / "tree")
+        assert "f5.txt" not in names(index, tmp_path / "tree", symlinks="ignore")
+        with pytest.raises(ValueError):
+            names(index, tmp_path / "tree", symlinks="follow")
+
+
+def test_index_memory_backend(tmp_path: Path) -> None:
+    """Test that the index lists and stats entries through the current backend."""
+    backend = MemoryBackend()
+    backend.add_file("/tree/f1.txt", size=10, mtime_ns=OLD)
+    backend.add_file("/tree/sub/f2.txt", size=1000, mtime_ns=OLD)
+
+    with use_backend(backend), MetadataIndex(":memory:") as index:
+        assert index.refresh("/tree") == 2
+        assert names(index, Path("/tree"), recursive=True) == ["f1.txt", "f2.txt"]
+
+        backend.unlink("/tree/f1.txt")
+        assert names(index, Path("/tree")) == ["sub"]
@@ -93,3 +93,39 @@ def test_extension() -> None:
     """Test the extension argument of PPath."""
     assert PPath("file.txt").extension == ".txt"
     assert PPath("file.tar.gz").extension == ".tar.gz"
+
+
+def test_hold_delete(fs: FakeFilesystem) -> None:
+    """Test that a held deletion happens when the last hold is released."""
+    path = PPath("file")
+    path.touch()
+
+    path.hold_delete()
+    path.hold_delete()
+    path.plan_delete()
+    path.delete_if_planned()
+    assert path.exists()
+
+    path.release_delete()
+    assert path.exists()
+
+    path.release_delete()
+    assert not path.exists()
+
+
+def test_branch_record(fs: FakeFilesystem) -> None:
+    """Test that each branch of a path has its own record."""
+    path = PPath("file")
+    path.touch()
+    path.record
+
+    first, second = path.branch(), path.branch()
+    first.plan_delete()
+    assert first.record.planned_delete
+    assert not second.record.planned_delete
+    assert not path.record.planned_delete
+    assert second.record.size == path.record.size
+
+    first.delete_if_planned()
+    assert path.record.planned_delete
+    assert not path.branch().record.planned_delete
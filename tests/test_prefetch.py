@@ -0,0 +1,96 @@
+"""Test module for pyfileflow.prefetch module.
+
+This module contains unit tests for the Prefetcher class.
+"""
+
+import os
+from pathlib import Path
+from unittest import mock
+
+import pytest
+
+from pyfileflow import prefetch
+from pyfileflow.ppath import PPath
+from pyfileflow.prefetch import Prefetcher
+from pyfileflow.rule import Rule
+
+pytestmark = pytest.mark.skipif(
+    not hasattr(os, "posix_fadvise"), reason="requires posix_fadvise"
+)
+
+
+@pytest.fixture
+def files(tmp_path: Path) -> list[PPath]:
+    """Create 5 files of 100 bytes."""
+    paths = []
+    for i in range(5):
+        (tmp_path / f"f{i}").write_bytes(b"a" * 100)
+        paths.append(PPath(tmp_path / f"f{i}"))
+    return paths
+
+
+def advices(advise: mock.Mock, advice: int) -> list[str]:
+    """Return the names of the files that received an advice."""
+    return [
+        call.args[0].name for call in advise.call_args_list if call.args[1] == advice
+    ]
+
+
+def test_depth(files: list[PPath]) -> None:
+    """Test that the next files are prefetched, and processed ones dropped."""
+    with mock.patch.object(prefetch, "advise", wraps=prefetch.advise) as advise:
+        iterator = Prefetcher(depth=2, drop=True).iterate(files)
+        assert next(iterator) == files[0]
+        assert advices(advise, os.POSIX_FADV_WILLNEED) == ["f0", "f1"]
+        assert advices(advise, os.POSIX_FADV_DONTNEED) == []
+
+        assert next(iterator) == files[1]
+        assert advices(advise, os.POSIX_FADV_WILLNEED) == ["f0", "f1", "f2"]
+        assert advices(advise, os.POSIX_FADV_DONTNEED) == ["f0"]
+
+        assert list(iterator) == files[2:]
+        assert advices(advise, os.POSIX_FADV_DONTNEED) == ["f0", "f1", "f2", "f3", "f4"]
+
+
+def test_no_drop(files: list[PPath]) -> None:
+    """Test that processed files stay in the page cache by default."""
+    with mock.patch.object(prefetch, "advise") as advise:
+        assert list(Prefetcher(depth=2).iterate(files)) == files
+        assert advices(advise, os.POSIX_FADV_WILLNEED) == [f"f{i}" for i in range(5)]
+        assert advices(advise, os.POSIX_FADV_DONTNEED) == []
+
+
+def test_budget(files: list[PPath]) -> None:
+    """Test that files are only prefetched within the memory budget."""
+    with mock.patch.object(prefetch, "advise") as advise:
+        iterator = Prefetcher(depth=5, budget=250, drop=False).iterate(files)
+        next(iterator)
+        assert advices(advise, os.POSIX_FADV_WILLNEED) == ["f0", "f1"]
+        next(iterator)
+        assert advices(advise, os.POSIX_FADV_WILLNEED) == ["f0", "f1", "f2"]
+
+    with mock.patch.object(prefetch, "advise") as advise:
+        next(Prefetcher(budget=10).iterate(files))
+        assert advise.call_args_list == [
+            mock.call(files[0], os.POSIX_FADV_WILLNEED, 10)
+        ]
+
+
+def test_missing_file(tmp_path: Path) -> None:
+    """Test that files removed before being prefetched are passed through."""
+    assert list(Prefetcher().iterate([PPath(tmp_path / "missing")])) == [
+        PPath(tmp_path / "missing")
+    ]
+    assert not prefetch.advise(PPath(tmp_path / "missing"), os.POSIX_FADV_WILLNEED)
+
+
+def test_process_with_prefetch(files: list[PPath], tmp_path: Path) -> None:
+    """Test processing a folder with a prefetcher."""
+    processed = []
+
+    class RecordRule(Rule):
+        def apply_rule(self, path: PPath) -> None:
+            processed.append(path.name)
+
+    RecordRule().process(tmp_path, prefetch=Prefetcher(depth=2))
+    assert sorted(processed) == ["f0", "f1", "f2", "f3", "f4"]
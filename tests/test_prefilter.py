@@ -0,0 +1,131 @@
+"""Test module for pyfileflow.prefilter module.
+
+This module contains unit tests for the traversal prefilters and the pruning of
+the scanned folders.
+"""
+
+import os
+
+from pyfakefs.fake_filesystem import FakeFilesystem
+
+from pyfileflow.conditions import HasExtension, InFolder, LargerThan, NameMatches
+from pyfileflow.ppath import PPath
+from pyfileflow.prefilter import (
+    Prefilter,
+    PrefilterSet,
+    is_within,
+    prefilter_of,
+    suffixes,
+)
+from pyfileflow.record import FileRecord, RecordTable
+from pyfileflow.rule import DeleteRule
+
+
+def names(records: list[FileRecord]) -> list[str]:
+    """Return the sorted names of records."""
+    return sorted(record.name for record in records)
+
+
+def test_suffixes() -> None:
+    """Test that suffixes match PurePath.suffixes."""
+    assert suffixes("archive.tar.gz") == [".tar", ".gz"]
+    assert suffixes(".bashrc") == []
+    assert suffixes("name.") == []
+    assert suffixes("name") == []
+
+
+def test_is_within() -> None:
+    """Test that is_within compares whole path components."""
+    assert is_within(os.path.join(os.sep, "a", "b"), os.path.join(os.sep, "a"))
+    assert is_within(os.path.join(os.sep, "a"), os.path.join(os.sep, "a"))
+    assert not is_within(os.path.join(os.sep, "ab"), os.path.join(os.sep, "a"))
+
+
+def test_extensions() -> None:
+    """Test that an extension matches the last suffix or all the suffixes."""
+    prefilter = Prefilter(extensions=[".gz"])
+    assert prefilter.accepts(FileRecord(0, "archive.tar.gz"), "")
+    assert not prefilter.accepts(FileRecord(0, "archive.tar"), "")
+
+    prefilter = prefilter.intersect(Prefilter(extensions=[".tar.gz"]))
+    assert prefilter.accepts(FileRecord(0, "archive.tar.gz"), "")
+    assert not prefilter.accepts(FileRecord(0, "file.gz"), "")
+
+
+def test_prefilter_of() -> None:
+    """Test that the prefilters of the conditions of a rule are combined."""
+    prefilter = prefilter_of(
+        [HasExtension(".txt"), LargerThan(10), LargerThan(100), lambda path: True]
+    )
+    assert prefilter.size_above == 100
+    assert prefilter.accepts(FileRecord(0, "f.txt", size=101), "")
+    assert not prefilter.accepts(FileRecord(0, "f.txt", size=50), "")
+    assert not prefilter.accepts(FileRecord(0, "f.jpg", size=101), "")
+
+    assert prefilter_of([lambda path: True]).accepts_all
+
+
+def test_prefilter_set() -> None:
+    """Test that a PrefilterSet accepts entries accepted by any prefilter."""
+    prefilters = PrefilterSet(
+        [Prefilter(extensions=[".txt"]), Prefilter(patterns=["keep*"])]
+    )
+    assert prefilters.accepts(FileRecord(0, "f.txt"), "")
+    assert prefilters.accepts(FileRecord(0, "keep.jpg"), "")
+    assert not prefilters.accepts(FileRecord(0, "f.jpg"), "")
+    assert not prefilters.accepts_all
+    assert PrefilterSet([Prefilter(), Prefilter(is_dir=True)]).accepts_all
+
+
+def test_scan_prefilter(fs: FakeFilesystem) -> None:
+    """Test that rejected entries are not yielded."""
+    fs.create_file("/folder/f1.txt")
+    fs.create_file("/folder/f2.jpg")
+
+    table = RecordTable()
+    prefilter = PrefilterSet([Prefilter(extensions=[".txt"])])
+    assert names(list(table.scan("/folder", prefilter=prefilter))) == ["f1.txt"]
+
+
+def test_scan_recursive(fs: FakeFilesystem) -> None:
+    """Test that a recursive scan yields the files of the sub-folders."""
+    fs.create_file("/folder/f1.txt")
+    fs.create_file("/folder/sub/f2.txt")
+    fs.create_file("/folder/sub/deeper/f3.txt")
+
+    table = RecordTable()
+    records = list(table.scan("/folder", recursive=True))
+    assert names(records) == ["f1.txt", "f2.txt", "f3.txt"]
+    (deeper,) = [record for record in records if record.name == "f3.txt"]
+    assert table.path(deeper) == PPath("/folder/sub/deeper/f3.txt")
+
+
+def test_scan_prunes_folders(fs: FakeFilesystem) -> None:
+    """Test that sub-folders that cannot contain accepted entries are not scanned."""
+    fs.create_file("/folder/keep/f1.txt")
+    fs.create_file("/folder/keep/sub/f2.txt")
+    fs.create_file("/folder/skip/f3.txt")
+
+    table = RecordTable()
+    prefilter = PrefilterSet([InFolder("/folder/keep").prefilter()])
+    records = list(table.scan("/folder", recursive=True, prefilter=prefilter))
+
+    assert names(records) == ["f1.txt", "f2.txt"]
+    assert "/folder/skip" not in table.parents
+
+
+def test_process_recursive(fs: FakeFilesystem) -> None:
+    """Test processing a folder recursively with prefiltered conditions."""
+    fs.create_file("/folder/f1.txt")
+    fs.create_file("/folder/f2.jpg")
+    fs.create_file("/folder/sub/f3.txt")
+    fs.create_file("/folder/sub/f4.log")
+
+    rule = DeleteRule(condition=[HasExtension(".txt")], next=None)
+    rule.next = DeleteRule(condition=[NameMatches("*.log")])
+    rule.process("/folder", recursive=True)
+
+    assert not os.path.exists("/folder/f1.txt")
+    assert not os.path.exists("/folder/sub/f3.txt")
+    assert not os.path.exists("/folder/sub/f4.log")
+    assert os.path.exists("/folder/f2.jpg")
@@ -0,0 +1,198 @@
+"""Test module for pyfileflow.record module.
+
+This module contains unit tests for the FileRecord and RecordTable classes.
+"""
+
+import os
+import tracemalloc
+from pathlib import Path
+from unittest import mock
+
+import pytest
+from pyfakefs.fake_filesystem import FakeFilesystem
+
+from pyfileflow.ppath import PPath
+from pyfileflow.record import (
+    FLAG_PLANNED_DELETE,
+    FileRecord,
+    RecordTable,
+    inode_key,
+    unique_inodes,
+)
+
+
+def test_record_is_slotted() -> None:
+    """Test that records and paths do not carry a per-instance dict."""
+    assert not hasattr(FileRecord(0, "name"), "__dict__")
+    assert not hasattr(PPath("name"), "__dict__")
+
+
+def test_scan(fs: FakeFilesystem) -> None:
+    """Test scanning a folder into a RecordTable.
+
+    This test checks that every entry is recorded with its stat data and that
+    parent folders are only stored once.
+    """
+    fs.create_file("/folder/f1.txt", contents="abc")
+    fs.create_file("/folder/f2.txt")
+    fs.create_dir("/folder/sub")
+
+    table = RecordTable()
+    records = {record.name: record for record in table.scan("/folder")}
+
+    assert len(table) == 3
+    assert table.parents == ["/folder"]
+    assert records["f1.txt"].size == 3
+    assert records["sub"].is_dir
+    assert not records["f2.txt"].is_dir
+
+
+def test_scan_no_store(fs: FakeFilesystem) -> None:
+    """Test scanning a folder without keeping the records."""
+    fs.create_file("/folder/f1.txt")
+
+    table = RecordTable()
+    assert [record.name for record in table.scan("/folder", store=False)] == ["f1.txt"]
+    assert len(table) == 0
+
+
+def test_path(fs: FakeFilesystem) -> None:
+    """Test materialising a PPath from a record.
+
+    The path must point to the entry and carry the record, so that the stat
+    data is not fetched again.
+    """
+    fs.create_file("/folder/f1.txt", contents="abc")
+
+    table = RecordTable()
+    (record,) = table.scan("/folder")
+    path = table.path(record)
+
+    assert path == PPath("/folder/f1.txt")
+    assert path.record is record
+
+    path.plan_delete()
+    assert record.flags & FLAG_PLANNED_DELETE
+    assert table.path(record)._planned_delete
+
+
+def test_path_record_without_table(fs: FakeFilesystem) -> None:
+    """Test the record of a path that was not built from a RecordTable."""
+    fs.create_file("/f1.txt", contents="abcd")
+
+    path = PPath("/f1.txt")
+    assert path.record.size == 4
+    assert path.record is path.record
+
+
+def make_linked_tree(root: Path) -> None:
+    """Create a tree with a hard link, a linked folder and a symlink loop."""
+    (root / "sub").mkdir()
+    (root / "sub" / "f1.txt").write_text("data")
+    os.link(root / "sub" / "f1.txt", root / "f2.txt")
+    os.symlink(root / "sub", root / "linked")
+    os.symlink(root, root / "sub" / "loop")
+    os.symlink(root / "missing", root / "broken")
+
+
+def test_scan_symlinks(tmp_path: Path) -> None:
+    """Test the handling of symbolic links by a recursive scan."""
+    make_linked_tree(tmp_path)
+
+    def scan(symlinks: str) -> list[str]:
+        table = RecordTable()
+        return sorted(
+            os.path.relpath(table.path(record), tmp_path)
+            for record in table.scan(tmp_path, recursive=True, symlinks=symlinks)
+        )
+
+    assert scan("keep") == ["broken", "f2.txt", os.path.join("sub", "f1.txt")]
+    assert scan("ignore") == ["f2.txt", os.path.join("sub", "f1.txt")]
+    # The loop and the second link to "sub" are only descended once.
+    assert scan("follow") in (
+        ["broken", "f2.txt", os.path.join("linked", "f1.txt")],
+        ["broken", "f2.txt", os.path.join("sub", "f1.txt")],
+    )
+
+
+def test_scan_ignore_symlinked_files(tmp_path: Path) -> None:
+    """Test that ignored symbolic links to files are not yielded."""
+    (tmp_path / "f1.txt").touch()
+    os.symlink(tmp_path / "f1.txt", tmp_path / "f2.txt")
+
+    table = RecordTable()
+    names = [record.name for record in table.scan(tmp_path, symlinks="ignore")]
+    assert names == ["f1.txt"]
+    assert len(list(table.scan(tmp_path))) == 2
+
+
+def test_unique_inodes(tmp_path: Path) -> None:
+    """Test that only the first link of an inode is kept."""
+    make_linked_tree(tmp_path)
+
+    table = RecordTable()
+    records = [
+        record
+        for record in unique_inodes(table.scan(tmp_path, recursive=True))
+        if not record.is_symlink
+    ]
+    assert len(records) == 1
+
+    st = os.stat(tmp_path / "f2.txt")
+    assert records[0].inode == inode_key(st.st_dev, st.st_ino)
+    assert inode_key(1, 2) != inode_key(2, 1)
+
+
+def test_scan_broken_symlink(tmp_path: Path) -> None:
+    """Test that broken symbolic links are scanned with their own stat data."""
+    os.symlink(tmp_path / "missing", tmp_path / "broken")
+
+    (record,) = RecordTable().scan(tmp_path)
+    assert record.name == "broken"
+    assert record.is_symlink and not record.is_dir
+
+
+def test_scan_snapshot(tmp_path: Path) -> None:
+    """Test that entries created while scanning a folder are not yielded."""
+    for index in range(10):
+        (tmp_path / f"f{index}").touch()
+
+    names = []
+    for record in RecordTable().scan(tmp_path):
+        names.append(record.name)
+        (tmp_path / f"{record.name}.new").touch()
+    assert sorted(names) == [f"f{index}" for index in range(10)]
+
+
+def test_scan_listing_memory(tmp_path: Path) -> None:
+    """Test that listing a folder only keeps the records of its entries."""
+    count = 2000
+    for index in range(count):
+        (tmp_path / f"file_{index:06d}.txt").touch()
+
+    tracemalloc.start()
+    try:
+        next(RecordTable().scan(tmp_path, store=False))
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    # Keeping the directory entries too takes about 1 KB per entry.
+    assert peak / count < 600
+
+
+def test_scan_unreadable_entry(tmp_path: Path) -> None:
+    """Test that only the entries removed while listing a folder are skipped."""
+    for name in ("f1", "f2"):
+        (tmp_path / name).touch()
+    from_entry = FileRecord.from_entry
+
+    def vanish(parent: int, entry: os.DirEntry) -> FileRecord:
+        if entry.name == "f1":
+            raise FileNotFoundError(entry.path)
+        return from_entry(parent, entry)
+
+    with mock.patch.object(FileRecord, "from_entry", side_effect=vanish):
+        assert [record.name for record in RecordTable().scan(tmp_path)] == ["f2"]
+    with mock.patch.object(FileRecord, "from_entry", side_effect=PermissionError):
+        with pytest.raises(PermissionError):
+            list(RecordTable().scan(tmp_path))
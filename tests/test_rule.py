@@ -3,13 +3,28 @@
 This module contains unit tests for the various rule classes in the pyfileflow library.
 """
 
+import os
+import tarfile
+import zipfile
+from pathlib import Path
+from unittest import mock
+
 import pytest
 from pyfakefs.fake_filesystem import FakeFilesystem
 from typeguard_ignore import suppress_type_checks
-from typing_extensions import Never
+from typing_extensions import Any, Never
 
 from pyfileflow.ppath import PPath
-from pyfileflow.rule import CopyByValueRule, CopyRule, DeleteRule, MoveRule, Rule
+from pyfileflow.rule import (
+    ArchiveRule,
+    BranchRule,
+    CopyByValueRule,
+    CopyRule,
+    DeleteRule,
+    MoveRule,
+    Rule,
+    SwitchRule,
+)
 
 
 # Rule class
@@ -328,3 +343,272 @@ def test_apply_copy_by_value_rule_skip() -> None:
 
     with pytest.raises(TypeError):
         rule.apply_rule(file)
+
+
+# ArchiveRule class
+def test_archive_rule(tmp_path: Path) -> None:
+    """Test packing files into rolling tar archives.
+
+    This test checks that archives are split by number of files, and that the
+    archived files are kept.
+    """
+    source = tmp_path / "source"
+    source.mkdir()
+    for index in range(5):
+        (source / f"{index}.log").write_text(str(index))
+
+    archives = tmp_path / "archives"
+    archives.mkdir()
+
+    rule = ArchiveRule(destination=archives, compression="gz", max_count=2)
+    rule.process(source)
+
+    names = sorted(path.name for path in archives.iterdir())
+    assert names == [f"archive-0000{index}.tar.gz" for index in (1, 2, 3)]
+
+    members = []
+    for name in names:
+        with tarfile.open(archives / name) as archive:
+            members += archive.getnames()
+    assert sorted(members) == [f"{index}.log" for index in range(5)]
+    assert len(list(source.iterdir())) == 5
+
+
+def test_archive_rule_remove_source(tmp_path: Path) -> None:
+    """Test that archived files are deleted only once the archive is complete."""
+    source = tmp_path / "source"
+    source.mkdir()
+    (source / "a.log").write_text("a")
+
+    with ArchiveRule(destination=tmp_path, format="zip", remove_source=True) as rule:
+        path = PPath(source / "a.log")
+        assert not rule.apply_rule(path)
+
+    assert not path.exists()
+    with zipfile.ZipFile(tmp_path / "archive-00001.zip") as archive:
+        assert archive.read("a.log") == b"a"
+
+
+def test_archive_rule_planned_delete(tmp_path: Path) -> None:
+    """Test that a deletion planned by another rule waits for the archive."""
+    (tmp_path / "a.log").write_text("a")
+
+    rule = ArchiveRule(DeleteRule(), destination=tmp_path, max_size="1KB")
+    rule.process_file(tmp_path / "a.log")
+    rule.close()
+
+    assert not (tmp_path / "a.log").exists()
+    with tarfile.open(tmp_path / "archive-00001.tar") as archive:
+        assert archive.getnames() == ["a.log"]
+
+
+def test_archive_rule_same_names(tmp_path: Path) -> None:
+    """Test that files with the same name in different folders are all kept."""
+    source = tmp_path / "source"
+    for folder in ("a", "b"):
+        (source / folder).mkdir(parents=True)
+        (source / folder / "f.log").write_text(folder)
+
+    rule = ArchiveRule(destination=tmp_path, remove_source=True)
+    rule.process(source, recursive=True)
+
+    with tarfile.open(tmp_path / "archive-00001.tar") as archive:
+        assert sorted(archive.getnames()) == ["a/f.log", "b/f.log"]
+        assert archive.extractfile("b/f.log").read() == b"b"  # type: ignore
+
+    # Without a processed folder, a file with the same name starts a new archive.
+    for folder in ("a", "b"):
+        (source / folder / "f.log").write_text(folder)
+    with ArchiveRule(destination=tmp_path, remove_source=True) as rule:
+        for folder in ("a", "b"):
+            rule.process_file(source / folder / "f.log")
+    for index, folder in ((2, "a"), (3, "b")):
+        with tarfile.open(tmp_path / f"archive-0000{index}.tar") as archive:
+            assert archive.extractfile("f.log").read() == folder.encode()  # type: ignore
+
+
+def test_archive_rule_error(tmp_path: Path) -> None:
+    """Test that a failed archive is removed and its files are kept."""
+    (tmp_path / "a.log").write_text("a")
+    archives = tmp_path / "archives"
+    archives.mkdir()
+
+    rule = ArchiveRule(destination=archives, remove_source=True)
+    with mock.patch("tarfile.TarFile.addfile", side_effect=OSError("disk full")):
+        with pytest.raises(OSError, match="disk full"):
+            rule.process(tmp_path)
+
+    assert (tmp_path / "a.log").exists()
+    assert not list(archives.iterdir())
+
+
+@pytest.mark.parametrize("format", ["tar", "zip"])
+def test_archive_rule_skip_unreadable(tmp_path: Path, format: str) -> None:
+    """Test that a file which cannot be opened is skipped and kept."""
+    inbox = tmp_path / "inbox"
+    inbox.mkdir()
+    for name in ("a.log", "b.log", "c.log"):
+        (inbox / name).write_text(name)
+    archives = tmp_path / "archives"
+    archives.mkdir()
+    real_open = open
+
+    def deny(file: Any, *args: Any, **kwargs: Any) -> Any:
+        if os.fspath(file).endswith("b.log"):
+            raise PermissionError(file)
+        return real_open(file, *args, **kwargs)
+
+    rule = ArchiveRule(destination=archives, format=format, remove_source=True)
+    with mock.patch("builtins.open", side_effect=deny):
+        rule.process(inbox)
+
+    assert [(path.name, type(error)) for path, error in rule.skipped] == [
+        ("b.log", PermissionError)
+    ]
+    assert sorted(path.name for path in inbox.iterdir()) == ["b.log"]
+    (archive,) = archives.iterdir()
+    if format == "zip":
+        with zipfile.ZipFile(archive) as opened:
+            assert sorted(opened.namelist()) == ["a.log", "c.log"]
+            assert opened.read("c.log") == b"c.log"
+    else:
+        with tarfile.open(archive) as opened:
+            assert sorted(opened.getnames()) == ["a.log", "c.log"]
+
+
+def test_archive_rule_synced(tmp_path: Path) -> None:
+    """Test that the archive and its folder are synced before the rename."""
+    inbox = tmp_path / "inbox"
+    inbox.mkdir()
+    (inbox / "a.log").write_text("a")
+    archives = tmp_path / "archives"
+    archives.mkdir()
+    calls = []
+    real_replace = os.replace
+
+    def replace(*args: Any) -> None:
+        calls.append("replace")
+        real_replace(*args)
+
+    with mock.patch("os.fsync", side_effect=lambda fd: calls.append("fsync")):
+        with mock.patch("os.replace", side_effect=replace):
+            ArchiveRule(destination=archives, remove_source=True).process(inbox)
+    assert calls == ["fsync", "replace", "fsync"]
+    assert not (inbox / "a.log").exists()
+
+
+def test_archive_rule_invalid() -> None:
+    """Test that unknown formats and compressions raise ValueError."""
+    with pytest.raises(ValueError):
+        ArchiveRule(format="rar")  # type: ignore[arg-type]
+
+    with pytest.raises(ValueError):
+        ArchiveRule(compression="zstd")  # type: ignore[arg-type]
+
+
+# BranchRule and SwitchRule classes
+def test_branch_rule(fs: FakeFilesystem) -> None:
+    """Test that every branch processes the file, and that deletion waits."""
+    fs.create_file("test.txt", contents="data")
+    rule = BranchRule(
+        CopyRule(destination="after.txt"),
+        branches=[
+            MoveRule(destination="moved/"),
+            CopyRule(destination="copy.txt"),
+        ],
+    )
+    PPath("moved").mkdir()
+
+    rule.process_file(PPath("test.txt"))
+
+    assert PPath("moved/test.txt").read_text() == "data"
+    assert PPath("copy.txt").read_text() == "data"
+    assert PPath("after.txt").read_text() == "data"
+    assert not PPath("test.txt").exists()
+
+
+def test_branch_rule_keeps_file(fs: FakeFilesystem) -> None:
+    """Test that a file is kept if no branch deletes it."""
+    fs.create_file("test.txt")
+    rule = BranchRule(branches=[CopyRule(destination="copy.txt")])
+
+    rule.process_file(PPath("test.txt"))
+
+    assert PPath("test.txt").exists()
+    assert PPath("copy.txt").exists()
+
+
+@suppress_type_checks
+def test_branch_rule_invalid() -> None:
+    """Test that branches must be rules."""
+    with pytest.raises(TypeError):
+        BranchRule(branches=["copy"])  # type: ignore
+
+
+def test_branch_rule_eq() -> None:
+    """Test the equality of branch rules."""
+    assert BranchRule(branches=[DeleteRule()]) == BranchRule(branches=[DeleteRule()])
+    assert BranchRule(branches=[DeleteRule()]) != BranchRule()
+
+
+def test_switch_rule(fs: FakeFilesystem) -> None:
+    """Test that a file only goes to the first matching branch."""
+    fs.create_file("inbox/a.txt")
+    fs.create_file("inbox/b.log")
+    fs.create_file("inbox/c.bin")
+    PPath("text").mkdir()
+    PPath("other").mkdir()
+    rule = SwitchRule(
+        branches=[
+            MoveRule(destination="text/", condition=lambda p: p.suffix == ".txt"),
+            DeleteRule(condition=lambda p: p.suffix == ".log"),
+            CopyRule(destination="other/"),
+        ]
+    )
+
+    rule.process(PPath("inbox"))
+
+    assert PPath("text/a.txt").exists() and not PPath("inbox/a.txt").exists()
+    assert not PPath("inbox/b.log").exists() and not PPath("other/b.log").exists()
+    assert PPath("other/c.bin").exists() and PPath("inbox/c.bin").exists()
+
+
+def test_switch_rule_checks_once(fs: FakeFilesystem) -> None:
+    """Test that the conditions of the matching branch are only checked once."""
+    fs.create_file("test.txt")
+    checked = []
+
+    def condition(path: PPath) -> bool:
+        checked.append(path)
+        return True
+
+    # The deletion planned by the next rule is held by the nested branch rule.
+    branch = BranchRule(DeleteRule(), condition=condition, branches=[Rule()])
+    with mock.patch.object(branch, "apply_rule", wraps=branch.apply_rule) as apply:
+        SwitchRule(branches=[branch]).process_file(PPath("test.txt"))
+
+    assert checked == [PPath("test.txt")]
+    apply.assert_called_once()
+    assert not PPath("test.txt").exists()
+
+
+def test_branch_rule_prefilters() -> None:
+    """Test that the prefilters of a branch rule cover its branches."""
+    from pyfileflow.conditions import HasExtension
+
+    rule = BranchRule(
+        DeleteRule(condition=HasExtension(".tmp")),
+        branches=[CopyRule(destination="/c", condition=HasExtension(".txt"))],
+    )
+
+    extensions = [prefilter.extensions for prefilter in rule.prefilters()]
+    assert extensions == [(frozenset({".txt"}),), (frozenset({".tmp"}),)]
+
+
+def test_delete_broken_symlink(tmp_path: Path) -> None:
+    """Test that a delete rule removes dangling symbolic links."""
+    os.symlink(tmp_path / "missing", tmp_path / "broken")
+
+    DeleteRule().process(tmp_path)
+
+    assert not os.path.lexists(tmp_path / "broken")
@@ -0,0 +1,159 @@
+"""Test module for pyfileflow.snapshot module.
+
+This module contains unit tests for the Snapshot and SnapshotDiff classes.
+"""
+
+import os
+from pathlib import Path
+
+import pytest
+
+from pyfileflow.backend import MemoryBackend, use_backend
+from pyfileflow.conditions import HasExtension
+from pyfileflow.ppath import PPath
+from pyfileflow.rule import DeleteRule
+from pyfileflow.snapshot import Snapshot
+
+OLD = 1_000_000_000
+
+
+@pytest.fixture
+def tree(tmp_path: Path) -> Path:
+    """Create a small tree, with modification times old enough to be trusted."""
+    root = tmp_path / "tree"
+    (root / "sub").mkdir(parents=True)
+    (root / "other").mkdir()
+    (root / "f1.txt").write_text("a")
+    (root / "f2.txt").write_text("b")
+    (root / "sub" / "f3.txt").write_text("c")
+    age(root)
+    return root
+
+
+def age(root: Path) -> None:
+    """Set an old modification time on every folder of a tree."""
+    for folder, _, _ in os.walk(root):
+        os.utime(folder, ns=(OLD, OLD))
+
+
+def test_take(tree: Path) -> None:
+    """Test that a snapshot records every folder of the tree."""
+    snapshot = Snapshot.take(tree)
+    assert sorted(snapshot.folders) == ["", "other", "sub"]
+    assert sorted(snapshot.folders[""][1]) == ["f1.txt", "f2.txt", "other", "sub"]
+    assert snapshot.folders["sub"][0] == OLD
+
+    assert sorted(Snapshot.take(tree, recursive=False).folders) == [""]
+
+
+def test_take_reuses_unchanged_folders(tree: Path) -> None:
+    """Test that folders whose modification time did not change are not listed."""
+    previous = Snapshot.take(tree)
+    (tree / "f4.txt").touch()
+
+    snapshot = Snapshot.take(tree, previous=previous)
+    assert snapshot.folders["sub"] is previous.folders["sub"]
+    assert snapshot.folders[""] is not previous.folders[""]
+    assert "f4.txt" in snapshot.folders[""][1]
+
+
+def test_diff(tree: Path) -> None:
+    """Test that added, removed, modified and renamed entries are reported."""
+    previous = Snapshot.take(tree)
+
+    (tree / "f4.txt").touch()
+    (tree / "f1.txt").unlink()
+    (tree / "f2.txt").write_text("modified")
+    (tree / "sub" / "f3.txt").rename(tree / "other" / "f3.txt")
+
+    diff = previous.diff(Snapshot.take(tree, previous=previous))
+    assert diff
+    assert diff.added == ["f4.txt"]
+    assert diff.removed == ["f1.txt"]
+    assert diff.modified == ["f2.txt"]
+    assert diff.renamed == [
+        (os.path.join("sub", "f3.txt"), os.path.join("other", "f3.txt"))
+    ]
+    assert sorted(diff.changed()) == [
+        PPath(tree / "f2.txt"),
+        PPath(tree / "f4.txt"),
+        PPath(tree / "other" / "f3.txt"),
+    ]
+
+
+def test_diff_new_folder(tree: Path) -> None:
+    """Test that the entries of new folders are reported, and folders skipped."""
+    previous = Snapshot.take(tree)
+    (tree / "new").mkdir()
+    (tree / "new" / "f4.txt").touch()
+
+    diff = previous.diff(Snapshot.take(tree, previous=previous))
+    assert diff.added == ["new", os.path.join("new", "f4.txt")]
+    assert list(diff.changed()) == [PPath(tree / "new" / "f4.txt")]
+
+
+def test_changed_options(tree: Path) -> None:
+    """Test that changed() handles links and leaves the diff untouched."""
+    previous = Snapshot.take(tree)
+    (tree / "f4.txt").touch()
+    os.link(tree / "f4.txt", tree / "f5.txt")
+    os.symlink(tree / "f4.txt", tree / "f6.txt")
+
+    diff = previous.diff(Snapshot.take(tree, previous=previous))
+    assert [path.name for path in diff.changed()] == ["f4.txt", "f5.txt", "f6.txt"]
+    assert [path.name for path in diff.changed("ignore")] == ["f4.txt", "f5.txt"]
+    assert [path.name for path in diff.changed("ignore", unique=True)] == ["f4.txt"]
+    with pytest.raises(ValueError):
+        next(diff.changed("follow"))
+
+    for path in diff.changed():
+        path.plan_delete()
+    assert all(
+        record.parent == 0 and not record.planned_delete
+        for record in diff.records.values()
+    )
+
+
+def test_diff_unchanged(tree: Path) -> None:
+    """Test the diff of a tree that did not change."""
+    previous = Snapshot.take(tree)
+    assert not previous.diff(Snapshot.take(tree, previous=previous))
+    assert not previous.diff(Snapshot.take(tree))
+
+
+def test_serialisation(tree: Path) -> None:
+    """Test that a snapshot survives serialisation."""
+    snapshot = Snapshot.take(tree)
+    assert Snapshot.from_bytes(snapshot.to_bytes()) == snapshot
+
+    with pytest.raises(ValueError):
+        Snapshot.from_bytes(b"garbage")
+
+
+def test_process_changes(tree: Path) -> None:
+    """Test feeding the changed files to a rule chain."""
+    previous = Snapshot.take(tree)
+    (tree / "f4.txt").touch()
+
+    rule = DeleteRule(condition=[HasExtension(".txt")])
+    for path in previous.diff(Snapshot.take(tree, previous=previous)).changed():
+        rule.process_file(path)
+
+    assert not (tree / "f4.txt").exists()
+    assert (tree / "f1.txt").exists()
+
+
+def test_take_memory_backend() -> None:
+    """Test that folders are listed through the current backend."""
+    backend = MemoryBackend()
+    backend.add_file("/tree/f1.txt", size=1)
+    backend.add_file("/tree/sub/f2.txt", size=2)
+
+    with use_backend(backend):
+        snapshot = Snapshot.take("/tree")
+        backend.add_file("/tree/sub/f3.txt")
+        diff = snapshot.diff(Snapshot.take("/tree", previous=snapshot))
+
+    assert sorted(snapshot.folders) == ["", "sub"]
+    assert snapshot.folders["sub"][1]["f2.txt"][0] == 2
+    assert list(diff.added) == [os.path.join("sub", "f3.txt")]
@@ -0,0 +1,91 @@
+"""Test module for pyfileflow.sniff module.
+
+This module contains unit tests for the content sniffing functions and the
+IsKind condition.
+"""
+
+from pathlib import Path
+from unittest import mock
+
+import pytest
+
+from pyfileflow import sniff
+from pyfileflow.backend import MemoryBackend, use_backend
+from pyfileflow.conditions import IsKind
+from pyfileflow.ppath import PPath
+
+
+@pytest.mark.parametrize(
+    ("header", "expected"),
+    [
+        (b"\xff\xd8\xff\xe0\x00\x10JFIF", sniff.FileType("image", "jpeg")),
+        (b"\x89PNG\r\n\x1a\n\x00", sniff.FileType("image", "png")),
+        (b"RIFF\x00\x00\x00\x00WEBPVP8 ", sniff.FileType("image", "webp")),
+        (b"\x00\x00\x00\x18ftypmp42", sniff.FileType("video", "mp4")),
+        (b"\x00\x00\x00\x14ftypqt  ", sniff.FileType("video", "quicktime")),
+        (b"%PDF-1.7\n", sniff.FileType("document", "pdf")),
+        (b"PK\x03\x04" + bytes(26) + b"word/", sniff.FileType("archive", "zip")),
+        (
+            b"PK\x03\x04" + bytes(26) + b"[Content_Types].xml",
+            sniff.FileType("document", "office"),
+        ),
+        (bytes(257) + b"ustar\x00", sniff.FileType("archive", "tar")),
+        (b"\x1f\x8b\x08\x00", sniff.FileType("archive", "gzip")),
+        (b"plain text", None),
+        (b"", None),
+    ],
+)
+def test_detect(header: bytes, expected: sniff.FileType | None) -> None:
+    """Test the detection of file types from headers."""
+    assert sniff.detect(header) == expected
+
+
+def test_read_header_is_bounded(tmp_path: Path) -> None:
+    """Test that only the header of a file is read."""
+    path = tmp_path / "big"
+    path.write_bytes(b"x" * (sniff.HEADER_SIZE * 4))
+
+    assert len(sniff.read_header(path)) == sniff.HEADER_SIZE
+    assert sniff.read_header(path, 16) == b"x" * 16
+
+
+def test_sniff_cache(tmp_path: Path) -> None:
+    """Test that results are cached until the file changes."""
+    sniff.clear_cache()
+    path = tmp_path / "image"
+    path.write_bytes(b"\x89PNG\r\n\x1a\n")
+
+    with mock.patch.object(sniff, "read_header", wraps=sniff.read_header) as read:
+        assert sniff.sniff(PPath(path)) == sniff.FileType("image", "png")
+        assert sniff.sniff(PPath(path)) == sniff.FileType("image", "png")
+        assert read.call_count == 1
+
+        path.write_bytes(b"%PDF-1.4 with a different size")
+        assert sniff.sniff(PPath(path)) == sniff.FileType("document", "pdf")
+        assert read.call_count == 2
+
+
+def test_sniff_dir(tmp_path: Path) -> None:
+    """Test that directories have no type."""
+    assert sniff.sniff(PPath(tmp_path)) is None
+
+
+def test_is_kind(tmp_path: Path) -> None:
+    """Test the IsKind condition with kinds and type names."""
+    path = tmp_path / "photo.dat"
+    path.write_bytes(b"\xff\xd8\xff\xe1")
+
+    assert IsKind("image")(PPath(path))
+    assert IsKind(["video", "jpeg"])(PPath(path))
+    assert not IsKind("document")(PPath(path))
+
+
+def test_sniff_memory_backend() -> None:
+    """Test that headers are read through the current backend."""
+    sniff.clear_cache()
+    backend = MemoryBackend()
+    backend.add_file("/data/image", size=1000, data=b"\x89PNG\r\n\x1a\n")
+
+    with use_backend(backend):
+        assert sniff.read_header("/data/image", 10) == b"\x89PNG\r\n\x1a\n\x00\x00"
+        assert sniff.sniff(PPath("/data/image")) == sniff.FileType("image", "png")
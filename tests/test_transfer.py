@@ -0,0 +1,213 @@
+"""Test module for pyfileflow.transfer module.
+
+This module contains unit tests for the verified copies and the manifest.
+"""
+
+import hashlib
+import os
+import shutil
+from pathlib import Path
+from unittest import mock
+
+import pytest
+from typing_extensions import Any
+
+from pyfileflow import transfer
+from pyfileflow.ppath import PPath
+from pyfileflow.rule import CopyRule, MoveRule
+
+
+def test_copy_verified(tmp_path: Path) -> None:
+    """Test that a verified copy returns the digest of the file."""
+    source = tmp_path / "source.bin"
+    source.write_bytes(b"data" * 1000)
+    (tmp_path / "folder").mkdir()
+
+    digest = transfer.copy_verified(source, tmp_path / "folder")
+
+    assert digest == hashlib.sha256(b"data" * 1000).hexdigest()
+    assert (tmp_path / "folder" / "source.bin").read_bytes() == b"data" * 1000
+
+
+def test_copy_verified_corrupted(tmp_path: Path) -> None:
+    """Test that a corrupted copy raises CopyVerificationError."""
+    source = tmp_path / "source.bin"
+    source.write_bytes(b"data")
+
+    (tmp_path / "copy.bin").write_bytes(b"previous")
+
+    with mock.patch.object(transfer, "file_digest", return_value="0"):
+        with pytest.raises(transfer.CopyVerificationError):
+            transfer.copy_verified(source, tmp_path / "copy.bin")
+
+    # The destination is kept, and the unverified copy is removed.
+    assert (tmp_path / "copy.bin").read_bytes() == b"previous"
+    assert sorted(path.name for path in tmp_path.iterdir()) == [
+        "copy.bin",
+        "source.bin",
+    ]
+
+
+def test_copy_verified_synced(tmp_path: Path) -> None:
+    """Test that the copy is synced before it replaces the destination."""
+    source = tmp_path / "source.bin"
+    source.write_bytes(b"data")
+    calls = []
+    real_replace = os.replace
+
+    def replace(*args: Any) -> None:
+        calls.append("replace")
+        real_replace(*args)
+
+    with mock.patch("os.fsync", side_effect=lambda fd: calls.append("fsync")):
+        with mock.patch("os.replace", side_effect=replace):
+            transfer.copy_verified(source, tmp_path / "copy.bin")
+    assert calls == ["fsync", "replace", "fsync"]
+
+
+def test_source_read_once(tmp_path: Path) -> None:
+    """Test that the source is read once and the destination once."""
+    source = tmp_path / "source.bin"
+    source.write_bytes(b"data")
+
+    with mock.patch.object(
+        transfer, "file_digest", wraps=transfer.file_digest
+    ) as file_digest:
+        transfer.copy_verified(source, tmp_path / "copy.bin", "md5")
+
+    # The copy is read back under its temporary name, before being renamed.
+    file_digest.assert_called_once()
+    copy, algorithm = file_digest.call_args.args
+    assert os.path.dirname(copy) == str(tmp_path) and algorithm == "md5"
+    assert (tmp_path / "copy.bin").read_bytes() == b"data"
+
+
+def test_copy_rule_manifest(tmp_path: Path) -> None:
+    """Test that verified copies are recorded in the manifest."""
+    source = tmp_path / "source.txt"
+    source.write_text("content")
+    destination = tmp_path / "destination"
+    destination.mkdir()
+    manifest = tmp_path / "SHA256SUMS"
+
+    CopyRule(destination=destination, verify=True, manifest=manifest).apply_rule(
+        PPath(source)
+    )
+
+    digests = transfer.Manifest(manifest).read()
+    assert digests == {
+        str(destination / "source.txt"): hashlib.sha256(b"content").hexdigest()
+    }
+
+
+def test_move_rule_keeps_source_on_error(tmp_path: Path) -> None:
+    """Test that the source of a move is kept if the copy is corrupted."""
+    source = PPath(tmp_path / "source.txt")
+    source.write_text("content")
+    destination = tmp_path / "destination"
+    destination.mkdir()
+
+    with mock.patch.object(transfer, "file_digest", return_value="0"):
+        with pytest.raises(transfer.CopyVerificationError):
+            MoveRule(destination=destination, verify="sha1").apply_rule(source)
+
+    assert source.exists()
+
+
+def test_sync_skips_up_to_date(tmp_path: Path) -> None:
+    """Test that synchronised copies skip up-to-date destinations."""
+    source = tmp_path / "source.bin"
+    source.write_bytes(b"data")
+    (tmp_path / "folder").mkdir()
+    rule = CopyRule(destination=tmp_path / "folder", sync=True)
+
+    rule.apply_rule(PPath(source))
+    target = tmp_path / "folder" / "source.bin"
+    assert target.stat().st_mtime_ns == source.stat().st_mtime_ns
+
+    with mock.patch.object(transfer.shutil, "copy") as copy:
+        rule.apply_rule(PPath(source))
+    copy.assert_not_called()
+
+    source.write_bytes(b"other data")
+    rule.apply_rule(PPath(source))
+    assert target.read_bytes() == b"other data"
+
+
+def test_sync_checksum(tmp_path: Path) -> None:
+    """Test that a checksum sync compares contents rather than modification times."""
+    source = tmp_path / "source.bin"
+    target = tmp_path / "target.bin"
+    source.write_bytes(b"data")
+    target.write_bytes(b"data")
+    assert not transfer.is_up_to_date(source, target)
+    assert transfer.is_up_to_date(source, target, "sha256")
+
+    target.write_bytes(b"date")
+    assert not transfer.is_up_to_date(source, target, "sha256")
+    assert not transfer.is_up_to_date(source, tmp_path / "missing", "sha256")
+
+
+def test_sync_delta(tmp_path: Path) -> None:
+    """Test that large outdated destinations are updated with a delta transfer."""
+    data = bytes(range(256)) * 4096
+    source = tmp_path / "source.bin"
+    target = tmp_path / "target.bin"
+    source.write_bytes(data[:1000] + b"changed" + data[1007:])
+    target.write_bytes(data)
+
+    with mock.patch.object(
+        transfer.delta, "patch", wraps=transfer.delta.patch
+    ) as patch:
+        transfer.copy(source, target, "sha256", sync="mtime", delta_threshold=1024)
+    patch.assert_called_once()
+    assert target.read_bytes() == source.read_bytes()
+    assert transfer.is_up_to_date(source, target)
+
+
+def test_link(tmp_path: Path) -> None:
+    """Test replacing a file with a hard link."""
+    (tmp_path / "a").write_text("a")
+    (tmp_path / "b").write_text("b")
+
+    assert transfer.link(tmp_path / "a", tmp_path / "b")
+    assert (tmp_path / "b").read_text() == "a"
+    assert (tmp_path / "a").stat().st_nlink == 2
+    assert transfer.link(tmp_path / "a", tmp_path / "b")
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["a", "b"]
+
+    with mock.patch("os.link", side_effect=OSError):
+        assert not transfer.link(tmp_path / "a", tmp_path / "c")
+
+
+def test_copy_rule_hardlinks(tmp_path: Path) -> None:
+    """Test that hard links are recreated at the destination."""
+    source = tmp_path / "source"
+    backup = tmp_path / "backup"
+    source.mkdir()
+    backup.mkdir()
+    (source / "f1.txt").write_text("data")
+    (source / "f3.txt").write_text("other")
+    os.link(source / "f1.txt", source / "f2.txt")
+
+    with mock.patch("shutil.copy", wraps=shutil.copy) as copy:
+        CopyRule(destination=backup, hardlinks=True).process(source)
+    assert copy.call_count == 2
+
+    assert (backup / "f1.txt").read_text() == (backup / "f2.txt").read_text()
+    assert os.path.samefile(backup / "f1.txt", backup / "f2.txt")
+    assert (backup / "f3.txt").stat().st_nlink == 1
+
+
+def test_copy_rule_unique(tmp_path: Path) -> None:
+    """Test processing each inode once."""
+    source = tmp_path / "source"
+    backup = tmp_path / "backup"
+    source.mkdir()
+    backup.mkdir()
+    (source / "f1.txt").write_text("data")
+    os.link(source / "f1.txt", source / "f2.txt")
+
+    CopyRule(destination=backup).process(source, unique=True)
+
+    assert len(list(backup.iterdir())) == 1
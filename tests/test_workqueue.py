@@ -0,0 +1,158 @@
+"""Test module for pyfileflow.workqueue module.
+
+This module contains unit tests for the lease-based WorkQueue, including
+several processes sharing a folder.
+"""
+
+import multiprocessing
+import os
+import time
+from pathlib import Path
+
+import pytest
+
+from pyfileflow.ppath import PPath
+from pyfileflow.rule import Rule
+from pyfileflow.workqueue import WorkQueue
+
+
+class LogRule(Rule):
+    """A rule appending the name of the processed files to a log."""
+
+    def __init__(self, log: Path) -> None:
+        """Initialize a LogRule instance."""
+        super().__init__()
+        self.log = log
+
+    def apply_rule(self, path: PPath) -> None:
+        """Append the name of the file to the log."""
+        with open(self.log, "a", encoding="utf-8") as log:
+            log.write(f"{path.name}\n")
+
+
+def worker(inbox: Path, queue: Path, log: Path) -> None:
+    """Process the inbox through the work queue, in another process."""
+    LogRule(log).process(inbox, queue=WorkQueue(queue))
+
+
+def test_claim(tmp_path: Path) -> None:
+    """Test that a key can only be claimed by one worker at a time."""
+    first = WorkQueue(tmp_path, worker="first")
+    second = WorkQueue(tmp_path, worker="second")
+
+    assert first.claim("key")
+    assert not second.claim("key")
+
+    first.release("key", done=False)
+    assert second.claim("key")
+    second.release("key")
+    assert second.is_done("key")
+    assert not first.claim("key")
+
+
+def test_expired_lease(tmp_path: Path) -> None:
+    """Test that the claims of dead workers expire, unless renewed."""
+    dead = WorkQueue(tmp_path, lease=60, worker="dead")
+    alive = WorkQueue(tmp_path, lease=60, worker="alive")
+
+    assert dead.claim("key")
+    dead.renew("key")
+    assert not alive.claim("key")
+
+    os.utime(tmp_path / "claims" / "key", (0, 0))
+    assert alive.claim("key")
+    assert (tmp_path / "claims" / "key").read_text() == "alive"
+
+    # The dead worker must not release the claim it lost.
+    dead.release("key", done=False)
+    assert (tmp_path / "claims" / "key").exists()
+    assert os.listdir(tmp_path / "claims") == ["key"]
+
+
+def test_heartbeat(tmp_path: Path) -> None:
+    """Test that held claims are renewed until released."""
+    holder = WorkQueue(tmp_path, lease=0.3, worker="holder")
+    other = WorkQueue(tmp_path, lease=0.3, worker="other")
+
+    assert holder.claim("key")
+    time.sleep(0.6)
+    assert not other.claim("key")
+
+    holder.release("key", done=False)
+    assert other.claim("key")
+    other.release("key")
+    time.sleep(0.3)
+    assert holder._heartbeat is None
+
+
+def test_prune(tmp_path: Path) -> None:
+    """Test removing old done markers."""
+    queue = WorkQueue(tmp_path)
+    for key in ("old", "new"):
+        assert queue.claim(key)
+        queue.release(key)
+    os.utime(tmp_path / "done" / "old", (0, 0))
+
+    assert queue.prune(older_than=3600) == 1
+    assert not queue.is_done("old")
+    assert queue.is_done("new")
+
+
+def test_file_key(tmp_path: Path) -> None:
+    """Test that the key of a file changes when the file is modified."""
+    (tmp_path / "f1.txt").write_text("a")
+    key = WorkQueue.file_key(PPath(tmp_path / "f1.txt"))
+    assert key == WorkQueue.file_key(PPath(tmp_path / "f1.txt"))
+
+    (tmp_path / "f1.txt").write_text("ab")
+    assert key != WorkQueue.file_key(PPath(tmp_path / "f1.txt"))
+
+    # Relative to the processed folder, the key does not depend on its mount point.
+    (tmp_path / "a" / "sub").mkdir(parents=True)
+    (tmp_path / "b" / "sub").mkdir(parents=True)
+    for root in ("a", "b"):
+        (tmp_path / root / "sub" / "f1.txt").write_text("a")
+        os.utime(tmp_path / root / "sub" / "f1.txt", ns=(0, 0))
+    assert WorkQueue.file_key(
+        PPath(tmp_path / "a" / "sub" / "f1.txt"), tmp_path / "a"
+    ) == WorkQueue.file_key(PPath(tmp_path / "b" / "sub" / "f1.txt"), tmp_path / "b")
+
+
+def test_process_with_queue(tmp_path: Path) -> None:
+    """Test that files already done are not processed again."""
+    (tmp_path / "inbox").mkdir()
+    (tmp_path / "inbox" / "f1.txt").touch()
+    queue = WorkQueue(tmp_path / "queue")
+
+    LogRule(tmp_path / "log").process(tmp_path / "inbox", queue=queue)
+    LogRule(tmp_path / "log").process(tmp_path / "inbox", queue=queue)
+
+    assert (tmp_path / "log").read_text() == "f1.txt\n"
+    assert os.listdir(tmp_path / "queue" / "claims") == []
+
+
+@pytest.mark.skipif(
+    "fork" not in multiprocessing.get_all_start_methods(), reason="requires fork"
+)
+def test_several_processes(tmp_path: Path) -> None:
+    """Test that several processes sharing a folder process each file once."""
+    (tmp_path / "inbox").mkdir()
+    names = [f"f{i}.txt" for i in range(200)]
+    for name in names:
+        (tmp_path / "inbox" / name).touch()
+
+    context = multiprocessing.get_context("fork")
+    processes = [
+        context.Process(
+            target=worker,
+            args=(tmp_path / "inbox", tmp_path / "queue", tmp_path / "log"),
+        )
+        for _ in range(4)
+    ]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+
+    assert all(process.exitcode == 0 for process in processes)
+    assert sorted((tmp_path / "log").read_text().split()) == sorted(names)